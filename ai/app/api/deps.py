@@ -1,15 +1,55 @@
-"""FastAPI dependencies."""
+"""FastAPI dependencies.
+
+Nothing heavy happens at import time: the Qdrant client and the RAG pipeline
+(embedding and reranker models) are built on first use, normally by the
+startup warm-up in app.api.main.
+"""
+
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from qdrant_client import QdrantClient
 
-from app.core.config import settings
-from app.generation.pipeline import RAGPipeline
 from app.vector.qdrant_client import get_client
 
-qdrant_client = get_client()
-rag_pipeline = RAGPipeline()
+if TYPE_CHECKING:
+    from app.generation.pipeline import RAGPipeline
+
+_qdrant_client: Optional[QdrantClient] = None
+_rag_pipeline: Optional["RAGPipeline"] = None
+_lock = threading.Lock()
+
+
+def get_qdrant_client() -> QdrantClient:
+    """Dependency for the shared Qdrant client."""
+    global _qdrant_client
+    if _qdrant_client is None:
+        with _lock:
+            if _qdrant_client is None:
+                _qdrant_client = get_client()
+    return _qdrant_client
+
+
+def get_rag_pipeline() -> "RAGPipeline":
+    """Dependency for RAG pipeline (built on first call if warm-up has not run)."""
+    global _rag_pipeline
+    if _rag_pipeline is None:
+        with _lock:
+            if _rag_pipeline is None:
+                from app.generation.pipeline import RAGPipeline
+
+                _rag_pipeline = RAGPipeline()
+    return _rag_pipeline
 
 
-def get_rag_pipeline() -> RAGPipeline:
-    """Dependency for RAG pipeline."""
-    return rag_pipeline
+def rag_pipeline_loaded() -> bool:
+    """Whether the RAG pipeline has been constructed."""
+    return _rag_pipeline is not None
 
 
+def reset_clients() -> None:
+    """Drop network clients inherited across fork; loaded models are kept."""
+    global _qdrant_client
+    _qdrant_client = None
+    if _rag_pipeline is not None:
+        _rag_pipeline.reset_clients()
@@ -0,0 +1,92 @@
+"""In-process registry of background document-processing jobs."""
+
+import asyncio
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+
+class Job(BaseModel):
+    """State of one background job as reported to polling clients."""
+    job_id: str
+    status: str = "queued"  # queued | running | done | failed
+    filename: Optional[str] = None
+    created_at: float
+    finished_at: Optional[float] = None
+    result: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+
+
+class JobRegistry:
+    """Tracks background jobs of this worker; finished jobs expire after ttl_seconds.
+
+    Jobs live in the worker that accepted them, so behind several workers the
+    status endpoint needs sticky routing (or a single extraction worker).
+    """
+
+    def __init__(self, max_jobs: int = 1000, ttl_seconds: float = 3600):
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self._jobs: dict[str, Job] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        finished = sorted(
+            (j for j in self._jobs.values() if j.finished_at is not None),
+            key=lambda j: j.finished_at,
+        )
+        overflow = len(self._jobs) - self.max_jobs
+        for job in finished:
+            if now - job.finished_at <= self.ttl_seconds and overflow <= 0:
+                break
+            del self._jobs[job.job_id]
+            overflow -= 1
+
+    def submit(
+        self, work: Callable[[], Awaitable[dict[str, Any]]], filename: Optional[str] = None
+    ) -> Job:
+        """Start work() as a background task and return its job record."""
+        now = time.time()
+        job = Job(job_id=str(uuid.uuid4()), filename=filename, created_at=now)
+        with self._lock:
+            self._prune(now)
+            self._jobs[job.job_id] = job
+        self._tasks[job.job_id] = asyncio.create_task(self._run(job, work))
+        return job
+
+    async def _run(self, job: Job, work: Callable[[], Awaitable[dict[str, Any]]]) -> None:
+        job.status = "running"
+        try:
+            job.result = await work()
+            job.status = "done"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(getattr(e, "detail", None) or e) or type(e).__name__
+            job.status_code = getattr(e, "status_code", 500)
+        finally:
+            job.finished_at = time.time()
+            self._tasks.pop(job.job_id, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id, or None if unknown or expired."""
+        with self._lock:
+            self._prune(time.time())
+            return self._jobs.get(job_id)
+
+
+_registry: Optional[JobRegistry] = None
+
+
+def get_job_registry() -> JobRegistry:
+    """Get the process-wide job registry."""
+    global _registry
+    if _registry is None:
+        _registry = JobRegistry(ttl_seconds=settings.extraction_job_ttl_seconds)
+    return _registry
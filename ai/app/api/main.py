@@ -1,19 +1,25 @@
 """FastAPI application main module."""
 
+import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
+from app.api.deps import get_rag_pipeline
 from app.api.routes_admin import router as admin_router
 from app.api.routes_chat import router as chat_router
 from app.api.routes_patient import router as patient_router
 from app.core.config import settings
 from app.core.logging import setup_logging
+from app.core.metrics import metrics
+from app.ingestion.extraction_pool import get_extraction_pool
 
 # Setup logging
 setup_logging()
@@ -23,11 +29,42 @@ logger = logging.getLogger(__name__)
 limiter = Limiter(key_func=get_remote_address)
 
 
+def _load_models() -> None:
+    """Build the RAG pipeline (embedding + reranker models) and run a warm-up pass."""
+    t0 = time.perf_counter()
+    pipeline = get_rag_pipeline()
+    t1 = time.perf_counter()
+    pipeline.warm_up()
+    t2 = time.perf_counter()
+    metrics.observe("startup.model_load", t1 - t0)
+    metrics.observe("startup.warm_up", t2 - t1)
+    logger.info(f"Models loaded in {t1 - t0:.2f}s, warm-up took {t2 - t1:.2f}s")
+
+
+async def _warm_up(app: FastAPI) -> None:
+    try:
+        await asyncio.to_thread(_load_models)
+        app.state.ready = True
+    except Exception as e:
+        app.state.startup_error = str(e)
+        logger.error(f"Model warm-up failed: {e}", exc_info=True)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Lifespan context manager for startup/shutdown."""
+    """Lifespan context manager for startup/shutdown.
+
+    Models load in a background thread so the server binds immediately; /health
+    answers right away while /ready returns 503 until warm-up has finished.
+    """
     logger.info("Starting Clinical Decision Support API")
+    app.state.ready = not settings.startup_warmup
+    app.state.startup_error = None
+    warm_up_task = asyncio.create_task(_warm_up(app)) if settings.startup_warmup else None
     yield
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    get_extraction_pool().shutdown()
     logger.info("Shutting down API")
 
 
@@ -60,10 +97,21 @@ app.include_router(admin_router, prefix="/admin", tags=["admin"])
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Liveness check: the process is up and serving HTTP."""
     return {"status": "healthy", "version": "1.0.0"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check: models are loaded and warmed up."""
+    if not app.state.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "loading", "error": app.state.startup_error},
+        )
+    return {"status": "ready"}
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -72,4 +120,5 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs",
         "health": "/health",
+        "ready": "/ready",
     }
@@ -0,0 +1,64 @@
+"""Pre-fork model loading so gunicorn workers share one copy of the model weights.
+
+Used from gunicorn.conf.py: the master builds the RAG pipeline once, moves the
+torch weights into shared memory and freezes the GC heap; forked workers then
+only recreate their network clients.
+"""
+
+import logging
+import os
+import sys
+from typing import Any
+
+from app.api.deps import get_rag_pipeline, reset_clients
+
+logger = logging.getLogger(__name__)
+
+
+def _torch_modules(pipeline: Any) -> list[Any]:
+    """Collect the torch modules (embedding model, cross-encoder) held by the pipeline."""
+    modules = []
+    embedding_model = getattr(pipeline.embedding_provider, "model", None)
+    if embedding_model is not None:
+        modules.append(embedding_model)
+    reranker = getattr(pipeline.reranker, "reranker", pipeline.reranker)
+    if reranker is not None and getattr(reranker, "model", None) is not None:
+        modules.append(reranker.model)
+    return modules
+
+
+def share_model_memory(pipeline: Any) -> int:
+    """Move model parameters and buffers into shared memory; return the modules moved."""
+    shared = 0
+    for module in _torch_modules(pipeline):
+        try:
+            module.share_memory()
+            shared += 1
+        except Exception as e:
+            # e.g. ONNX-backed models hold no torch storages to share
+            logger.warning(f"Could not move {type(module).__name__} to shared memory: {e}")
+    return shared
+
+
+def preload_models() -> None:
+    """Load and warm up the models in the pre-fork master process."""
+    # Rust tokenizers thread pools do not survive fork
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    try:
+        pipeline = get_rag_pipeline()
+        pipeline.warm_up()
+    except Exception as e:
+        # Workers fall back to loading their own copy (reported through /ready)
+        logger.error(f"Model preload failed: {e}", exc_info=True)
+        return
+    shared = share_model_memory(pipeline)
+    logger.info(f"Preloaded models in master (pid {os.getpid()}), {shared} module(s) in shared memory")
+
+
+def after_fork(workers: int) -> None:
+    """Per-worker setup: fresh network clients and a fair share of CPU threads."""
+    reset_clients()
+    if "torch" in sys.modules:
+        import torch
+
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // max(1, workers)))
@@ -5,9 +5,11 @@ from datetime import datetime
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status, Header
+from qdrant_client import QdrantClient
 
-from app.api.deps import qdrant_client
+from app.api.deps import get_qdrant_client
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.core.schemas import AdminStats, ReindexRequest
 from app.core.security import verify_api_key
 
@@ -18,6 +20,7 @@ router = APIRouter()
 @router.get("/stats", response_model=AdminStats)
 async def get_stats(
     x_api_key: str = Header(..., alias="X-API-Key"),
+    qdrant_client: QdrantClient = Depends(get_qdrant_client),
 ):
     """Get collection statistics."""
     try:
@@ -49,6 +52,26 @@ async def get_stats(
         )
 
 
+@router.get("/metrics")
+async def get_metrics(
+    x_api_key: str = Header(..., alias="X-API-Key"),
+):
+    """Get in-process pipeline counters and timings."""
+    await verify_api_key(x_api_key)
+    return metrics.snapshot()
+
+
+@router.get("/sessions")
+async def get_session_stats(
+    x_api_key: str = Header(..., alias="X-API-Key"),
+):
+    """Get the size of the patient session store."""
+    await verify_api_key(x_api_key)
+    from app.core.memory import get_session_manager
+
+    return get_session_manager().store.stats()
+
+
 @router.post("/reindex")
 async def reindex(
     request: ReindexRequest,
@@ -6,8 +6,9 @@ from typing import Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from slowapi.util import get_remote_address
 
-from app.api.deps import rag_pipeline
+from app.api.deps import get_rag_pipeline
 from app.core.schemas import ChatRequest, ChatResponse, Source
+from app.generation.pipeline import RAGPipeline
 from app.core.logging import mask_pii
 
 logger = logging.getLogger(__name__)
@@ -18,6 +19,7 @@ router = APIRouter()
 async def chat(
     request: ChatRequest,
     request_obj: Request,
+    rag_pipeline: RAGPipeline = Depends(get_rag_pipeline),
 ):
     """Chat endpoint for RAG queries."""
     try:
@@ -1,16 +1,16 @@
 from typing import Optional
-import io
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+import asyncio
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from PIL import Image
-import pytesseract
 
-from app.ingestion.parse_pdf import extract_pdf_text
+from app.ingestion.extraction_pool import UnsupportedDocumentError, get_extraction_pool, is_supported
 from app.api.deps import get_rag_pipeline
+from app.api.jobs import Job, get_job_registry
 from app.generation.pipeline import RAGPipeline
 
 from app.ingestion.clinical_parser import get_clinical_parser
-from app.core.memory import get_session_manager
+from app.core.memory import SessionConflictError, get_session_manager
 
 router = APIRouter()
 
@@ -23,49 +23,88 @@ class PatientUploadResponse(BaseModel):
     structured_data: dict
     filename: str
 
-@router.post("/upload", response_model=PatientUploadResponse)
-async def upload_patient_file(file: UploadFile = File(...)):
-    """
-    Upload a patient file (PDF or Image), extract raw text, and parse into a structured clinical schema.
-    Returns the structured JSON and a Session ID to maintain context for analysis.
-    """
-    content = await file.read()
-    raw_text = ""
-    metadata = {}
-
-    # 1. OCR or PDF Extraction
-    if file.content_type == "application/pdf":
-        raw_text, metadata = extract_pdf_text(content)
-    elif file.content_type.startswith("image/"):
-        try:
-            image = Image.open(io.BytesIO(content))
-            raw_text = pytesseract.image_to_string(image)
-            metadata = {"source": "ocr", "format": file.content_type}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"OCR failed: {str(e)}")
-    else:
+class JobAcceptedResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+async def _process_upload(content: bytes, content_type: Optional[str], filename: Optional[str]) -> dict:
+    """Extract text in the process pool, parse it into the clinical schema and open a session."""
+    # 1. OCR or PDF Extraction (worker processes, off the event loop)
+    try:
+        raw_text, metadata = await get_extraction_pool().extract(content, content_type)
+    except UnsupportedDocumentError:
         raise HTTPException(status_code=400, detail="Only PDF and Image files are supported.")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Document extraction timed out.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"OCR failed: {str(e)}")
     
     if not raw_text.strip():
         raise HTTPException(status_code=400, detail="Could not extract any text from the document.")
 
-    # 2. Structured Parsing & Abnormal Detection
+    # 2. Structured Parsing & Abnormal Detection (blocking LLM call)
     parser = get_clinical_parser()
-    structured_data = parser.parse_document(raw_text)
+    structured_data = await run_in_threadpool(parser.parse_document, raw_text)
 
     # 3. Create Session
     session_manager = get_session_manager()
-    session_id = session_manager.create_session(structured_data)
+    session_id = await run_in_threadpool(session_manager.create_session, structured_data)
     
     return {
         "session_id": session_id,
         "structured_data": structured_data,
-        "filename": file.filename
+        "filename": filename
+    }
+
+@router.post("/upload", response_model=PatientUploadResponse)
+async def upload_patient_file(file: UploadFile = File(...)):
+    """
+    Upload a patient file (PDF or Image), extract raw text, and parse into a structured clinical schema.
+    Returns the structured JSON and a Session ID to maintain context for analysis.
+    """
+    content = await file.read()
+    return await _process_upload(content, file.content_type, file.filename)
+
+@router.post("/upload/async", response_model=JobAcceptedResponse, status_code=202)
+async def upload_patient_file_async(request: Request, file: UploadFile = File(...)):
+    """
+    Queue a patient file for extraction and parsing; for large or scanned documents.
+    Poll the returned status URL until the job is done to get the session ID.
+    """
+    if not is_supported(file.content_type):
+        raise HTTPException(status_code=400, detail="Only PDF and Image files are supported.")
+    content = await file.read()
+    job = get_job_registry().submit(
+        lambda: _process_upload(content, file.content_type, file.filename),
+        filename=file.filename,
+    )
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": str(request.url_for("get_upload_job", job_id=job.job_id)),
     }
 
+@router.get("/jobs/{job_id}", response_model=Job)
+async def get_upload_job(job_id: str):
+    """Status of an async upload; includes the upload result once done."""
+    job = get_job_registry().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job
+
+def _refresh_summary(session_id: str, pipeline: RAGPipeline):
+    """Fold evicted turns into the session summary after the response is sent.
+
+    Works on a freshly loaded copy and saves only the summary fields with
+    compare-and-set, so turns saved meanwhile by other requests are kept.
+    """
+    get_session_manager().refresh_summary(session_id, pipeline.summarize_turns)
+
 @router.post("/analyze")
 async def analyze_patient_case(
     request: PatientAnalysisRequest,
+    background_tasks: BackgroundTasks,
     pipeline: RAGPipeline = Depends(get_rag_pipeline)
 ):
     """
@@ -73,23 +112,40 @@ async def analyze_patient_case(
     Maintains history context through the SessionManager.
     """
     session_manager = get_session_manager()
-    session = session_manager.get_session(request.session_id)
+    session = await run_in_threadpool(session_manager.get_session, request.session_id)
     
     if not session:
         raise HTTPException(status_code=404, detail="Patient session not found or expired. Please upload the document again.")
     
-    # Generate the highly structured patient context for the LLM
+    # Structured patient context for the LLM (formatted once per session)
     context_str = session.format_context_for_prompt()
     
     # Run the pipeline with the specific patient context and historical memory
     result = await pipeline.run(
         user_query=request.query,
         history=session.history,
-        patient_context=context_str
+        patient_context=context_str,
+        summary=session.summary,
+        patient_context_tokens=session.context_tokens,
     )
     
-    # Append to memory
-    session.add_interaction(request.query, result["answer"])
+    # Append to memory (re-applied on the latest copy if another request saved meanwhile);
+    # turns pushed out of the window are summarized after the response
+    try:
+        updated = await run_in_threadpool(
+            session_manager.update_session,
+            request.session_id,
+            lambda s: s.add_interaction(request.query, result["answer"]),
+        )
+    except SessionConflictError:
+        raise HTTPException(status_code=409, detail="Patient session is being updated by another request. Please retry.")
+    if updated is None:
+        # Evicted while the pipeline ran: save this copy so the conversation continues
+        session.add_interaction(request.query, result["answer"])
+        await run_in_threadpool(session_manager.save_session, session)
+        updated = session
+    if updated.pending_summary_turns:
+        background_tasks.add_task(_refresh_summary, request.session_id, pipeline)
     
     return {
         "answer": result["answer"],
@@ -22,18 +22,55 @@ class Settings(BaseSettings):
     # API Security
     api_key: str = "dev-secret"
 
+    # Load and warm up models in the background at startup (/ready turns 200 when done)
+    startup_warmup: bool = True
+
     # OpenAI
     openai_api_key: str = ""
     openai_embed_model: str = "text-embedding-3-small"
     openai_chat_model: str = "gpt-4o-mini"
+    openai_embed_request_max_tokens: int = 250000
+    openai_embed_request_max_inputs: int = 256  # Smaller requests let several run in flight
+    openai_embed_max_in_flight: int = 4
+    openai_embed_max_retries: int = 6
 
     # Embeddings Provider
     embeddings_provider: Literal["openai", "local"] = "openai"
 
+    # Reduced embedding size (OpenAI `dimensions` / Matryoshka truncation); 0 = native size
+    embedding_dimensions: int = 0
+
+    # Embedding cache (content-addressed, shared by ingestion and queries)
+    embedding_cache_enabled: bool = True
+    embedding_cache_dir: str = "data/embedding_cache"
+    embedding_cache_lru_size: int = 10000
+
+    # Local embedder inference precision (onnx requires optimum[onnxruntime])
+    local_embed_precision: Literal["fp32", "int8", "fp16", "onnx"] = "fp32"
+
+    # Bulk local embedding (ingestion): process pool size (0/1 = single process)
+    local_embed_workers: int = 0
+    local_embed_batch_size: int = 64
+    local_embed_sort_by_length: bool = True
+
+    # Ingestion embedding batches
+    embed_batch_size: int = 256
+    embed_batch_max_tokens: int = 250000  # Stays under OpenAI's per-request token limit
+
     # LLM Provider
     llm_provider: Literal["openai", "ollama", "vllm"] = "openai"
     ollama_model: str = "llama3"
     ollama_host: str = "http://localhost:11434"
+    ollama_keep_alive: str = "30m"  # Keep the model (and its prompt KV cache) loaded between requests
+    ollama_num_ctx: int = 0  # 0 = server default; keep constant, changing it reloads the model
+
+    # vLLM / any OpenAI-compatible server (llm_provider="vllm")
+    vllm_base_url: str = "http://localhost:8001/v1"
+    vllm_model: str = ""  # Empty: use the first model the server lists
+    vllm_api_key: str = "EMPTY"
+    vllm_max_concurrency: int = 32  # Requests in flight; the server batches them continuously
+    llm_request_timeout: float = 120.0
+    llm_max_retries: int = 2
 
     # Azure OpenAI (optional)
     azure_openai_endpoint: str = ""
@@ -55,6 +92,68 @@ class Settings(BaseSettings):
     top_k: int = 40
     top_n: int = 3
 
+    # Reranking
+    rerank_bypass_enabled: bool = True
+    rerank_bypass_min_margin: float = 0.25  # Score gap between rank top_n and top_n + 1
+    rerank_bypass_max_entropy: float = 0.5  # Normalized entropy of the softmaxed scores
+    rerank_bypass_temperature: float = 0.1
+    rerank_cache_size: int = 20000  # 0 disables the (query, chunk) score cache
+    rerank_cache_path: str = ""  # e.g. data/cache/rerank_scores.json to persist across restarts
+    rerank_token_cache_size: int = 50000  # Pre-tokenized chunk texts kept in memory
+
+    # Extractive context compression between reranking and prompt building
+    context_compression_enabled: bool = True
+    context_compression_ratio: float = 0.5  # Share of sentence characters to keep
+    context_compression_min_sentences: int = 4  # Shorter chunks are passed through whole
+
+    # Token counting: "tiktoken", "hf" (Hugging Face tokenizer) or "estimate"
+    token_counter_backend: str = "tiktoken"
+    token_counter_model: str = ""  # Defaults to openai_chat_model; a HF model id for "hf"
+    token_cache_size: int = 50000
+
+    # Prompt layout: "cache_friendly" (static instructions first) or "legacy"
+    prompt_layout: Literal["cache_friendly", "legacy"] = "cache_friendly"
+
+    # Prompt token budgets per section; context gets what is left of prompt_max_tokens, up to its own
+    prompt_max_tokens: int = 6000
+    prompt_context_tokens: int = 3000
+    prompt_chunk_max_tokens: int = 400  # Per chunk, trimmed at sentence boundaries
+    prompt_history_tokens: int = 800
+    prompt_summary_tokens: int = 300
+    prompt_patient_tokens: int = 1500
+
+    # Patient sessions: "memory" (per process), "sqlite" (shared on one host) or "redis"
+    session_backend: Literal["memory", "sqlite", "redis"] = "memory"
+    session_max_sessions: int = 1000
+    session_max_bytes: int = 256 * 1024 * 1024  # Serialized size; 0 = unbounded (redis: use maxmemory)
+    session_ttl_seconds: float = 4 * 3600  # Idle time before a session expires; 0 = never
+    session_sqlite_path: str = "data/sessions.db"
+    session_redis_url: str = "redis://localhost:6379/0"
+
+    # Patient document extraction (PDF parsing / OCR) in worker processes
+    extraction_workers: int = 2
+    extraction_max_concurrency: int = 4  # Documents admitted at once (running or awaiting a worker)
+    extraction_timeout: float = 120.0  # Seconds per document, from when a worker picks it up
+    extraction_job_ttl_seconds: float = 3600  # How long finished async upload jobs stay pollable
+
+    # OCR fallback for PDF pages without a text layer (scans)
+    pdf_ocr_enabled: bool = True
+    pdf_ocr_dpi: int = 300
+    pdf_ocr_workers: int = 0  # tesseract processes per PDF; 0 = CPUs / extraction_workers
+    pdf_ocr_min_chars: int = 20  # Pages with less extractable text are treated as scans
+    pdf_ocr_lang: str = "eng"
+    pdf_ocr_page_timeout: float = 60.0
+
+    # Streaming ingestion of large PDFs (parallel page extraction, batched upserts)
+    pdf_stream_min_pages: int = 50  # ingest_medical streams PDFs with at least this many pages
+    pdf_stream_workers: int = 0  # Extraction processes; 0 = one per CPU
+    pdf_stream_pages_per_task: int = 8
+    pdf_stream_batch_size: int = 64  # Chunks per embed + upsert batch
+    pdf_stream_progress_dir: str = "data/ingest_progress"
+
+    # Clinical document parsing: rule-based labs/demographics before the LLM
+    clinical_rules_enabled: bool = True
+
     # Legal
     legal_disclaimer: str = (
         "WARNING: This system provides clinical decision support using AI and is NOT a diagnostic tool. "
@@ -2,19 +2,38 @@
 
 import json
 import logging
+import threading
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
 from pydantic import BaseModel
 
+if TYPE_CHECKING:
+    from app.core.session_store import SessionStore
+
 logger = logging.getLogger(__name__)
 
+_ABNORMAL_FLAGS = ("High", "Low", "Critical")
+
+
+class SessionConflictError(RuntimeError):
+    """Raised when a compare-and-set session update keeps losing to concurrent writers."""
+
 
 class PatientSession(BaseModel):
     """Represents an active patient reasoning session."""
     session_id: str
     structured_data: Dict[str, Any]
     history: List[Dict[str, str]] = []
+    # Rolling summary of the turns that fell out of the history window
+    summary: str = ""
+    # Evicted turns not yet folded into the summary
+    pending_summary_turns: List[Dict[str, str]] = []
+    # Prompt-ready patient context and its token count, cached until structured_data changes
+    formatted_context: Optional[str] = None
+    context_tokens: Optional[int] = None
+    # Bumped by the store on every save; compare-and-set writes check it
+    version: int = 0
 
     def add_interaction(self, user_query: str, assistant_response: str):
         self.history.append({"role": "user", "content": user_query})
@@ -22,49 +41,90 @@ class PatientSession(BaseModel):
         
         # Prevent context window explosion: Keep last 10 turns (5 Q/A pairs)
         if len(self.history) > 10:
+            self.pending_summary_turns.extend(self.history[:-10])
             self.history = self.history[-10:]
 
+    def apply_summary(self, base: str, turns: List[Dict[str, str]], summary: str) -> bool:
+        """Install summary, computed from base and turns, if those are still this session's state.
+
+        The consumed turns are removed from the pending ones. Returns False (and
+        changes nothing) if the summary or the pending turns moved on meanwhile,
+        e.g. another worker already folded them in.
+        """
+        if self.summary != base or self.pending_summary_turns[: len(turns)] != turns:
+            return False
+        self.summary = summary
+        del self.pending_summary_turns[: len(turns)]
+        return True
+
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        if name == "structured_data":
+            self.invalidate_context()
+
+    def invalidate_context(self):
+        """Drop the cached prompt context; call after mutating structured_data in place."""
+        self.formatted_context = None
+        self.context_tokens = None
+
     def format_context_for_prompt(self) -> str:
-        """Dynamically formats the patient data to be injected into the RAG prompt."""
-        
-        # We want to highlight abnormal labs specifically for the LLM
-        abnormal_labs = [
-            lab for lab in self.structured_data.get("labs", [])
-            if lab.get("flag") in ["High", "Low", "Critical"]
+        """Return the patient data formatted for the RAG prompt, built once per structured_data."""
+        if self.formatted_context is None:
+            from app.core.tokens import count_tokens
+
+            context = self._build_context()
+            self.formatted_context = context
+            self.context_tokens = count_tokens(context)
+        return self.formatted_context
+
+    def _build_context(self) -> str:
+        """Format the patient data, highlighting abnormal labs for the LLM."""
+        data = self.structured_data
+        abnormal_labs = []
+        normal_labs = []
+        for lab in data.get("labs", []):
+            (abnormal_labs if lab.get("flag") in _ABNORMAL_FLAGS else normal_labs).append(lab)
+
+        demo = data.get("demographics", {})
+        parts = [
+            "--- PATIENT DEMOGRAPHICS ---\n",
+            f"Age: {demo.get('age', 'Unknown')}, Gender: {demo.get('gender', 'Unknown')}\n\n",
+            "--- ACTIVE PROBLEMS & HISTORY ---\n",
+            f"Problems: {', '.join(data.get('active_problems', []))}\n",
+            f"Narrative: {data.get('unstructured_narrative', '')}\n\n",
+            "--- MEDICATIONS & ALLERGIES ---\n",
+            f"Medications: {', '.join(data.get('medications', []))}\n",
+            f"Allergies: {', '.join(data.get('allergies', []))}\n\n",
         ]
-        
-        context_str = f"--- PATIENT DEMOGRAPHICS ---\n"
-        demo = self.structured_data.get("demographics", {})
-        context_str += f"Age: {demo.get('age', 'Unknown')}, Gender: {demo.get('gender', 'Unknown')}\n\n"
-        
-        context_str += f"--- ACTIVE PROBLEMS & HISTORY ---\n"
-        context_str += f"Problems: {', '.join(self.structured_data.get('active_problems', []))}\n"
-        context_str += f"Narrative: {self.structured_data.get('unstructured_narrative', '')}\n\n"
-        
-        context_str += f"--- MEDICATIONS & ALLERGIES ---\n"
-        context_str += f"Medications: {', '.join(self.structured_data.get('medications', []))}\n"
-        context_str += f"Allergies: {', '.join(self.structured_data.get('allergies', []))}\n\n"
-        
+
         if abnormal_labs:
-            context_str += f"!!! ABNORMAL / CRITICAL LABS !!!\n"
-            for lab in abnormal_labs:
-                context_str += f"- {lab.get('test_name')}: {lab.get('value')} {lab.get('unit', '')} (FLAG: {lab.get('flag')})\n"
-            context_str += "\n"
-        
-        context_str += f"--- ALL EXTRACTED LABS ---\n"
-        for lab in self.structured_data.get("labs", []):
-             if lab.get("flag") not in ["High", "Low", "Critical"]:
-                context_str += f"- {lab.get('test_name')}: {lab.get('value')} {lab.get('unit', '')} (Normal)\n"
-            
-        return context_str
+            parts.append("!!! ABNORMAL / CRITICAL LABS !!!\n")
+            parts.extend(
+                f"- {lab.get('test_name')}: {lab.get('value')} {lab.get('unit', '')} (FLAG: {lab.get('flag')})\n"
+                for lab in abnormal_labs
+            )
+            parts.append("\n")
+
+        parts.append("--- ALL EXTRACTED LABS ---\n")
+        parts.extend(
+            f"- {lab.get('test_name')}: {lab.get('value')} {lab.get('unit', '')} (Normal)\n"
+            for lab in normal_labs
+        )
+        return "".join(parts)
 
 
 class SessionManager:
-    """Manages active patient context sessions (In-Memory MVP)."""
+    """Manages active patient context sessions on top of a SessionStore."""
     
-    def __init__(self):
-        # In a real enterprise app, this would be Redis or a Database
-        self._sessions: Dict[str, PatientSession] = {}
+    def __init__(self, store: Optional["SessionStore"] = None):
+        if store is None:
+            from app.core.session_store import create_session_store
+
+            store = create_session_store()
+        self.store = store
+        # Sessions with a summary refresh running in this process
+        self._refreshing: set[str] = set()
+        self._refreshing_lock = threading.Lock()
 
     def create_session(self, structured_data: Dict[str, Any]) -> str:
         session_id = str(uuid.uuid4())
@@ -73,19 +133,80 @@ class SessionManager:
             structured_data=structured_data,
             history=[]
         )
-        self._sessions[session_id] = session
+        # structured_data is fixed after upload: format (and count) the prompt context once
+        session.format_context_for_prompt()
+        self.store.put(session)
         return session_id
 
     def get_session(self, session_id: str) -> Optional[PatientSession]:
-        return self._sessions.get(session_id)
+        return self.store.get(session_id)
+
+    def save_session(self, session: PatientSession):
+        """Persist a session after it was changed (required by the shared backends)."""
+        self.store.put(session)
+
+    def update_session(
+        self, session_id: str, apply: Callable[[PatientSession], Optional[bool]], retries: int = 5
+    ) -> Optional[PatientSession]:
+        """Load a session, apply a change and save it with compare-and-set.
+
+        If another writer saved the session in between, it is re-loaded and the
+        change re-applied, so concurrent updates are not lost. apply may return
+        False to leave the session unchanged. Returns the session as saved, or
+        None if it does not exist or apply declined; raises SessionConflictError
+        if every attempt conflicted.
+        """
+        for _ in range(retries):
+            session = self.store.get(session_id)
+            if session is None or apply(session) is False:
+                return None
+            if self.store.put(session, expected_version=session.version):
+                return session
+        logger.warning(f"Gave up updating session {session_id} after {retries} conflicting writes")
+        raise SessionConflictError(f"Session {session_id} kept changing during the update")
+
+    def refresh_summary(
+        self, session_id: str, summarize: Callable[[str, List[Dict[str, str]]], str]
+    ) -> bool:
+        """Fold a session's pending turns into its summary and save only those fields.
+
+        The (slow) summarize call works on a fresh copy of the session; the result
+        is applied with update_session, so history saved meanwhile is kept and
+        turns another worker already summarized are not folded in twice.
+        """
+        with self._refreshing_lock:
+            if session_id in self._refreshing:
+                return False
+            self._refreshing.add(session_id)
+        try:
+            session = self.store.get(session_id)
+            if session is None or not session.pending_summary_turns:
+                return False
+            base, turns = session.summary, list(session.pending_summary_turns)
+            try:
+                summary = summarize(base, turns)
+                updated = self.update_session(
+                    session_id, lambda s: s.apply_summary(base, turns, summary)
+                )
+            except Exception as e:
+                logger.warning(f"Summary refresh failed for session {session_id}: {e}")
+                return False
+            return updated is not None
+        finally:
+            with self._refreshing_lock:
+                self._refreshing.discard(session_id)
 
     def delete_session(self, session_id: str):
-        if session_id in self._sessions:
-            del self._sessions[session_id]
+        self.store.delete(session_id)
 
 
-# Singleton instance
-_session_manager = SessionManager()
+_session_manager: Optional[SessionManager] = None
+_session_manager_lock = threading.Lock()
 
 def get_session_manager() -> SessionManager:
+    global _session_manager
+    if _session_manager is None:
+        with _session_manager_lock:
+            if _session_manager is None:
+                _session_manager = SessionManager()
     return _session_manager
@@ -0,0 +1,53 @@
+"""Lightweight in-process counters and timings for pipeline instrumentation."""
+
+import threading
+from typing import Any
+
+
+class MetricsRegistry:
+    """Thread-safe registry of named counters and timing accumulators."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._timings: dict[str, dict[str, float]] = {}
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Increment a counter by value."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record a duration (in seconds) for a timed operation."""
+        with self._lock:
+            timing = self._timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+
+    def get(self, name: str) -> float:
+        """Get the current value of a counter."""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return a copy of all counters and timings."""
+        with self._lock:
+            timings = {
+                name: {
+                    **t,
+                    "avg": t["total"] / t["count"] if t["count"] else 0.0,
+                }
+                for name, t in self._timings.items()
+            }
+            return {"counters": dict(self._counters), "timings": timings}
+
+    def reset(self) -> None:
+        """Clear all counters and timings."""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+# Global metrics instance
+metrics = MetricsRegistry()
@@ -0,0 +1,137 @@
+"""Token-budgeted packing of prompt sections (context, history, patient data)."""
+
+import re
+from typing import Any, Optional
+
+from app.core.tokens import count_tokens, count_tokens_batch
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def sentence_spans(text: str) -> list[tuple[int, int]]:
+    """(start, end) of each sentence (or line, which often holds a list item or lab row)."""
+    spans = []
+    start = 0
+    for m in [*_SENTENCE_SPLIT.finditer(text), None]:
+        end = m.start() if m else len(text)
+        piece = text[start:end]
+        if piece.strip():
+            lead = len(piece) - len(piece.lstrip())
+            spans.append((start + lead, start + len(piece.rstrip())))
+        if m:
+            start = m.end()
+    return spans
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split text into sentences (and lines, which often hold list items or lab rows)."""
+    return [text[start:end] for start, end in sentence_spans(text)]
+
+
+def trim_to_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """Keep as many whole sentences as fit in max_tokens (leading ones, or trailing with keep_end).
+
+    If not even one sentence fits, that sentence is cut at a word boundary.
+    """
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    spans = sentence_spans(text)
+    if keep_end:
+        spans.reverse()
+    sentences = [text[start:end] for start, end in spans]
+    kept: list[str] = []
+    used = 0
+    # The separator (space or newline) usually merges into the next token, so no separator cost
+    for sentence, tokens in zip(sentences, count_tokens_batch(sentences)):
+        if used + tokens > max_tokens:
+            break
+        kept.append(sentence)
+        used += tokens
+
+    if not kept:
+        words = sentences[0].split()
+        if keep_end:
+            words.reverse()
+        for word in words:
+            tokens = count_tokens(word) + 1
+            if used + tokens > max_tokens - 1:
+                break
+            kept.append(word)
+            used += tokens
+        if keep_end:
+            kept.reverse()
+            return "… " + " ".join(kept)
+        return " ".join(kept) + " …"
+
+    # Slice the source so the kept sentences keep their original separators (e.g. one lab per line)
+    first, last = spans[0], spans[len(kept) - 1]
+    if keep_end:
+        return text[last[0]:first[1]]
+    return text[first[0]:last[1]]
+
+
+def _chunk_header(index: int, chunk: dict[str, Any]) -> str:
+    parts = [chunk.get("title") or "Untitled"]
+    if chunk.get("section_heading"):
+        parts.append(chunk["section_heading"])
+    if chunk.get("url"):
+        parts.append(chunk["url"])
+    return f"[Ref {index}] " + " | ".join(parts)
+
+
+def pack_context(
+    chunks: list[dict[str, Any]], budget: int, chunk_max_tokens: int
+) -> tuple[str, int, list[dict[str, Any]]]:
+    """Fill the context budget greedily, best (rerank) score first.
+
+    Each chunk is capped at chunk_max_tokens and trimmed at sentence boundaries.
+    Returns (block, tokens used, included chunks); included[i] is "[Ref i+1]".
+    """
+    ranked = sorted(
+        chunks, key=lambda c: c.get("rerank_score", c.get("score")) or 0.0, reverse=True
+    )
+    blocks: list[str] = []
+    included: list[dict[str, Any]] = []
+    used = 0
+    for chunk in ranked:
+        header = _chunk_header(len(blocks) + 1, chunk)
+        header_tokens = count_tokens(header) + 1
+        room = min(chunk_max_tokens, budget - used - header_tokens)
+        if room < 20:
+            # Not worth including a fragment; a later (shorter) chunk may still fit
+            continue
+        excerpt = trim_to_tokens(chunk.get("text", ""), room)
+        if not excerpt:
+            continue
+        block = f"{header}\n{excerpt}"
+        blocks.append(block)
+        included.append(chunk)
+        used += header_tokens + count_tokens(excerpt) + 1
+    return "\n\n".join(blocks), used, included
+
+
+def pack_history(history: Optional[list[dict[str, str]]], budget: int) -> tuple[str, int, int]:
+    """Keep the most recent turns that fit the budget, in chronological order.
+
+    The newest turn is trimmed (keeping its end) rather than dropped if it is too long.
+    Returns (block, tokens used, turns included).
+    """
+    lines: list[str] = []
+    used = 0
+    for turn in reversed(history or []):
+        line = f"{turn.get('role', 'user')}: {turn.get('content', '')}"
+        tokens = count_tokens(line) + 1
+        if used + tokens > budget:
+            if not lines:
+                line = trim_to_tokens(line, budget - 1, keep_end=True)
+                if line:
+                    lines.append(line)
+                    used += count_tokens(line) + 1
+            break
+        lines.append(line)
+        used += tokens
+    lines.reverse()
+    return "\n".join(lines), used, len(lines)
@@ -1,76 +1,34 @@
 """Prompt templates for RAG generation."""
 
-import json
+from dataclasses import dataclass, field
 from typing import Any, Optional
 
+from app.core.config import settings
+from app.core.prompt_packer import pack_context, pack_history, trim_to_tokens
 from app.core.schemas import VectorChunk
+from app.core.tokens import count_tokens
 
 
-def build_rag_prompt(
-    chunks: list[dict[str, Any]],
-    user_query: str,
-    history: Optional[list[dict[str, str]]] = None,
-    summary: Optional[str] = None,
-    patient_context: Optional[str] = None,
-    style_instruction: str = "",
-    response_mode: str = "detailed",
-) -> str:
-    """Build RAG prompt with context chunks, patient data, and optional conversation history."""
-    # Format chunks as JSONL
-    ctx_lines = []
-    for chunk in chunks:
-        ctx_obj = {
-            "url": chunk.get("url", ""),
-            "title": chunk.get("title", ""),
-            "section_heading": chunk.get("section_heading"),
-            "char_start": chunk.get("char_start", 0),
-            "char_end": chunk.get("char_end", 0),
-            "excerpt": chunk.get("text", "")[:500],
-        }
-        ctx_lines.append(json.dumps(ctx_obj))
-
-    ctx_block = "\n".join(ctx_lines)
-
-    history_lines = []
-    if history:
-        # Use up to last 10 turns for better memory
-        recent = history[-10:]
-        for turn in recent:
-            role = turn.get("role", "user")
-            content = turn.get("content", "")
-            history_lines.append(f"{role}: {content}")
-    history_block = "\n".join(history_lines)
-
-    summary_block = summary or ""
+@dataclass
+class PackedPrompt:
+    """A RAG prompt plus the token count of each section.
 
-    prompt = f"""
-You are an advanced, evidence-based Clinical Decision Support Engine. 
-
-=== UPLOADED PATIENT DATA / CONTEXT ===
-{patient_context if patient_context else "No patient data uploaded."}
-
-=== MEDICAL KNOWLEDGE BASE CONTEXT (GUIDELINES) ===
-{ctx_block}
+    chunks are the knowledge base chunks in the prompt, in "[Ref N]" order.
+    """
 
-=== CONVERSATION HISTORY (Most recent at bottom) ===
-{history_block}
-
-=== CONVERSATION SUMMARY ===
-{summary_block}
+    text: str
+    token_counts: dict[str, int] = field(default_factory=dict)
+    chunks: list[dict[str, Any]] = field(default_factory=list)
 
-=== CLINICIAN QUESTION ===
-{user_query}
 
-CRITICAL REASONING INSTRUCTIONS:
+_REASONING_INSTRUCTIONS = """CRITICAL REASONING INSTRUCTIONS:
 1. Act as a highly trained physician consultant. You are answering a colleague.
 2. If PATIENT DATA is provided, you MUST analyze it specifically. Pay close attention to any tags labeled (FLAG: High/Low/Critical).
 3. If MEDICAL KNOWLEDGE BASE CONTEXT is relevant to the question or the patient data, strictly ground your reasoning in it. Do not invent medical guidelines.
 4. Maintain logical consistency with the CONVERSATION HISTORY. If the clinician is asking a 10th follow-up question about the same lab result, remember your previous conclusions.
 """
 
-    if response_mode in ["medium", "detailed"]:
-        prompt += f"""
-REQUIRED RESPONSE STRUCTURE:
+_RESPONSE_STRUCTURE = """REQUIRED RESPONSE STRUCTURE:
 You must format your response EXACTLY using the following markdown headers. Do not deviate.
 
 ### 🧠 Clinical Interpretation
@@ -85,13 +43,164 @@ You must format your response EXACTLY using the following markdown headers. Do n
 ### 📋 Actionable Next Steps
 (Provide 2-4 practical, concrete next steps for the clinician. What should they order, prescribe, or monitor next?)
 
-RESPOND ONLY WITH THE SECTIONS ABOVE.
+RESPOND ONLY WITH THE SECTIONS {where}.
+"""
+
+
+def _render_rag_prompt(
+    patient_block: str,
+    ctx_block: str,
+    history_block: str,
+    summary_block: str,
+    user_query: str,
+    style_instruction: str,
+    response_mode: str,
+    layout: str = "cache_friendly",
+) -> str:
+    structured = response_mode in ["medium", "detailed"]
+
+    if layout == "cache_friendly":
+        # Most static first, so provider prefix/KV caches can reuse the instructions
+        # across requests; the question, which changes every time, goes last.
+        prompt = "\nYou are an advanced, evidence-based Clinical Decision Support Engine. \n\n"
+        prompt += _REASONING_INSTRUCTIONS
+        if structured:
+            prompt += "\n" + _RESPONSE_STRUCTURE.format(where="LISTED IN THIS STRUCTURE")
+        prompt += f"\n{style_instruction}\n"
+        prompt += f"""
+=== UPLOADED PATIENT DATA / CONTEXT ===
+{patient_block}
+
+=== CONVERSATION SUMMARY ===
+{summary_block}
+
+=== CONVERSATION HISTORY (Most recent at bottom) ===
+{history_block}
+
+=== MEDICAL KNOWLEDGE BASE CONTEXT (GUIDELINES) ===
+{ctx_block}
+
+=== CLINICIAN QUESTION ===
+{user_query}
 """
+        return prompt
+
+    prompt = f"""
+You are an advanced, evidence-based Clinical Decision Support Engine. 
+
+=== UPLOADED PATIENT DATA / CONTEXT ===
+{patient_block}
+
+=== MEDICAL KNOWLEDGE BASE CONTEXT (GUIDELINES) ===
+{ctx_block}
+
+=== CONVERSATION HISTORY (Most recent at bottom) ===
+{history_block}
+
+=== CONVERSATION SUMMARY ===
+{summary_block}
+
+=== CLINICIAN QUESTION ===
+{user_query}
+
+{_REASONING_INSTRUCTIONS}"""
+
+    if structured:
+        prompt += "\n" + _RESPONSE_STRUCTURE.format(where="ABOVE")
 
     prompt += f"\n{style_instruction}\n"
     return prompt
 
 
+def pack_rag_prompt(
+    chunks: list[dict[str, Any]],
+    user_query: str,
+    history: Optional[list[dict[str, str]]] = None,
+    summary: Optional[str] = None,
+    patient_context: Optional[str] = None,
+    style_instruction: str = "",
+    response_mode: str = "detailed",
+    max_tokens: Optional[int] = None,
+    layout: Optional[str] = None,
+    patient_tokens: Optional[int] = None,
+) -> PackedPrompt:
+    """Build the RAG prompt within per-section token budgets.
+
+    Instructions and the question are always included. Patient data, summary
+    and history are trimmed to their own budgets; knowledge base context gets
+    whatever remains of max_tokens, up to prompt_context_tokens, filled best
+    chunk first. layout is "cache_friendly" (static instructions first) or
+    "legacy" (instructions after the question); defaults to settings.prompt_layout.
+    patient_tokens is the known token count of patient_context, if the caller has one.
+    """
+    max_tokens = max_tokens or settings.prompt_max_tokens
+    layout = layout or settings.prompt_layout
+    fixed = count_tokens(
+        _render_rag_prompt("", "", "", "", user_query, style_instruction, response_mode, layout)
+    )
+
+    if patient_context and patient_tokens is not None and patient_tokens <= settings.prompt_patient_tokens:
+        patient_block = patient_context
+    else:
+        patient_block = (
+            trim_to_tokens(patient_context, settings.prompt_patient_tokens)
+            if patient_context
+            else "No patient data uploaded."
+        )
+        patient_tokens = count_tokens(patient_block)
+    summary_block = trim_to_tokens(summary or "", settings.prompt_summary_tokens, keep_end=True)
+    summary_tokens = count_tokens(summary_block)
+    history_block, history_tokens, turns = pack_history(history, settings.prompt_history_tokens)
+
+    context_budget = min(
+        settings.prompt_context_tokens,
+        max_tokens - fixed - patient_tokens - summary_tokens - history_tokens,
+    )
+    ctx_block, context_tokens, included = pack_context(
+        chunks, max(0, context_budget), settings.prompt_chunk_max_tokens
+    )
+
+    text = _render_rag_prompt(
+        patient_block,
+        ctx_block,
+        history_block,
+        summary_block,
+        user_query,
+        style_instruction,
+        response_mode,
+        layout,
+    )
+    return PackedPrompt(
+        text=text,
+        token_counts={
+            "instructions": fixed,
+            "patient": patient_tokens,
+            "summary": summary_tokens,
+            "history": history_tokens,
+            "context": context_tokens,
+            "total": count_tokens(text),
+            "chunks": len(included),
+            "turns": turns,
+        },
+        chunks=included,
+    )
+
+
+def build_rag_prompt(
+    chunks: list[dict[str, Any]],
+    user_query: str,
+    history: Optional[list[dict[str, str]]] = None,
+    summary: Optional[str] = None,
+    patient_context: Optional[str] = None,
+    style_instruction: str = "",
+    response_mode: str = "detailed",
+) -> str:
+    """Build RAG prompt with context chunks, patient data, and optional conversation history."""
+    return pack_rag_prompt(
+        chunks, user_query, history, summary, patient_context, style_instruction, response_mode
+    ).text
+
+
 def build_no_results_prompt(query: str, closest_matches: list[dict[str, Any]]) -> str:
     """Build prompt for when no results are found."""
     matches_text = ""
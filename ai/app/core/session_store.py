@@ -0,0 +1,418 @@
+"""Session storage backends: bounded in-process LRU, SQLite (WAL) and a Redis-protocol store.
+
+Sessions are serialized with orjson. The in-process store keeps live objects
+and uses the serialized size only for memory accounting. The SQLite and Redis
+stores persist the bytes, so sessions survive restarts and are shared between
+workers; callers must save_session() after mutating a session, or use
+SessionManager.update_session(), which saves with compare-and-set on the
+session's version so concurrent writers (other requests, other workers) do not
+overwrite each other.
+"""
+
+import logging
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+import orjson
+
+from app.core.config import settings
+from app.core.memory import PatientSession
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def dump_session(session: PatientSession) -> bytes:
+    """Serialize a session to compact JSON bytes."""
+    return orjson.dumps(session.model_dump())
+
+
+def load_session(data: bytes) -> PatientSession:
+    """Deserialize a session produced by dump_session."""
+    return PatientSession.model_validate(orjson.loads(data))
+
+
+class SessionStore:
+    """Base class for session stores."""
+
+    name = "base"
+
+    def get(self, session_id: str) -> Optional[PatientSession]:
+        """Return the session and refresh its idle TTL, or None if missing or expired."""
+        raise NotImplementedError
+
+    def put(self, session: PatientSession, expected_version: Optional[int] = None) -> bool:
+        """Insert or replace a session, evicting others if the store is over its limits.
+
+        Every write bumps session.version. With expected_version, the write only
+        happens if the stored session still has that version (compare-and-set);
+        returns False, without writing, if it does not or the session is gone.
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        """Remove a session if present."""
+        raise NotImplementedError
+
+    def stats(self) -> dict[str, Any]:
+        """Return the session count and bytes held, where the backend can tell."""
+        return {"backend": self.name}
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU bounded by session count and serialized bytes, with an idle TTL."""
+
+    name = "memory"
+
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 0, ttl_seconds: float = 0):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # session_id -> (session, serialized size, last access)
+        self._entries: OrderedDict[str, tuple[PatientSession, int, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _expired(self, last_access: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - last_access > self.ttl_seconds
+
+    def _pop(self, session_id: str) -> None:
+        _, size, _ = self._entries.pop(session_id)
+        self._bytes -= size
+
+    def _evict(self, now: float) -> None:
+        # Least recently used entries sit at the front, so expired ones do too
+        while self._entries:
+            oldest_id, (_, _, last_access) = next(iter(self._entries.items()))
+            over_limit = len(self._entries) > self.max_sessions or (
+                self.max_bytes > 0 and self._bytes > self.max_bytes and len(self._entries) > 1
+            )
+            if not over_limit and not self._expired(last_access, now):
+                break
+            self._pop(oldest_id)
+            metrics.increment("session.evicted")
+
+    def get(self, session_id: str) -> Optional[PatientSession]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            session, size, last_access = entry
+            if self._expired(last_access, now):
+                self._pop(session_id)
+                metrics.increment("session.evicted")
+                return None
+            self._entries[session_id] = (session, size, now)
+            self._entries.move_to_end(session_id)
+            return session
+
+    def put(self, session: PatientSession, expected_version: Optional[int] = None) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session.session_id)
+            if expected_version is not None and (
+                entry is None or entry[0].version != expected_version
+            ):
+                return False
+            session.version += 1
+            size = len(dump_session(session))
+            if entry is not None:
+                self._pop(session.session_id)
+            self._entries[session.session_id] = (session, size, now)
+            self._bytes += size
+            self._evict(now)
+        return True
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self._entries:
+                self._pop(session_id)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"backend": self.name, "sessions": len(self._entries), "bytes": self._bytes}
+
+
+class SqliteSessionStore(SessionStore):
+    """SQLite table in WAL mode, shared by all workers on one host."""
+
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        max_sessions: int = 1000,
+        max_bytes: int = 0,
+        ttl_seconds: float = 0,
+    ):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data BLOB NOT NULL, last_access REAL NOT NULL, "
+            "version INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_lru ON sessions(last_access)")
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[PatientSession]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, last_access FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                metrics.increment("session.evicted")
+                return None
+            self._conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id)
+            )
+        return load_session(row[0])
+
+    def put(self, session: PatientSession, expected_version: Optional[int] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front: the version check and write are atomic
+            version_before = session.version
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if expected_version is not None:
+                    row = self._conn.execute(
+                        "SELECT version FROM sessions WHERE session_id = ?", (session.session_id,)
+                    ).fetchone()
+                    if row is None or row[0] != expected_version:
+                        self._conn.execute("ROLLBACK")
+                        return False
+                session.version += 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, data, last_access, version) "
+                    "VALUES (?, ?, ?, ?)",
+                    (session.session_id, dump_session(session), now, session.version),
+                )
+                self._evict(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                session.version = version_before
+                raise
+        return True
+
+    def _evict(self, now: float) -> None:
+        evicted = 0
+        if self.ttl_seconds > 0:
+            evicted += self._conn.execute(
+                "DELETE FROM sessions WHERE last_access < ?", (now - self.ttl_seconds,)
+            ).rowcount
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions"
+        ).fetchone()
+        if count > self.max_sessions or (self.max_bytes > 0 and total > self.max_bytes):
+            stale = []
+            rows = self._conn.execute(
+                "SELECT session_id, LENGTH(data) FROM sessions ORDER BY last_access"
+            )
+            for session_id, size in rows:
+                if count <= 1 or (
+                    count <= self.max_sessions and (self.max_bytes <= 0 or total <= self.max_bytes)
+                ):
+                    break
+                stale.append((session_id,))
+                count -= 1
+                total -= size
+            self._conn.executemany("DELETE FROM sessions WHERE session_id = ?", stale)
+            evicted += len(stale)
+        if evicted:
+            metrics.increment("session.evicted", evicted)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions"
+            ).fetchone()
+        return {"backend": self.name, "sessions": count, "bytes": total}
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RespClient:
+    """Minimal blocking RESP2 client: one connection, one command at a time."""
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader: Any = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._roundtrip("AUTH", self.password)
+        if self.db:
+            self._roundtrip("SELECT", str(self.db))
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = None
+
+    @staticmethod
+    def _encode(*args: Any) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    def _read(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            data = self._reader.read(size + 2)
+            return data[:-2]
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._read() for _ in range(size)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def _roundtrip(self, *args: Any) -> Any:
+        self._sock.sendall(self._encode(*args))
+        return self._read()
+
+    def execute(self, *args: Any) -> Any:
+        """Send one command and return its decoded reply, reconnecting once on a dropped link."""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._roundtrip(*args)
+                except (ConnectionError, OSError):
+                    self.close()
+                    if attempt:
+                        raise
+        return None
+
+
+class RedisSessionStore(SessionStore):
+    """Sessions as Redis keys with a sliding expiry.
+
+    The server enforces the size bound: run it with maxmemory and
+    maxmemory-policy allkeys-lru (or volatile-lru).
+    """
+
+    name = "redis"
+
+    # Compare-and-set in one atomic script: write ARGV[2] only if the stored
+    # session's version is ARGV[1]; ARGV[3] is the expiry in seconds (0 = none)
+    _CAS_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current or cjson.decode(current)['version'] ~= tonumber(ARGV[1]) then
+  return 0
+end
+if tonumber(ARGV[3]) > 0 then
+  redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+else
+  redis.call('SET', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+    def __init__(self, url: str, ttl_seconds: float = 0, prefix: str = "cdss:session:"):
+        self.client = RespClient(url)
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+
+    def get(self, session_id: str) -> Optional[PatientSession]:
+        key = self.prefix + session_id
+        data = self.client.execute("GET", key)
+        if data is None:
+            return None
+        if self.ttl_seconds > 0:
+            self.client.execute("EXPIRE", key, self.ttl_seconds)
+        return load_session(data)
+
+    def put(self, session: PatientSession, expected_version: Optional[int] = None) -> bool:
+        key = self.prefix + session.session_id
+        version_before = session.version
+        session.version += 1
+        written = False
+        try:
+            if expected_version is not None:
+                written = bool(self.client.execute(
+                    "EVAL", self._CAS_SCRIPT, 1, key, expected_version, dump_session(session),
+                    self.ttl_seconds,
+                ))
+                return written
+            args: list[Any] = ["SET", key, dump_session(session)]
+            if self.ttl_seconds > 0:
+                args += ["EX", self.ttl_seconds]
+            self.client.execute(*args)
+            written = True
+            return True
+        finally:
+            # Refused or failed (e.g. connection error): the session was not saved
+            if not written:
+                session.version = version_before
+
+    def delete(self, session_id: str) -> None:
+        self.client.execute("DEL", self.prefix + session_id)
+
+
+def create_session_store() -> SessionStore:
+    """Create the session store selected by settings.session_backend."""
+    if settings.session_backend == "sqlite":
+        return SqliteSessionStore(
+            settings.session_sqlite_path,
+            max_sessions=settings.session_max_sessions,
+            max_bytes=settings.session_max_bytes,
+            ttl_seconds=settings.session_ttl_seconds,
+        )
+    if settings.session_backend == "redis":
+        return RedisSessionStore(settings.session_redis_url, ttl_seconds=settings.session_ttl_seconds)
+    return MemorySessionStore(
+        max_sessions=settings.session_max_sessions,
+        max_bytes=settings.session_max_bytes,
+        ttl_seconds=settings.session_ttl_seconds,
+    )
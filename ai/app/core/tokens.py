@@ -0,0 +1,153 @@
+"""Token counting backed by the configured model's tokenizer, with an LRU cache."""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _estimate(text: str) -> int:
+    """Rough fallback (~4 chars per token) when no tokenizer can be loaded."""
+    return (len(text) + 3) // 4
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken or a Hugging Face tokenizer.
+
+    Counts are cached by a hash of the text, so chunks that are counted at
+    ingestion, batching and prompt packing are only tokenized once per process.
+    The tokenizer loads lazily; if it cannot be loaded, counts fall back to an
+    estimate.
+    """
+
+    def __init__(self, backend: str = "tiktoken", model: str = "", cache_size: int = 50000):
+        self.backend = backend
+        self.model = model
+        self.cache_size = cache_size
+        self._tokenizer: Any = None
+        self._load_failed = backend == "estimate"
+        self._cache: OrderedDict[bytes, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self) -> Optional[Any]:
+        if self._tokenizer is None and not self._load_failed:
+            with self._lock:
+                if self._tokenizer is None and not self._load_failed:
+                    try:
+                        self._tokenizer = self._load_tokenizer()
+                    except Exception as e:
+                        self._load_failed = True
+                        logger.warning(
+                            f"Tokenizer for {self.backend}:{self.model} unavailable ({e}); "
+                            "falling back to estimated token counts"
+                        )
+        return self._tokenizer
+
+    def _load_tokenizer(self) -> Any:
+        if self.backend == "hf":
+            from transformers import AutoTokenizer
+
+            return AutoTokenizer.from_pretrained(self.model)
+
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(self.model)
+        except KeyError:
+            # Non-OpenAI (e.g. Ollama) models: a close enough proxy for budgeting
+            return tiktoken.get_encoding("o200k_base")
+
+    def _tokenize(self, texts: list[str]) -> list[int]:
+        tokenizer = self._load()
+        if tokenizer is None:
+            return [_estimate(t) for t in texts]
+        if self.backend == "hf":
+            ids = tokenizer(texts, add_special_tokens=False)["input_ids"]
+        else:
+            ids = tokenizer.encode_batch(texts, disallowed_special=())
+        return [len(i) for i in ids]
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def count(self, text: str) -> int:
+        """Count tokens in a single text."""
+        if not text:
+            return 0
+        return self.count_batch([text])[0]
+
+    def count_batch(self, texts: list[str]) -> list[int]:
+        """Count tokens for many texts, tokenizing only the uncached ones in one call."""
+        keys = [self._key(t) for t in texts]
+        counts: list[Optional[int]] = [None] * len(texts)
+        with self._lock:
+            for i, key in enumerate(keys):
+                hit = self._cache.get(key)
+                if hit is not None:
+                    self._cache.move_to_end(key)
+                    counts[i] = hit
+
+        missing = [i for i, c in enumerate(counts) if c is None]
+        if missing:
+            fresh = self._tokenize([texts[i] for i in missing])
+            with self._lock:
+                for i, n in zip(missing, fresh):
+                    counts[i] = n
+                    self._cache[keys[i]] = n
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return counts  # type: ignore[return-value]
+
+
+_counter: Optional[TokenCounter] = None
+_counter_lock = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    """Get the process-wide token counter for the configured model."""
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                _counter = TokenCounter(
+                    backend=settings.token_counter_backend,
+                    model=settings.token_counter_model or settings.openai_chat_model,
+                    cache_size=settings.token_cache_size,
+                )
+    return _counter
+
+
+_embedding_counters: dict[str, TokenCounter] = {}
+
+
+def get_embedding_token_counter(model: str) -> TokenCounter:
+    """Get a token counter for an embedding model rather than the chat model.
+
+    Hugging Face ids and local paths ("org/name") use the model's own tokenizer;
+    anything else (text-embedding-3-small, ...) goes through tiktoken.
+    """
+    with _counter_lock:
+        counter = _embedding_counters.get(model)
+        if counter is None:
+            counter = _embedding_counters[model] = TokenCounter(
+                backend="hf" if "/" in model else "tiktoken",
+                model=model,
+                cache_size=settings.token_cache_size,
+            )
+    return counter
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in text with the configured tokenizer (estimated if unavailable)."""
+    return get_token_counter().count(text)
+
+
+def count_tokens_batch(texts: list[str]) -> list[int]:
+    """Count tokens for a batch of texts with the configured tokenizer."""
+    return get_token_counter().count_batch(texts)
@@ -36,8 +36,10 @@ def compute_content_hash(content: str | bytes) -> str:
 
 
 def estimate_tokens(text: str) -> int:
-    """Estimate token count (rough approximation: ~4 chars per token)."""
-    return len(text) // 4
+    """Count tokens with the configured tokenizer (see app.core.tokens)."""
+    from app.core.tokens import count_tokens
+
+    return count_tokens(text)
 
 
 def format_iso8601(dt: Optional[datetime]) -> Optional[str]:
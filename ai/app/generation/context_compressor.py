@@ -0,0 +1,121 @@
+"""Extractive compression of reranked chunks: keep only the sentences most relevant to the query."""
+
+import logging
+import re
+from typing import Any
+
+import numpy as np
+
+from app.core.metrics import metrics
+from app.vector.embeddings import EmbeddingProvider
+
+logger = logging.getLogger(__name__)
+
+# Sentence boundaries: whitespace after terminal punctuation, or a line break
+_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+
+
+def sentence_spans(text: str) -> list[tuple[int, int]]:
+    """Return (start, end) character offsets of the non-empty sentences in text."""
+    spans = []
+    start = 0
+    for m in _BOUNDARY.finditer(text):
+        spans.append((start, m.start()))
+        start = m.end()
+    spans.append((start, len(text)))
+
+    stripped = []
+    for s, e in spans:
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if e > s:
+            stripped.append((s, e))
+    return stripped
+
+
+def compress_chunks(
+    query_embedding: np.ndarray,
+    chunks: list[dict[str, Any]],
+    embedding_provider: EmbeddingProvider,
+    target_ratio: float = 0.5,
+    min_sentences: int = 4,
+) -> list[dict[str, Any]]:
+    """Keep the best-matching sentences of each chunk, up to target_ratio of the characters.
+
+    Sentences of all chunks are embedded in one batch and scored by cosine
+    similarity to the (already computed) query embedding. Sentences are
+    selected across chunks by score, but every chunk keeps at least its best
+    sentence so its citation survives. Kept sentences stay in document order.
+
+    Returned chunks are copies with the compressed text, char_start/char_end
+    narrowed to the kept sentences, and the kept spans (absolute offsets) in
+    "compressed_spans". Chunks with at most min_sentences sentences are left as is.
+    """
+    if not chunks or target_ratio >= 1.0:
+        return chunks
+
+    spans_per_chunk = [sentence_spans(c.get("text", "")) for c in chunks]
+    candidates = [
+        (ci, si)
+        for ci, spans in enumerate(spans_per_chunk)
+        if len(spans) > min_sentences
+        for si in range(len(spans))
+    ]
+    if not candidates:
+        return chunks
+
+    texts = [chunks[ci]["text"][slice(*spans_per_chunk[ci][si])] for ci, si in candidates]
+    vectors = embedding_provider.get_embeddings(texts)
+    query = np.asarray(query_embedding, dtype=np.float32)[: vectors.shape[1]]
+    scores = (vectors @ query) / (
+        np.linalg.norm(vectors, axis=1) * max(float(np.linalg.norm(query)), 1e-12) + 1e-12
+    )
+
+    total_chars = sum(len(t) for t in texts)
+    budget = target_ratio * total_chars
+    keep: set[tuple[int, int]] = set()
+    used = 0
+
+    # Best sentence of every compressible chunk first, then the rest by score
+    order = sorted(range(len(candidates)), key=lambda k: -scores[k])
+    covered: set[int] = set()
+    for k in order:
+        ci, _ = candidates[k]
+        if ci not in covered:
+            covered.add(ci)
+            keep.add(candidates[k])
+            used += len(texts[k])
+    for k in order:
+        if used >= budget:
+            break
+        if candidates[k] not in keep:
+            keep.add(candidates[k])
+            used += len(texts[k])
+
+    compressed = []
+    for ci, chunk in enumerate(chunks):
+        spans = spans_per_chunk[ci]
+        kept = [spans[si] for si in range(len(spans)) if (ci, si) in keep]
+        if not kept:
+            compressed.append(chunk)
+            continue
+        text = chunk["text"]
+        base = chunk.get("char_start", 0) or 0
+        compressed.append(
+            {
+                **chunk,
+                "text": " ".join(text[s:e] for s, e in kept),
+                "char_start": base + kept[0][0],
+                "char_end": base + kept[-1][1],
+                "compressed_spans": [(base + s, base + e) for s, e in kept],
+            }
+        )
+
+    before = sum(len(c.get("text", "")) for c in chunks)
+    after = sum(len(c.get("text", "")) for c in compressed)
+    metrics.increment("compression.chars_in", before)
+    metrics.increment("compression.chars_out", after)
+    logger.info(f"Context compression kept {after}/{before} chars over {len(chunks)} chunks")
+    return compressed
@@ -1,11 +1,14 @@
 """LLM provider abstraction."""
 
 import logging
-from typing import Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, Optional
 
 from openai import OpenAI
 
 from app.core.config import settings
+from app.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +23,24 @@ class LLMProvider:
         """Generate text from prompt."""
         raise NotImplementedError
 
+    def generate_stream(
+        self, prompt: str, system_prompt: Optional[str] = None, **kwargs: Any
+    ) -> Iterator[str]:
+        """Yield the completion in pieces as they are generated."""
+        yield self.generate(prompt, system_prompt, **kwargs)
+
+    def generate_n(
+        self, prompt: str, n: int, system_prompt: Optional[str] = None, **kwargs: Any
+    ) -> list[str]:
+        """Generate n completions for the same prompt."""
+        return [self.generate(prompt, system_prompt, **kwargs) for _ in range(n)]
+
+    def generate_batch(
+        self, prompts: list[str], system_prompt: Optional[str] = None, **kwargs: Any
+    ) -> list[str]:
+        """Generate one completion per prompt, in order."""
+        return [self.generate(p, system_prompt, **kwargs) for p in prompts]
+
 
 class OpenAILLMProvider(LLMProvider):
     """OpenAI LLM provider."""
@@ -44,6 +65,7 @@ class OpenAILLMProvider(LLMProvider):
                 max_tokens=kwargs.get("max_tokens", 500),
             )
 
+            _record_usage(response)
             return response.choices[0].message.content.strip()
         except Exception as e:
             logger.error(f"Error generating with OpenAI: {e}")
@@ -63,31 +85,167 @@ class OllamaLLMProvider(LLMProvider):
     def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs: Any) -> str:
         """Generate text using Ollama API."""
         try:
-            full_prompt = prompt
+            # The system prompt goes in its own field so the model's template places it
+            # first, giving every request the same prefix for the server's KV cache.
+            # keep_alive keeps the model (and that cache) resident between requests.
+            options: dict[str, Any] = {
+                "temperature": kwargs.get("temperature", 0.0),
+                "num_predict": kwargs.get("max_tokens", 500),
+            }
+            if settings.ollama_num_ctx:
+                options["num_ctx"] = settings.ollama_num_ctx
+            payload: dict[str, Any] = {
+                "model": self.model_name,
+                "prompt": prompt,
+                "stream": False,
+                "keep_alive": settings.ollama_keep_alive,
+                "options": options,
+            }
             if system_prompt:
-                full_prompt = f"{system_prompt}\n\n{prompt}"
-
-            response = self.client.post(
-                "/api/generate",
-                json={
-                    "model": self.model_name,
-                    "prompt": full_prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": kwargs.get("temperature", 0.0),
-                        "num_predict": kwargs.get("max_tokens", 500),
-                    },
-                },
-            )
+                payload["system"] = system_prompt
+
+            response = self.client.post("/api/generate", json=payload)
             response.raise_for_status()
 
             result = response.json()
+            # prompt_eval_count only covers tokens not served from the prefix cache
+            metrics.increment("llm.prompt_eval_tokens", result.get("prompt_eval_count", 0))
             return result.get("response", "").strip()
         except Exception as e:
             logger.error(f"Error generating with Ollama: {e}")
             raise
 
 
+class OpenAICompatibleLLMProvider(LLMProvider):
+    """Provider for self-hosted OpenAI-compatible servers (vLLM, llama.cpp, TGI, ...).
+
+    Requests are issued concurrently (up to vllm_max_concurrency) so the server's
+    continuous batching can schedule them together; n > 1 asks the server for
+    several samples of one prompt in a single request.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        super().__init__()
+        import httpx
+
+        self.max_concurrency = max_concurrency or settings.vllm_max_concurrency
+        self.client = OpenAI(
+            base_url=base_url or settings.vllm_base_url,
+            api_key=api_key or settings.vllm_api_key,
+            timeout=timeout or settings.llm_request_timeout,
+            max_retries=settings.llm_max_retries,
+            http_client=httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                timeout=timeout or settings.llm_request_timeout,
+            ),
+        )
+        # Without a configured model the server is asked on first use, so a server
+        # that is down does not fail pipeline construction or worker boot
+        self._model = model or settings.vllm_model
+        self._model_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    @property
+    def model_name(self) -> str:
+        if not self._model:
+            with self._model_lock:
+                if not self._model:
+                    self._model = self._default_model()
+        return self._model
+
+    @model_name.setter
+    def model_name(self, value: str) -> None:
+        self._model = value
+
+    def _default_model(self) -> str:
+        models = self.client.models.list().data
+        if not models:
+            raise ValueError("OpenAI-compatible server lists no models; set VLLM_MODEL")
+        return models[0].id
+
+    @staticmethod
+    def _messages(prompt: str, system_prompt: Optional[str]) -> list[dict[str, str]]:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _create(self, prompt: str, system_prompt: Optional[str], **kwargs: Any) -> Any:
+        with self._slots:
+            response = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=self._messages(prompt, system_prompt),
+                temperature=kwargs.get("temperature", 0.0),
+                max_tokens=kwargs.get("max_tokens", 500),
+                n=kwargs.get("n", 1),
+            )
+        _record_usage(response)
+        return response
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None, **kwargs: Any) -> str:
+        """Generate text using the OpenAI-compatible chat completions endpoint."""
+        try:
+            response = self._create(prompt, system_prompt, **kwargs)
+            return (response.choices[0].message.content or "").strip()
+        except Exception as e:
+            logger.error(f"Error generating with {self.client.base_url}: {e}")
+            raise
+
+    def generate_n(
+        self, prompt: str, n: int, system_prompt: Optional[str] = None, **kwargs: Any
+    ) -> list[str]:
+        """Generate n samples of one prompt in a single request."""
+        response = self._create(prompt, system_prompt, **{**kwargs, "n": n})
+        choices = sorted(response.choices, key=lambda c: c.index)
+        return [(c.message.content or "").strip() for c in choices]
+
+    def generate_batch(
+        self, prompts: list[str], system_prompt: Optional[str] = None, **kwargs: Any
+    ) -> list[str]:
+        """Send all prompts concurrently; the server batches them. Results keep input order."""
+        if len(prompts) <= 1:
+            return [self.generate(p, system_prompt, **kwargs) for p in prompts]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(prompts))) as executor:
+            return list(executor.map(lambda p: self.generate(p, system_prompt, **kwargs), prompts))
+
+    def generate_stream(
+        self, prompt: str, system_prompt: Optional[str] = None, **kwargs: Any
+    ) -> Iterator[str]:
+        """Stream the completion as it is generated."""
+        with self._slots:
+            stream = self.client.chat.completions.create(
+                model=self.model_name,
+                messages=self._messages(prompt, system_prompt),
+                temperature=kwargs.get("temperature", 0.0),
+                max_tokens=kwargs.get("max_tokens", 500),
+                stream=True,
+            )
+            for event in stream:
+                if event.choices and event.choices[0].delta.content:
+                    yield event.choices[0].delta.content
+
+
+def _record_usage(response: Any) -> None:
+    """Count prompt tokens and how many of them hit the provider's prompt cache."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    metrics.increment("llm.prompt_tokens", usage.prompt_tokens or 0)
+    details = getattr(usage, "prompt_tokens_details", None)
+    metrics.increment("llm.cached_prompt_tokens", getattr(details, "cached_tokens", 0) or 0)
+
+
 def get_llm_provider() -> LLMProvider:
     """Get configured LLM provider."""
     if settings.llm_provider == "openai":
@@ -96,6 +254,8 @@ def get_llm_provider() -> LLMProvider:
         return OpenAILLMProvider()
     elif settings.llm_provider == "ollama":
         return OllamaLLMProvider()
+    elif settings.llm_provider == "vllm":
+        return OpenAICompatibleLLMProvider()
     else:
         raise ValueError(f"Unsupported LLM provider: {settings.llm_provider}")
 
@@ -2,6 +2,7 @@
 
 import logging
 import re
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any, Optional
 
 import numpy as np
@@ -9,20 +10,25 @@ from qdrant_client import QdrantClient
 
 from app.core.config import settings
 from app.core.constants import NO_KB_MSG
-from app.core.prompts import build_no_results_prompt, build_rag_prompt
+from app.core.metrics import metrics
+from app.core.prompts import build_no_results_prompt, pack_rag_prompt
 from app.core.security import should_add_disclaimer
 from app.core.utils import estimate_tokens
+from app.generation.context_compressor import compress_chunks
 from app.generation.llm import get_llm_provider
 from app.generation.query_rewriter import rewrite_query
 from app.generation.response_sizer import classify_query, select_response_policy
 from app.vector.embeddings import get_embedding_provider
-from app.vector.qdrant_client import get_client
-from app.vector.reranker import get_reranker
+from app.vector.qdrant_client import get_client, get_collection_info
+from app.vector.reranker import get_reranker, should_bypass_rerank
 from app.vector.optimized_reranker import get_parallel_reranker
 from app.vector.retriever import retrieve_with_cutoff
 
 logger = logging.getLogger(__name__)
 
+# Side LLM calls that can overlap with retrieval (e.g. the conversation summary)
+_summary_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-summary")
+
 
 class RAGPipeline:
     """RAG pipeline for question answering."""
@@ -39,6 +45,67 @@ class RAGPipeline:
             except Exception:
                 pass
         self.collection_name = settings.collection_name
+        # Query vectors are fitted to the collection's size (reduced-dimension indexes)
+        self.collection_vector_size = (
+            get_collection_info(self.qdrant_client, self.collection_name).get("vector_size")
+            or self.embedding_provider.vector_size
+        )
+
+    def reset_clients(self) -> None:
+        """Recreate network clients, e.g. in a forked worker that must not share connection pools."""
+        self.qdrant_client = get_client()
+        self.llm_provider = get_llm_provider()
+        reset = getattr(self.embedding_provider, "reset_client", None)
+        if reset is not None:
+            reset()
+
+    def warm_up(self) -> None:
+        """Run one embedding and one reranker forward pass so the first request is not slow.
+
+        Goes through the models directly rather than the caches, so nothing is stored.
+        """
+        provider = getattr(self.embedding_provider, "provider", self.embedding_provider)
+        provider.get_embeddings(["warm-up query"])
+
+        reranker = getattr(self.reranker, "reranker", self.reranker)
+        if reranker is not None and reranker.model is not None:
+            reranker._forward("warm-up query", ["warm-up passage"])
+
+    def _summarize_history(self, history: list[dict[str, str]]) -> str:
+        """Summarize the recent turns of a long conversation."""
+        summary_prompt = (
+            "Summarize the following chat turns into 3-6 compact bullet points capturing the main topic, entities, and clinical context. "
+            "Keep under 1200 characters. Use plain text bullets only.\n\n" +
+            "\n".join([f"{t.get('role', 'user')}: {t.get('content','')}" for t in history[-12:]])
+        )
+        return self.llm_provider.generate(
+            prompt=summary_prompt,
+            system_prompt=(
+                "You are a careful summarizer. Produce a concise, reference-friendly summary."
+            ),
+            temperature=0.0,
+            max_tokens=200,
+        )
+
+    def summarize_turns(self, summary: str, turns: list[dict[str, str]]) -> str:
+        """Update a rolling conversation summary with turns that left the history window."""
+        summary_prompt = (
+            "Update the running summary of a clinical conversation with the new chat turns below. "
+            "Return 3-6 compact bullet points capturing the main topic, entities, and clinical context. "
+            "Keep under 1200 characters. Use plain text bullets only.\n\n"
+            f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n" +
+            "\n".join([f"{t.get('role', 'user')}: {t.get('content','')}" for t in turns])
+        )
+        updated = self.llm_provider.generate(
+            prompt=summary_prompt,
+            system_prompt=(
+                "You are a careful summarizer. Produce a concise, reference-friendly summary."
+            ),
+            temperature=0.0,
+            max_tokens=200,
+        )
+        metrics.increment("summary.incremental_updates")
+        return updated.strip()
 
     def answer(
         self,
@@ -49,14 +116,27 @@ class RAGPipeline:
         cutoff: Optional[float] = None,
         history: Optional[list[dict[str, str]]] = None,
         context: Optional[str] = None,
+        summary: Optional[str] = None,
+        context_tokens: Optional[int] = None,
     ) -> dict[str, Any]:
-        """Answer a query using RAG pipeline."""
+        """Answer a query using RAG pipeline.
+
+        summary is a conversation summary kept by the caller (e.g. a session's
+        rolling summary). When it is None and history is long, one is generated
+        for this request. context_tokens is the token count of context, if known.
+        """
         try:
             # Inject patient context into query if present
             # Inject patient context into query if present
             # original_query = query
             # We no longer prepend context to query to avoid confusing the classifier/embedder
             
+            # The summary only depends on history: let the LLM work on it during retrieval
+            summary_future: Optional[Future] = None
+            if summary is None and history and len(history) > 6:
+                metrics.increment("summary.inline")
+                summary_future = _summary_executor.submit(self._summarize_history, history)
+
             # Step 0: Rewrite Query for Conversational Chaining
             rewritten_query = rewrite_query(query, history)
             # Use rewritten query for classification and retrieval
@@ -83,6 +163,7 @@ class RAGPipeline:
                 top_k=top_k,
                 cutoff=cutoff,
                 filters=filters,
+                vector_size=self.collection_vector_size,
             )
 
             if not chunks:
@@ -99,34 +180,64 @@ class RAGPipeline:
                     "response_mode": cls.get("response_mode"),
                 }
 
-            # Step 3: Optional reranking
+            # Step 3: Optional reranking (skipped when vector scores are already decisive)
             if self.reranker and len(chunks) > top_n:
-                chunks = self.reranker.rerank(query_for_retrieval, chunks, top_n=top_n)
+                bypass, bypass_stats = False, {}
+                if settings.rerank_bypass_enabled:
+                    bypass, bypass_stats = should_bypass_rerank(
+                        chunks,
+                        top_n,
+                        min_margin=settings.rerank_bypass_min_margin,
+                        max_entropy=settings.rerank_bypass_max_entropy,
+                        temperature=settings.rerank_bypass_temperature,
+                    )
+                if bypass:
+                    metrics.increment("rerank.bypassed")
+                    logger.info(
+                        "[RERANK BYPASS] margin=%.3f entropy=%.3f",
+                        bypass_stats["margin"],
+                        bypass_stats["entropy"],
+                    )
+                    chunks = sorted(chunks, key=lambda c: c.get("score") or 0.0, reverse=True)[:top_n]
+                else:
+                    metrics.increment("rerank.executed")
+                    chunks = self.reranker.rerank(query_for_retrieval, chunks, top_n=top_n)
             else:
                 chunks = chunks[:top_n]
 
-            # Step 4: Build rolling conversation summary if history is long
-            summary_text: Optional[str] = None
-            if history and len(history) > 6:
+            # Step 3b: Keep only the sentences of each chunk that best match the query
+            if settings.context_compression_enabled:
                 try:
-                    summary_prompt = (
-                        "Summarize the following chat turns into 3-6 compact bullet points capturing the main topic, entities, and clinical context. "
-                        "Keep under 1200 characters. Use plain text bullets only.\n\n" +
-                        "\n".join([f"{t.get('role', 'user')}: {t.get('content','')}" for t in history[-12:]])
-                    )
-                    summary_text = self.llm_provider.generate(
-                        prompt=summary_prompt,
-                        system_prompt=(
-                            "You are a careful summarizer. Produce a concise, reference-friendly summary."
-                        ),
-                        temperature=0.0,
-                        max_tokens=200,
+                    chunks = compress_chunks(
+                        query_embedding,
+                        chunks,
+                        self.embedding_provider,
+                        target_ratio=settings.context_compression_ratio,
+                        min_sentences=settings.context_compression_min_sentences,
                     )
+                except Exception as e:
+                    logger.warning(f"Context compression failed, using full chunks: {e}")
+
+            # Step 4: Rolling conversation summary (started before retrieval, see above)
+            summary_text: Optional[str] = summary or None
+            if summary_future is not None:
+                try:
+                    summary_text = summary_future.result()
                 except Exception:
                     summary_text = None
 
+            # Deduplicate chunks by (url, char range) keeping highest score, so each is cited once
+            unique: dict[tuple[str, int, int], dict[str, Any]] = {}
+            for chunk in chunks:
+                key = (
+                    chunk.get("url", ""), int(chunk.get("char_start", 0)), int(chunk.get("char_end", 0))
+                )
+                if key not in unique or chunk.get("score", 0.0) > unique[key].get("score", 0.0):
+                    unique[key] = chunk
+            chunks = list(unique.values())
+
             # Step 5: Build prompt (Use the modified query with context here so the LLM sees it)
-            prompt = build_rag_prompt(
+            packed = pack_rag_prompt(
                 chunks=chunks,
                 user_query=query_for_retrieval,
                 history=history,
@@ -134,7 +245,13 @@ class RAGPipeline:
                 patient_context=context,
                 style_instruction=policy.style_instruction,
                 response_mode=cls.get("response_mode", "detailed"),
+                patient_tokens=context_tokens,
             )
+            prompt = packed.text
+            metrics.increment("prompt.packed")
+            for section, tokens in packed.token_counts.items():
+                metrics.increment(f"prompt.tokens.{section}", tokens)
+            logger.info(f"Packed prompt tokens: {packed.token_counts}")
 
             # Step 6: Generate answer
             system_prompt = (
@@ -166,10 +283,10 @@ class RAGPipeline:
 
             answer_text = _strip_sources_sections(answer_text)
 
-            # Step 8: Format sources
+            # Step 8: Format sources from the chunks in the prompt, so sources[i] is "[Ref i+1]"
             sources = []
             similarities = []
-            for chunk in chunks:
+            for chunk in packed.chunks:
                 sources.append(
                     {
                         "url": chunk.get("url", ""),
@@ -183,14 +300,6 @@ class RAGPipeline:
                 )
                 similarities.append(chunk.get("score", 0.0))
 
-            # Deduplicate sources by (url, char range) keeping highest score
-            unique: dict[tuple[str, int, int], dict[str, Any]] = {}
-            for s in sources:
-                key = (s.get("url", ""), int(s.get("char_start", 0)), int(s.get("char_end", 0)))
-                if key not in unique or s.get("score", 0.0) > unique[key].get("score", 0.0):
-                    unique[key] = s
-            sources = list(unique.values())
-
             # Step 9: Determine confidence
             avg_similarity = np.mean(similarities) if similarities else 0.0
             if avg_similarity >= 0.8:
@@ -236,6 +345,7 @@ class RAGPipeline:
                 "response_policy": {"max_tokens": policy.max_tokens, "top_n": policy.top_n},
                 "classification_type": cls.get("type"),
                 "response_mode": cls.get("response_mode"),
+                "prompt_tokens": packed.token_counts,
             }
 
         except Exception as e:
@@ -255,6 +365,8 @@ class RAGPipeline:
         user_query: str,
         history: Optional[list[dict[str, str]]] = None,
         patient_context: Optional[str] = None,
+        summary: Optional[str] = None,
+        patient_context_tokens: Optional[int] = None,
     ) -> dict[str, Any]:
         """Async wrapper for answer to use in API routes."""
         import asyncio
@@ -266,7 +378,9 @@ class RAGPipeline:
             lambda: self.answer(
                 query=user_query,
                 history=history,
-                context=patient_context
+                context=patient_context,
+                summary=summary,
+                context_tokens=patient_context_tokens,
             )
         )
         
@@ -1,4 +1,6 @@
 from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable
 import re
 
 
@@ -42,8 +44,69 @@ _SCENARIO_CUES = {
 }
 
 
-def _count_cues(q: str, cues: set[str]) -> int:
-    return sum(1 for c in cues if c in q)
+_CATEGORIES = {
+    "simple": _SIMPLE_CUES,
+    "analytical": _ANALYTICAL_CUES,
+    "complex": _COMPLEX_CUES,
+    "clinical": _CLINICAL_GUIDANCE_CUES,
+    "scenario": _SCENARIO_CUES,
+}
+
+# Cues match whole words plus common inflections ("treat" -> "treatment", "symptom" -> "symptoms")
+_SUFFIX = r"(?:s|es|d|ed|ing|ment|ments)?(?!\w)"
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Build a prefix-factored alternation so the regex engine walks a trie, not every cue."""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        alts = [
+            (r"\s+" if ch == " " else re.escape(ch)) + build(child)
+            for ch, child in sorted(node.items())
+            if ch
+        ]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        # Greedy optional: prefer the longest cue, back off to a shorter one
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+def _compile_cues() -> tuple[re.Pattern, dict[str, list[str]]]:
+    """Compile every cue into one trie-shaped regex.
+
+    The match sits in a lookahead tried at each word start, so cues starting at
+    different positions may overlap. At one position only the longest cue is
+    reported; the shorter cues it implies ("treatment plan" -> "treat") are
+    precomputed.
+    """
+    cues = {c for group in _CATEGORIES.values() for c in group}
+    pattern = re.compile(r"(?<!\w)(?=(" + _trie_pattern(cues) + ")" + _SUFFIX + ")")
+    implied = {
+        cue: [other for other in cues if re.match(_trie_pattern([other]) + _SUFFIX, cue)]
+        for cue in cues
+    }
+    return pattern, implied
+
+
+_CUE_PATTERN, _IMPLIED_CUES = _compile_cues()
+
+
+@lru_cache(maxsize=4096)
+def _category_hits(q: str) -> dict[str, int]:
+    """Count distinct cues per category in a single scan of the (lowercased) query."""
+    found: set[str] = set()
+    for m in _CUE_PATTERN.finditer(q):
+        found.update(_IMPLIED_CUES[" ".join(m.group(1).split())])
+    return {name: len(found & cues) for name, cues in _CATEGORIES.items()}
 
 
 def classify_query(query: str) -> dict:
@@ -54,11 +117,12 @@ def classify_query(query: str) -> dict:
     num_questions = q.count("?")
     num_sentences = max(1, q.count(".") + q.count("?") + q.count("!"))
 
-    simple_hits = _count_cues(q, _SIMPLE_CUES)
-    analytical_hits = _count_cues(q, _ANALYTICAL_CUES)
-    complex_hits = _count_cues(q, _COMPLEX_CUES)
-    clinical_hits = _count_cues(q, _CLINICAL_GUIDANCE_CUES)
-    scenario_hits = _count_cues(q, _SCENARIO_CUES)
+    hits = _category_hits(q)
+    simple_hits = hits["simple"]
+    analytical_hits = hits["analytical"]
+    complex_hits = hits["complex"]
+    clinical_hits = hits["clinical"]
+    scenario_hits = hits["scenario"]
 
     # 1. Complex Clinical Scenario / Case Study
     if scenario_hits >= 1 or (clinical_hits >= 1 and complex_hits >= 1):
@@ -120,3 +184,8 @@ def classify_query(query: str) -> dict:
 def select_response_policy(query: str) -> ResponsePolicy:
     """Backward-compatible API: returns the policy only."""
     return classify_query(query)["policy"]
+
+
+def classify_queries(queries: Iterable[str]) -> list[dict]:
+    """Batch API (e.g. for the eval harness): classify each query in order."""
+    return [classify_query(q) for q in queries]
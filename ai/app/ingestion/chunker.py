@@ -1,5 +1,6 @@
 """Text chunking with section awareness and overlap."""
 
+import bisect
 import hashlib
 import logging
 import re
@@ -12,6 +13,7 @@ from app.core.constants import (
     DEFAULT_CHUNK_MIN,
     DEFAULT_OVERLAP_RATIO,
 )
+from app.core.tokens import count_tokens_batch
 from app.core.utils import compute_content_hash
 from app.ingestion.models import Chunk, ContentType, CrawledPage
 
@@ -138,6 +140,14 @@ def chunk_by_sliding_window(
     return chunks
 
 
+def page_number_at(page_spans: Optional[list[tuple[int, int, int]]], offset: int) -> Optional[int]:
+    """Return the PDF page containing a character offset (the next page if it falls between pages)."""
+    if not page_spans:
+        return None
+    i = bisect.bisect_right([end for _, _, end in page_spans], offset)
+    return page_spans[min(i, len(page_spans) - 1)][0]
+
+
 def chunk_page(page: CrawledPage, chunk_order_start: int = 0) -> list[Chunk]:
     """Chunk a crawled page into smaller pieces."""
     text = page.cleaned_text
@@ -185,11 +195,16 @@ def chunk_page(page: CrawledPage, chunk_order_start: int = 0) -> list[Chunk]:
             crawl_timestamp=page.crawl_timestamp,
             content_type=page.content_type,
             raw_html_snippet=raw_html_snippet,
-            page_number=None,  # Would be set for PDFs
+            page_number=page_number_at(page.page_spans, char_start),
         )
 
         chunks.append(chunk)
 
+    # Windows are sized in characters (DEFAULT_CHUNK_MAX); token counts are recorded
+    # for batching and prompt packing but do not drive chunk boundaries
+    for chunk, tokens in zip(chunks, count_tokens_batch([c.chunk_text for c in chunks])):
+        chunk.token_count = tokens
+
     logger.info(f"Created {len(chunks)} chunks from {page.url}")
     return chunks
 
@@ -3,12 +3,61 @@
 import json
 import logging
 import re
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional
 
+from app.core.config import settings
+from app.core.metrics import metrics
 from app.generation.llm import get_llm_provider
+from app.ingestion.lab_extractor import canonical_lab_name, extract_demographics, extract_labs
 
 logger = logging.getLogger(__name__)
 
+# Converters from other reported units into the reference_ranges unit, keyed by
+# (reference key, normalized unit); labs in any other unit are not flagged
+_UNIT_CONVERSIONS: Dict[tuple[str, str], Callable[[float], float]] = {
+    ("glucose", "mmol/l"): lambda v: v * 18.016,
+    ("hba1c", "mmol/mol"): lambda v: v / 10.929 + 2.15,
+    ("hemoglobin", "g/l"): lambda v: v / 10,
+    ("wbc", "k/ul"): lambda v: v,
+    ("wbc", "10^3/ul"): lambda v: v,
+    ("wbc", "/ul"): lambda v: v / 1000,
+    ("platelets", "k/ul"): lambda v: v,
+    ("platelets", "10^3/ul"): lambda v: v,
+    ("platelets", "/ul"): lambda v: v / 1000,
+    ("sodium", "mmol/l"): lambda v: v,
+    ("potassium", "mmol/l"): lambda v: v,
+    ("creatinine", "umol/l"): lambda v: v / 88.4,
+    ("bun", "mmol/l"): lambda v: v * 2.801,
+    ("troponin", "ng/l"): lambda v: v / 1000,
+    ("troponin", "pg/ml"): lambda v: v / 1000,
+}
+
+
+def _normalize_unit(unit: Optional[str]) -> str:
+    """Lowercase a unit without spaces or a leading "x", e.g. "x 10^9/L" -> "10^9/l"."""
+    return re.sub(r"\s+", "", unit or "").lower().replace("µ", "u").lstrip("x")
+
+
+# Output schema per field; only fields the rules did not resolve are requested from the LLM
+# (labs always are: the rules only know the panels in LAB_ALIASES)
+_SCHEMA_FIELDS: Dict[str, str] = {
+    "demographics": """    "demographics": {
+        "age": (integer or null),
+        "gender": (string or null)
+    }""",
+    "active_problems": """    "active_problems": [(array of strings)]""",
+    "medications": """    "medications": [(array of strings)]""",
+    "allergies": """    "allergies": [(array of strings)]""",
+    "labs": """    "labs": [
+        {
+            "test_name": (string, e.g., "Glucose", "Hemoglobin"),
+            "value": (float or string),
+            "unit": (string or null)
+        }
+    ]""",
+    "unstructured_narrative": """    "unstructured_narrative": (string, a brief 2-3 sentence summary of the history and physical context found in the doc)""",
+}
+
 
 class ClinicalParser:
     """Parses raw clinical text into structured patient data."""
@@ -32,30 +81,35 @@ class ClinicalParser:
 
     def parse_document(self, text: str) -> Dict[str, Any]:
         """
-        Extract structured demographics, diagnoses, meds, labs, and history
-        using an LLM to parse the raw OCR/PDF text.
+        Extract structured demographics, diagnoses, meds, labs, and history.
+        Labs and demographics come from the deterministic rules (whole document)
+        where they resolve; the LLM fills the narrative and everything else, and
+        adds the labs the rules do not cover.
         """
+        ruled: Dict[str, Any] = {}
+        rule_labs: List[Dict[str, Any]] = []
+        demographics: Dict[str, Any] = {"age": None, "gender": None}
+        if settings.clinical_rules_enabled:
+            rule_labs = extract_labs(text)
+            demographics = extract_demographics(text)
+            if all(v is not None for v in demographics.values()):
+                ruled["demographics"] = demographics
+            metrics.increment("clinical_parser.rule_labs", len(rule_labs))
+        llm_fields = [field for field in _SCHEMA_FIELDS if field not in ruled]
+        metrics.increment("clinical_parser.llm_fields", len(llm_fields))
+
+        schema_fields = dict(_SCHEMA_FIELDS)
+        if rule_labs:
+            found = ", ".join(dict.fromkeys(lab["test_name"] for lab in rule_labs))
+            schema_fields["labs"] += f"  (only tests other than: {found})"
+        schema = ",\n".join(schema_fields[field] for field in llm_fields)
         prompt = f"""
 You are an expert Clinical Data Extractor. Extract the following information from the provided raw clinical document text.
 Return ONLY a valid JSON object with the exact schema below. If a field is missing, use null or an empty array [].
 
 SCHEMA:
 {{
-    "demographics": {{
-        "age": (integer or null),
-        "gender": (string or null)
-    }},
-    "active_problems": [(array of strings)],
-    "medications": [(array of strings)],
-    "allergies": [(array of strings)],
-    "labs": [
-        {{
-            "test_name": (string, e.g., "Glucose", "Hemoglobin"),
-            "value": (float or string),
-            "unit": (string or null)
-        }}
-    ],
-    "unstructured_narrative": (string, a brief 2-3 sentence summary of the history and physical context found in the doc)
+{schema}
 }}
 
 RAW CLINICAL TEXT TO PARSE:
@@ -79,15 +133,11 @@ RAW CLINICAL TEXT TO PARSE:
                 cleaned_response = cleaned_response[:-3]
                 
             data = json.loads(cleaned_response)
-            
-            # Post-process: Flag abnormal labs
-            data["labs"] = self._detect_abnormal_labs(data.get("labs", []))
-            return data
 
         except Exception as e:
             logger.error(f"Failed to parse clinical document: {e}")
-            # Fallback to stuffing everything in narrative
-            return {
+            # Fallback to stuffing everything in narrative (rule-extracted fields are kept)
+            data = {
                 "demographics": {"age": None, "gender": None},
                 "active_problems": [],
                 "medications": [],
@@ -96,6 +146,34 @@ RAW CLINICAL TEXT TO PARSE:
                 "unstructured_narrative": "Failed to parse document structurally. Raw content:\n" + text[:2000]
             }
 
+        # Rules win where they resolved a field; partially found demographics fill LLM gaps
+        if "demographics" not in ruled:
+            llm_demographics = data.get("demographics") or {}
+            data["demographics"] = {
+                key: value if value is not None else llm_demographics.get(key)
+                for key, value in demographics.items()
+            }
+        data.update(ruled)
+        data["labs"] = self._merge_labs(rule_labs, data.get("labs") or [])
+
+        # Post-process: Flag abnormal labs
+        data["labs"] = self._detect_abnormal_labs(data["labs"])
+        return data
+
+    @staticmethod
+    def _merge_labs(
+        rule_labs: List[Dict[str, Any]], llm_labs: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Rule labs plus the LLM labs for other tests; rules win when both name a test."""
+        covered = {lab["test_name"] for lab in rule_labs}
+        merged = list(rule_labs)
+        for lab in llm_labs:
+            if not isinstance(lab, dict) or not lab.get("test_name"):
+                continue
+            if canonical_lab_name(str(lab["test_name"])) not in covered:
+                merged.append(lab)
+        return merged
+
     def _detect_abnormal_labs(self, labs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Add flag to labs that fall outside generic reference ranges."""
         processed_labs = []
@@ -122,6 +200,13 @@ RAW CLINICAL TEXT TO PARSE:
                         
                 if matched_key:
                     ref = self.reference_ranges[matched_key]
+                    unit = _normalize_unit(lab.get("unit"))
+                    if unit and unit != _normalize_unit(ref["unit"]):
+                        convert = _UNIT_CONVERSIONS.get((matched_key, unit))
+                        if convert is None:
+                            processed_labs.append(lab)
+                            continue
+                        num_val = convert(num_val)
                     if num_val < ref["min"]:
                         lab["flag"] = "Low"
                         lab["reference_range"] = f"{ref['min']}-{ref['max']} {ref['unit']}"
@@ -0,0 +1,141 @@
+"""Document text extraction (PDF parsing, OCR) in a bounded process pool."""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class UnsupportedDocumentError(ValueError):
+    """Raised for content types that cannot be extracted."""
+
+
+def is_supported(content_type: Optional[str]) -> bool:
+    """Check whether a document of this content type can be extracted."""
+    return content_type == "application/pdf" or bool(content_type and content_type.startswith("image/"))
+
+
+def extract_document(
+    content: bytes, content_type: str, ocr_timeout: float = 0, ocr_workers: Optional[int] = None
+) -> tuple[str, dict]:
+    """Extract raw text and metadata from a PDF or an image (runs in a pool worker).
+
+    ocr_timeout bounds the tesseract subprocess so a stuck OCR job cannot hold
+    a worker forever (0 = no limit). ocr_workers caps the tesseract processes
+    one scanned PDF may run at once.
+    """
+    if content_type == "application/pdf":
+        from app.ingestion.parse_pdf import extract_pdf_text
+
+        return extract_pdf_text(content, ocr_workers=ocr_workers)
+    if content_type and content_type.startswith("image/"):
+        import pytesseract
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(content))
+        text = pytesseract.image_to_string(image, timeout=ocr_timeout)
+        return text, {"source": "ocr", "format": content_type}
+    raise UnsupportedDocumentError(f"Unsupported content type: {content_type}")
+
+
+class ExtractionPool:
+    """Runs extract_document in worker processes, keeping CPU-bound OCR off the event loop.
+
+    At most max_concurrency documents are admitted at once (more wait for a
+    slot); admitted documents then wait for one of max_workers processes. The
+    timeout clock starts when a worker picks the document up, so queueing does
+    not count against it. Each worker is its own single-process executor, and
+    a worker that times out or crashes is killed and replaced, so a runaway job
+    cannot keep a CPU busy past its timeout.
+    """
+
+    def __init__(self, max_workers: int = 2, max_concurrency: int = 4, timeout: float = 120.0):
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # Idle workers; a None entry is a worker not started yet (or replaced after a kill)
+        self._idle: deque[Optional[ProcessPoolExecutor]] = deque([None] * max_workers)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._workers: Optional[asyncio.Semaphore] = None
+        # Every worker may OCR a scan at once: share the CPUs instead of each taking all of them
+        self.ocr_workers = settings.pdf_ocr_workers or max(1, (os.cpu_count() or 1) // max_workers)
+
+    @staticmethod
+    def _new_worker() -> ProcessPoolExecutor:
+        # spawn: don't fork a parent that holds model weights and threads
+        return ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+    @staticmethod
+    def _kill(worker: ProcessPoolExecutor) -> None:
+        # ProcessPoolExecutor cannot cancel a running task; terminate its process instead.
+        # _processes is private (a pid -> Process dict); verified against CPython 3.11
+        for process in list((worker._processes or {}).values()):
+            process.terminate()
+        worker.shutdown(wait=False, cancel_futures=True)
+
+    async def extract(self, content: bytes, content_type: str) -> tuple[str, dict]:
+        """Extract a document in the pool; raises asyncio.TimeoutError past the job timeout."""
+        if not is_supported(content_type):
+            raise UnsupportedDocumentError(f"Unsupported content type: {content_type}")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._workers = asyncio.Semaphore(self.max_workers)
+
+        loop = asyncio.get_running_loop()
+        async with self._slots, self._workers:
+            # Holding a worker permit guarantees an idle worker
+            worker = self._idle.popleft() or self._new_worker()
+            t0 = time.perf_counter()
+            try:
+                future = loop.run_in_executor(
+                    worker, extract_document, content, content_type, self.timeout, self.ocr_workers
+                )
+                return await asyncio.wait_for(future, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                metrics.increment("extraction.timeouts")
+                logger.warning(f"Extraction of {content_type} timed out after {self.timeout}s")
+                self._kill(worker)
+                worker = None
+                raise
+            except (asyncio.CancelledError, BrokenProcessPool):
+                # Cancelled (client gone, job cancelled): the process is still running the
+                # task, so returning it to the idle queue would make the next job wait on it
+                self._kill(worker)
+                worker = None
+                raise
+            finally:
+                metrics.observe("extraction.document", time.perf_counter() - t0)
+                self._idle.append(worker)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        for worker in self._idle:
+            if worker is not None:
+                worker.shutdown(wait=False, cancel_futures=True)
+        self._idle = deque([None] * self.max_workers)
+
+
+_pool: Optional[ExtractionPool] = None
+
+
+def get_extraction_pool() -> ExtractionPool:
+    """Get the process-wide extraction pool."""
+    global _pool
+    if _pool is None:
+        _pool = ExtractionPool(
+            max_workers=settings.extraction_workers,
+            max_concurrency=settings.extraction_max_concurrency,
+            timeout=settings.extraction_timeout,
+        )
+    return _pool
@@ -0,0 +1,190 @@
+"""Deterministic extraction of lab results and demographics from clinical text.
+
+Runs before the LLM in ClinicalParser: common lab panels, units, age and sex
+are matched with compiled patterns over the whole document, so the LLM is only
+asked for the narrative and whatever the rules could not resolve.
+"""
+
+import re
+from typing import Any, Optional
+
+# Display name -> aliases as written in reports. Display names contain the
+# ClinicalParser.reference_ranges key where one exists.
+LAB_ALIASES: dict[str, list[str]] = {
+    "HbA1c": ["hemoglobin a1c", "haemoglobin a1c", "glycated hemoglobin", "hba1c", "a1c"],
+    "Glucose": ["blood glucose", "fasting glucose", "glucose", "blood sugar"],
+    "Hemoglobin": ["hemoglobin", "haemoglobin", "hgb"],
+    "Hematocrit": ["hematocrit", "haematocrit", "hct"],
+    "WBC": ["white blood cells", "white blood cell count", "white cell count", "wbc"],
+    "Platelets": ["platelet count", "platelets", "plt"],
+    "Sodium": ["sodium"],
+    "Potassium": ["potassium"],
+    "Chloride": ["chloride"],
+    "Bicarbonate": ["bicarbonate", "hco3", "co2"],
+    "BUN": ["blood urea nitrogen", "urea nitrogen", "bun"],
+    "Creatinine": ["serum creatinine", "creatinine"],
+    "eGFR": ["egfr"],
+    "Calcium": ["calcium"],
+    "Magnesium": ["magnesium"],
+    "Albumin": ["albumin"],
+    "ALT": ["alt", "alanine aminotransferase"],
+    "AST": ["ast", "aspartate aminotransferase"],
+    "Bilirubin": ["total bilirubin", "bilirubin"],
+    "INR": ["inr"],
+    "Troponin T": ["troponin t", "hs-troponin t", "tnt"],
+    "Troponin I": ["troponin i", "hs-troponin i", "tni"],
+    "Troponin": ["high-sensitivity troponin", "hs-troponin", "troponin"],
+    "BNP": ["nt-probnp", "bnp"],
+    "Lactate": ["lactate", "lactic acid"],
+    "TSH": ["tsh"],
+    "LDL": ["ldl cholesterol", "ldl-c", "ldl"],
+    "HDL": ["hdl cholesterol", "hdl-c", "hdl"],
+    "Total Cholesterol": ["total cholesterol"],
+    "Triglycerides": ["triglycerides"],
+    "CRP": ["c-reactive protein", "crp"],
+}
+
+# Abbreviations that are also common words or letters: only trusted with an explicit ":" or "="
+SHORT_ALIASES: dict[str, list[str]] = {
+    "Sodium": ["na"],
+    "Potassium": ["k"],
+    "Creatinine": ["cr", "scr"],
+    "Hemoglobin": ["hb"],
+    "Chloride": ["cl"],
+}
+
+UNITS = [
+    "mL/min/1.73m2", "mL/min/1.73 m2", "mL/min",
+    "mg/dL", "mg/L", "g/dL", "g/L", "mmol/L", "mEq/L", "umol/L", "µmol/L", "mmol/mol",
+    "ng/mL", "ng/L", "pg/mL", "mIU/L", "uIU/mL", "U/L", "IU/L",
+    "x10^9/L", "x 10^9/L", "10^9/L", "x10^3/uL", "10^3/uL", "K/uL", "/uL", "%", "sec",
+]
+
+
+def _alternation(words: list[str]) -> str:
+    # Longest first so "troponin t" wins over "troponin" and "hemoglobin a1c" over "hemoglobin"
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+def _compile_lab_pattern() -> tuple[re.Pattern, dict[str, str]]:
+    canonical = {a: name for name, aliases in LAB_ALIASES.items() for a in aliases}
+    short = {a: name for name, aliases in SHORT_ALIASES.items() for a in aliases}
+    canonical.update(short)
+    pattern = re.compile(
+        r"(?<![\w-])(?:"
+        rf"(?P<name>{_alternation(list(canonical.keys() - short.keys()))})"
+        rf"(?![\w-])[^\S\n]*(?:\((?:(?P<unit_in_name>{_alternation(UNITS)})|[^)\n]{{0,40}})\)[^\S\n]*)?[:=]?"
+        rf"|(?P<short>{_alternation(list(short))})(?![\w-])[^\S\n]*[:=]"
+        r")[^\S\n]*"
+        r"(?P<value>[<>]=?[^\S\n]*\d+(?:\.\d+)?|\d+(?:\.\d+)?)(?!\.?\d|/|-\d)"
+        rf"(?:[^\S\n]*(?P<unit>{_alternation(UNITS)})(?![\w/]))?",
+        re.IGNORECASE,
+    )
+    return pattern, canonical
+
+
+_LAB_PATTERN, _CANONICAL = _compile_lab_pattern()
+
+# A unitless number followed by a dose unit, route or frequency is a medication dose, not a result
+_DOSE_AFTER = re.compile(
+    r"[^\S\n]*(?:mg|mcg|µg|ug|g|meq|mmol|units?|iu|ml|tabs?|tablets?|caps?|capsules?|puffs?"
+    r"|iv|po|im|sc|sq|sl|pr|bid|tid|qid|qd|qhs|prn|daily|q\d+h)(?!\w)",
+    re.IGNORECASE,
+)
+# "Medications:", "DISCHARGE MEDICATIONS:", "Home meds:" (but not "Allergies to medications:").
+# With text after the colon the section is that line; otherwise it runs to the next section end.
+_MEDICATION_HEADING = re.compile(
+    r"^[^\S\n]*(?![^\n:]*\ballerg)(?:[A-Za-z]+[^\S\n]+){0,3}(?:medications?|meds)\b[^\n:]{0,40}:"
+    r"(?P<inline>[^\S\n]*\S)?",
+    re.IGNORECASE | re.MULTILINE,
+)
+# A blank line, or a line starting with any "Heading:" (inline content after it or not)
+_SECTION_END = re.compile(r"\n[^\S\n]*\n|\n[^\S\n]*[A-Za-z][^\n:]{0,60}:")
+
+_AGE_PATTERNS = [
+    re.compile(r"\bage[^\S\n]*[:=][^\S\n]*(\d{1,3})\b", re.IGNORECASE),
+    re.compile(r"\b(\d{1,3})[- ](?:year|yr)s?[- ]old\b", re.IGNORECASE),
+    re.compile(r"\b(\d{1,3})[^\S\n]*(?:yo|y/o|y\.o\.)(?!\w)", re.IGNORECASE),
+]
+_SEX_PATTERNS = [
+    re.compile(r"\b(?:gender|sex)[^\S\n]*[:=][^\S\n]*(male|female|man|woman|m|f)\b", re.IGNORECASE),
+    re.compile(
+        r"\b\d{1,3}[^\S\n]*(?:[- ](?:year|yr)s?[- ]old|yo|y/o|y\.o\.)[^\S\n]+"
+        r"(male|female|man|woman|gentleman|lady|m|f)\b",
+        re.IGNORECASE,
+    ),
+]
+_SEX_NORMALIZED = {"m": "Male", "male": "Male", "man": "Male", "gentleman": "Male",
+                   "f": "Female", "female": "Female", "woman": "Female", "lady": "Female"}
+
+
+def canonical_lab_name(name: str) -> str:
+    """Return the display name for a known alias ("k", "serum creatinine"), else the name as given."""
+    name = name.strip()
+    key = name.lower()
+    if key in _CANONICAL:
+        return _CANONICAL[key]
+    return next((display for display in LAB_ALIASES if display.lower() == key), name)
+
+
+def _parse_value(raw: str) -> Any:
+    raw = re.sub(r"\s+", "", raw)
+    try:
+        return float(raw)
+    except ValueError:
+        return raw  # Qualified results such as "<0.01"
+
+
+def _medication_spans(text: str) -> list[tuple[int, int]]:
+    spans = []
+    for m in _MEDICATION_HEADING.finditer(text):
+        if m.group("inline"):
+            end = text.find("\n", m.end())
+            spans.append((m.start(), end if end >= 0 else len(text)))
+            continue
+        end = _SECTION_END.search(text, m.end())
+        spans.append((m.start(), end.start() if end else len(text)))
+    return spans
+
+
+def extract_labs(text: str) -> list[dict[str, Any]]:
+    """Find lab results anywhere in the text, in document order, without duplicates.
+
+    Matches inside a medications section, or unitless values followed by a dose
+    unit or route ("potassium 40 mEq IV"), are doses and are skipped.
+    """
+    labs = []
+    seen = set()
+    medication_spans = _medication_spans(text)
+    for m in _LAB_PATTERN.finditer(text):
+        if any(start <= m.start() < end for start, end in medication_spans):
+            continue
+        unit = m.group("unit") or m.group("unit_in_name")
+        if not unit and _DOSE_AFTER.match(text, m.end()):
+            continue
+        alias = (m.group("name") or m.group("short")).lower()
+        test_name = _CANONICAL[alias]
+        value = _parse_value(m.group("value"))
+        key = (test_name, value, (unit or "").lower())
+        if key in seen:
+            continue
+        seen.add(key)
+        labs.append({"test_name": test_name, "value": value, "unit": unit})
+    return labs
+
+
+def extract_demographics(text: str) -> dict[str, Optional[Any]]:
+    """Find age and sex; fields that cannot be found are None."""
+    age = None
+    for pattern in _AGE_PATTERNS:
+        m = pattern.search(text)
+        if m and 0 < int(m.group(1)) < 125:
+            age = int(m.group(1))
+            break
+    gender = None
+    for pattern in _SEX_PATTERNS:
+        m = pattern.search(text)
+        if m:
+            gender = _SEX_NORMALIZED[m.group(1).lower()]
+            break
+    return {"age": age, "gender": gender}
@@ -29,6 +29,7 @@ class CrawledPage(BaseModel):
     content_hash: str
     etag: Optional[str] = None
     status_code: int = 200
+    page_spans: Optional[list[tuple[int, int, int]]] = None  # PDFs: (page, char start, char end) in cleaned_text
 
 
 class Chunk(BaseModel):
@@ -45,5 +46,6 @@ class Chunk(BaseModel):
     content_type: ContentType
     raw_html_snippet: Optional[str] = None
     page_number: Optional[int] = None  # For PDFs
+    token_count: Optional[int] = None  # Tokens per app.core.tokens (configured tokenizer)
 
 
@@ -1,61 +1,165 @@
 """PDF parsing and text extraction."""
 
 import logging
-from typing import Optional
+import os
+import shutil
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Iterator, Optional
 
 import fitz  # PyMuPDF
 from io import BytesIO
 
+from app.core.config import settings
 from app.core.utils import normalize_text
 from app.ingestion.models import ContentType, CrawledPage
 
 logger = logging.getLogger(__name__)
 
 
-def extract_pdf_text(pdf_bytes: bytes) -> tuple[str, dict]:
-    """Extract text from PDF with page numbers and headings."""
+@lru_cache(maxsize=1)
+def _tesseract_available() -> bool:
+    import pytesseract
+
+    if shutil.which(pytesseract.pytesseract.tesseract_cmd) is None:
+        logger.warning("tesseract not found; scanned PDF pages will not be OCR'd")
+        return False
+    return True
+
+
+def _ocr_png(png: bytes, lang: str, timeout: float) -> str:
+    import pytesseract
+    from PIL import Image
+
+    return pytesseract.image_to_string(Image.open(BytesIO(png)), lang=lang, timeout=timeout)
+
+
+def iter_ocr_pages(
+    doc: "fitz.Document",
+    page_numbers: list[int],
+    dpi: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> Iterator[tuple[int, str, float]]:
+    """OCR the given (1-based) pages in parallel; yield (page, text, seconds) in page order.
+
+    Pages are rasterized here as they are submitted, so rendering overlaps with
+    OCR. Each OCR call is a tesseract subprocess, so the thread pool keeps
+    `workers` of them busy at once; OMP_THREAD_LIMIT=1 stops each one from also
+    spawning a thread per core. At most 2 * workers pages (and their PNGs) are
+    in flight, and each result is yielded as soon as the pages before it are done.
+    """
+    dpi = dpi or settings.pdf_ocr_dpi
+    workers = workers or settings.pdf_ocr_workers or os.cpu_count() or 1
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+    def _timed(png: bytes) -> tuple[str, float]:
+        t0 = time.perf_counter()
+        text = _ocr_png(png, settings.pdf_ocr_lang, settings.pdf_ocr_page_timeout)
+        return text, time.perf_counter() - t0
+
+    pending = deque(page_numbers)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-ocr") as executor:
+        in_flight: deque[tuple[int, Future]] = deque()
+        while pending or in_flight:
+            while pending and len(in_flight) < 2 * workers:
+                page_num = pending.popleft()
+                png = doc[page_num - 1].get_pixmap(dpi=dpi).tobytes("png")
+                in_flight.append((page_num, executor.submit(_timed, png)))
+            page_num, future = in_flight.popleft()
+            try:
+                text, seconds = future.result()
+            except Exception as e:
+                logger.warning(f"OCR failed for page {page_num}: {e}")
+                text, seconds = "", 0.0
+            yield page_num, text, seconds
+
+
+def _page_text_and_headings(page: "fitz.Page", page_num: int) -> tuple[str, list[dict]]:
+    """Lay out a page once and return its text and bold, larger-font heading candidates."""
+    lines = []
+    headings = []
+    for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+        for line in block.get("lines", []):
+            spans = line.get("spans", [])
+            lines.append("".join(span.get("text", "") for span in spans))
+            for span in spans:
+                text_span = span.get("text", "").strip()
+                font_size = span.get("size", 0)
+                # Heuristic: headings are often bold (flag 16) and larger
+                if text_span and (span.get("flags", 0) & 16) and font_size > 10 and len(text_span) < 200:
+                    headings.append(
+                        {"page": page_num, "text": normalize_text(text_span), "size": font_size}
+                    )
+    return "\n".join(lines), headings
+
+
+def extract_pdf_text(pdf_bytes: bytes, ocr_workers: Optional[int] = None) -> tuple[str, dict]:
+    """Extract text from PDF with page numbers and headings.
+
+    ocr_workers caps concurrent tesseract processes for scanned pages
+    (default: settings.pdf_ocr_workers, else one per CPU).
+    """
     try:
         doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        full_text = []
         page_texts = []
         headings = []
+        page_timings = []
+        scanned_pages = []
+        text_layer: dict[int, str] = {}
 
         for page_num, page in enumerate(doc, start=1):
-            text = page.get_text()
+            t0 = time.perf_counter()
+            text, page_headings = _page_text_and_headings(page, page_num)
+            headings.extend(page_headings)
             normalized = normalize_text(text)
 
-            if normalized:
-                full_text.append(f"[Page {page_num}]\n{normalized}\n")
+            if normalized and len(normalized) >= settings.pdf_ocr_min_chars:
+                page_texts.append({"page": page_num, "text": normalized})
+            elif settings.pdf_ocr_enabled and _tesseract_available():
+                # Scanned page (no usable text layer): OCR below
+                scanned_pages.append(page_num)
+                text_layer[page_num] = normalized
+            elif normalized:
                 page_texts.append({"page": page_num, "text": normalized})
 
-            # Try to extract headings (bold text, larger font)
-            blocks = page.get_text("dict")["blocks"]
-            for block in blocks:
-                if "lines" in block:
-                    for line in block["lines"]:
-                        for span in line.get("spans", []):
-                            font_size = span.get("size", 0)
-                            flags = span.get("flags", 0)
-                            text_span = span.get("text", "").strip()
-
-                            # Heuristic: headings are often bold and larger
-                            if text_span and (flags & 16) and font_size > 10:  # Bold flag is 16
-                                if len(text_span) < 200:  # Reasonable heading length
-                                    headings.append(
-                                        {
-                                            "page": page_num,
-                                            "text": normalize_text(text_span),
-                                            "size": font_size,
-                                        }
-                                    )
+            page_timings.append(
+                {"page": page_num, "source": "text", "seconds": time.perf_counter() - t0}
+            )
+
+        if scanned_pages:
+            t0 = time.perf_counter()
+            for page_num, text, seconds in iter_ocr_pages(doc, scanned_pages, workers=ocr_workers):
+                page_timings[page_num - 1] = {"page": page_num, "source": "ocr", "seconds": seconds}
+                normalized = normalize_text(text) or text_layer[page_num]
+                if normalized:
+                    page_texts.append({"page": page_num, "text": normalized})
+            page_texts.sort(key=lambda p: p["page"])
+            logger.info(
+                f"OCR'd {len(scanned_pages)} scanned page(s) in {time.perf_counter() - t0:.2f}s"
+            )
 
         page_count = len(doc)
         doc.close()
 
+        # "[Page N]\n<text>\n" blocks joined by "\n"; page_spans locate each page's text
+        full_text = []
+        page_spans = []
+        offset = 0
+        for p in page_texts:
+            start = offset + len(f"[Page {p['page']}]\n")
+            page_spans.append((p["page"], start, start + len(p["text"])))
+            block = f"[Page {p['page']}]\n{p['text']}\n"
+            full_text.append(block)
+            offset += len(block) + 1
         return "\n".join(full_text), {
             "page_count": page_count,
             "page_texts": page_texts,
+            "page_spans": page_spans,
             "headings": headings,
+            "ocr_pages": scanned_pages,
+            "page_timings": page_timings,
         }
 
     except Exception as e:
@@ -91,9 +195,7 @@ def parse_pdf(page: CrawledPage) -> CrawledPage:
 
         page.title = title
         page.cleaned_text = text
-
-        # Store PDF metadata (can be accessed during chunking)
-        # For now, we'll store page numbers in chunk model
+        page.page_spans = metadata.get("page_spans")
 
         return page
 
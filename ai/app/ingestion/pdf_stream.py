@@ -0,0 +1,295 @@
+"""Streaming PDF ingestion: parallel page extraction, incremental chunking, batched upserts.
+
+Large guideline PDFs are never held in memory as one string. Worker processes
+extract page ranges (each opens the file by path, so only the path crosses the
+process boundary); pages come back in order and feed a chunker that carries
+unfinished text over page boundaries; chunks are embedded and upserted in
+bounded batches. After each flushed batch the chunker state is checkpointed,
+so an interrupted run resumes at the next unprocessed page.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from app.core.config import settings
+from app.core.constants import DEFAULT_CHUNK_MAX, DEFAULT_CHUNK_MIN, DEFAULT_OVERLAP_RATIO
+from app.core.metrics import metrics
+from app.core.tokens import count_tokens_batch
+from app.ingestion.chunker import chunk_by_sliding_window, page_number_at
+from app.ingestion.models import Chunk, ContentType
+
+logger = logging.getLogger(__name__)
+
+# Per-worker cache of open documents, keyed by path
+_worker_docs: dict[str, Any] = {}
+
+
+def _extract_page_range(path: str, first: int, last: int) -> list[tuple[int, str, Optional[str]]]:
+    """Extract pages first..last (1-based) in a worker: (page, normalized text, first heading)."""
+    import fitz
+
+    from app.core.utils import normalize_text
+    from app.ingestion.parse_pdf import _page_text_and_headings, _tesseract_available, iter_ocr_pages
+
+    doc = _worker_docs.get(path)
+    if doc is None:
+        doc = _worker_docs[path] = fitz.open(path)
+
+    pages = []
+    for page_num in range(first, last + 1):
+        text, headings = _page_text_and_headings(doc[page_num - 1], page_num)
+        normalized = normalize_text(text)
+        if len(normalized) < settings.pdf_ocr_min_chars and settings.pdf_ocr_enabled and _tesseract_available():
+            for _, ocr_text, _ in iter_ocr_pages(doc, [page_num], workers=1):
+                normalized = normalize_text(ocr_text) or normalized
+        pages.append((page_num, normalized, headings[0]["text"] if headings else None))
+    return pages
+
+
+def iter_pdf_pages(
+    path: str,
+    start_page: int = 1,
+    workers: Optional[int] = None,
+    pages_per_task: Optional[int] = None,
+) -> Iterator[tuple[int, str, Optional[str]]]:
+    """Yield (page, text, first heading) from start_page on, in page order.
+
+    Page ranges are extracted in parallel; at most two ranges per worker are in
+    flight, so memory stays bounded however long the document is.
+    """
+    import fitz
+
+    with fitz.open(path) as doc:
+        page_count = len(doc)
+    workers = workers or settings.pdf_stream_workers or os.cpu_count() or 1
+    pages_per_task = pages_per_task or settings.pdf_stream_pages_per_task
+    ranges = deque(
+        (first, min(first + pages_per_task - 1, page_count))
+        for first in range(start_page, page_count + 1, pages_per_task)
+    )
+
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        in_flight: deque[Future] = deque()
+        while ranges or in_flight:
+            while ranges and len(in_flight) < 2 * workers:
+                in_flight.append(executor.submit(_extract_page_range, path, *ranges.popleft()))
+            yield from in_flight.popleft().result()
+
+
+class StreamingChunker:
+    """Sliding-window chunker fed one page at a time.
+
+    Builds the same "[Page N]" text layout as extract_pdf_text, so chunk
+    offsets and page numbers match the in-memory path. Windows are emitted
+    once the text after them has arrived; the unfinished tail is carried into
+    the next page. The state is small and JSON-serializable for checkpoints.
+
+    Unlike chunk_page, this does not run detect_sections: section chunks are
+    located by searching the whole text, which a carried-over buffer cannot do,
+    so streamed chunks always use the sliding window and take their heading
+    from the PDF's first heading per page instead.
+    """
+
+    def __init__(self, state: Optional[dict[str, Any]] = None):
+        state = state or {}
+        self.base: int = state.get("base", 0)  # Global offset of buffer[0]
+        self.buffer: str = state.get("buffer", "")
+        self.length: int = state.get("length", 0)  # Global length of the text so far
+        self.page_spans: list[tuple[int, int, int]] = [tuple(s) for s in state.get("page_spans", [])]
+        self.headings: list[tuple[int, str]] = [tuple(h) for h in state.get("headings", [])]
+        self.step = int(DEFAULT_CHUNK_MAX * (1 - DEFAULT_OVERLAP_RATIO))
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "base": self.base,
+            "buffer": self.buffer,
+            "length": self.length,
+            "page_spans": self.page_spans,
+            "headings": self.headings,
+        }
+
+    def _append(self, piece: str) -> None:
+        self.buffer += piece
+        self.length += len(piece)
+
+    def add_page(self, page_num: int, text: str, heading: Optional[str] = None) -> list[tuple[int, int, str, int, Optional[str]]]:
+        """Add a page; return the chunks completed so far as (start, end, text, page, heading)."""
+        if heading:
+            self.headings.append((page_num, heading))
+        if not text:
+            return []
+        if self.length:
+            self._append("\n")
+        header = f"[Page {page_num}]\n"
+        start = self.length + len(header)
+        self._append(f"{header}{text}\n")
+        self.page_spans.append((page_num, start, start + len(text)))
+        return self._emit(final=False)
+
+    def finish(self) -> list[tuple[int, int, str, int, Optional[str]]]:
+        """Chunk whatever text is left."""
+        return self._emit(final=True)
+
+    def _emit(self, final: bool) -> list[tuple[int, int, str, int, Optional[str]]]:
+        windows = chunk_by_sliding_window(self.buffer, DEFAULT_CHUNK_MIN, DEFAULT_CHUNK_MAX, DEFAULT_OVERLAP_RATIO)
+        if not final:
+            # A window is final once it ends before the buffer does (text after it has arrived)
+            windows = [w for w in windows if w[1] < len(self.buffer)]
+        chunks = []
+        for local_start, local_end, _ in windows:
+            start, end = self.base + local_start, self.base + local_end
+            page = page_number_at(self.page_spans, start)
+            chunks.append((start, end, self.buffer[local_start:local_end], page, self._heading_for(page)))
+
+        if final:
+            self.base, self.buffer = self.length, ""
+        elif windows:
+            # Next window starts one step after the last emitted one
+            carry_from = windows[-1][0] + self.step
+            self.base += carry_from
+            self.buffer = self.buffer[carry_from:]
+        # Spans/headings before the buffer are no longer needed (keep the last for lookups)
+        self.page_spans = [s for s in self.page_spans if s[2] >= self.base] or self.page_spans[-1:]
+        base_page = page_number_at(self.page_spans, self.base) or 0
+        earlier = [h for h in self.headings if h[0] <= base_page][-1:]
+        self.headings = earlier + [h for h in self.headings if h[0] > base_page]
+        return chunks
+
+    def _heading_for(self, page: Optional[int]) -> Optional[str]:
+        heading = None
+        for heading_page, text in self.headings:
+            if page is not None and heading_page <= page:
+                heading = text
+        return heading
+
+
+def _progress_path(pdf_path: Path, collection_name: str) -> Path:
+    stat = pdf_path.stat()
+    key = f"{pdf_path.resolve()}:{stat.st_size}:{int(stat.st_mtime)}:{collection_name}"
+    return Path(settings.pdf_stream_progress_dir) / f"{uuid.uuid5(uuid.NAMESPACE_URL, key)}.json"
+
+
+def ingest_pdf_streaming(
+    pdf_path: Path,
+    collection_name: str,
+    embedding_provider: Any,
+    qdrant_client: Any,
+    url: Optional[str] = None,
+    title: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    resume: bool = True,
+) -> int:
+    """Stream a PDF into Qdrant; returns the number of chunks upserted by this run.
+
+    Progress (next page, chunker carry-over, chunk order) is saved after every
+    flushed batch; with resume, a rerun picks up from there. Chunk ids are
+    deterministic, so pages replayed after a crash overwrite rather than duplicate.
+    """
+    from qdrant_client.models import PointStruct
+
+    url = url or f"http://local/{pdf_path.name}"
+    title = title or pdf_path.stem.replace("_", " ").title()
+    batch_size = batch_size or settings.pdf_stream_batch_size
+    progress_file = _progress_path(pdf_path, collection_name)
+
+    progress: dict[str, Any] = {}
+    if resume and progress_file.exists():
+        progress = json.loads(progress_file.read_text())
+        if progress.get("done"):
+            logger.info(f"{pdf_path.name} already ingested (progress file {progress_file})")
+            return 0
+        logger.info(f"Resuming {pdf_path.name} at page {progress['next_page']}")
+    chunker = StreamingChunker(progress.get("chunker"))
+    chunk_order = progress.get("chunk_order", 0)
+    crawl_ts = datetime.now(timezone.utc)
+    pending: list[Chunk] = []
+    upserted = 0
+
+    def _save(next_page: int, done: bool = False) -> None:
+        progress_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = progress_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "path": str(pdf_path), "next_page": next_page, "chunk_order": chunk_order,
+            "chunker": chunker.state(), "done": done,
+        }))
+        tmp.replace(progress_file)
+
+    def _flush() -> None:
+        nonlocal upserted, pending
+        if not pending:
+            return
+        texts = [c.chunk_text for c in pending]
+        embeddings = embedding_provider.get_embeddings_bulk(texts)
+        points = []
+        for chunk, embedding in zip(pending, embeddings):
+            points.append(PointStruct(
+                id=chunk.chunk_id,
+                vector=embedding.tolist(),
+                payload={
+                    "url": url,
+                    "title": title,
+                    "section_heading": chunk.section_heading,
+                    "text": chunk.chunk_text,
+                    "char_start": chunk.char_offset_start,
+                    "char_end": chunk.char_offset_end,
+                    "page_number": chunk.page_number,
+                    "content_type": "pdf",
+                    "crawl_ts": crawl_ts.isoformat(),
+                    "language": "en",
+                    "source_type": "medical_guideline",
+                    "filename": pdf_path.name,
+                    "tokens": chunk.token_count,
+                },
+            ))
+        qdrant_client.upsert(collection_name=collection_name, points=points)
+        upserted += len(points)
+        metrics.increment("pdf_stream.chunks_upserted", len(points))
+        pending = []
+
+    def _collect(raw: list[tuple[int, int, str, int, Optional[str]]]) -> None:
+        nonlocal chunk_order
+        kept = [(start, end, text.strip(), page, heading) for start, end, text, page, heading in raw]
+        kept = [c for c in kept if len(c[2]) >= 50]
+        token_counts = count_tokens_batch([c[2] for c in kept])
+        for (start, end, text, page, heading), tokens in zip(kept, token_counts):
+            chunk_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{url}{start}{end}{text[:100]}"))
+            pending.append(Chunk(
+                chunk_id=chunk_id,
+                page_url=url,
+                chunk_text=text,
+                chunk_order=chunk_order,
+                section_heading=heading,
+                char_offset_start=start,
+                char_offset_end=end,
+                crawl_timestamp=crawl_ts,
+                content_type=ContentType.PDF,
+                page_number=page,
+                token_count=tokens,
+            ))
+            chunk_order += 1
+
+    for page_num, text, heading in iter_pdf_pages(
+        str(pdf_path), start_page=progress.get("next_page", 1), workers=workers
+    ):
+        _collect(chunker.add_page(page_num, text, heading))
+        metrics.increment("pdf_stream.pages")
+        if len(pending) >= batch_size:
+            _flush()
+            _save(page_num + 1)
+
+    _collect(chunker.finish())
+    _flush()
+    _save(0, done=True)
+    logger.info(f"Streamed {pdf_path.name}: {upserted} chunks upserted")
+    return upserted
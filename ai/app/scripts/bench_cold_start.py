@@ -0,0 +1,82 @@
+"""Benchmark API cold start: import time, time to /health (liveness) and to /ready."""
+
+import logging
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+import typer
+
+from app.core.logging import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+app = typer.Typer()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _import_seconds() -> float:
+    """Time `import app.api.main` in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import app.api.main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _wait_for(url: str, deadline: float, proc: subprocess.Popen) -> float:
+    """Poll url until it answers 200; return the monotonic time it did."""
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.monotonic()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"Timed out waiting for {url}")
+
+
+@app.command()
+def main(
+    runs: int = typer.Option(3, help="Number of cold starts to measure"),
+    timeout: float = typer.Option(300.0, help="Seconds to wait for readiness per run"),
+):
+    """Start uvicorn repeatedly and report time to import, to /health and to /ready."""
+    imports, live, ready = [], [], []
+    for run in range(runs):
+        imports.append(_import_seconds())
+
+        port = _free_port()
+        start = time.monotonic()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.api.main:app", "--port", str(port)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            base = f"http://127.0.0.1:{port}"
+            live.append(_wait_for(f"{base}/health", start + timeout, proc) - start)
+            ready.append(_wait_for(f"{base}/ready", start + timeout, proc) - start)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+        logger.info(
+            f"Run {run + 1}: import {imports[-1]:.2f}s, /health {live[-1]:.2f}s, /ready {ready[-1]:.2f}s"
+        )
+
+    print(f"\n{'stage':>8} {'median s':>9} {'max s':>7}")
+    for name, values in (("import", imports), ("/health", live), ("/ready", ready)):
+        print(f"{name:>8} {np.median(values):>9.2f} {max(values):>7.2f}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,145 @@
+"""Benchmark recall@k, memory and search latency for reduced embedding dimensions."""
+
+import logging
+import random
+import time
+import uuid
+
+import numpy as np
+import typer
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.vector.embeddings import get_embedding_provider, truncate_embeddings
+from app.vector.qdrant_client import get_client
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+app = typer.Typer()
+
+
+def _load_corpus(client, collection: str, sample: int) -> tuple[list[str], np.ndarray]:
+    """Scroll stored texts and full-size vectors out of the collection."""
+    texts: list[str] = []
+    vectors: list[list[float]] = []
+    offset = None
+    while len(texts) < sample:
+        points, offset = client.scroll(
+            collection_name=collection,
+            limit=min(256, sample - len(texts)),
+            offset=offset,
+            with_payload=["text"],
+            with_vectors=True,
+        )
+        for p in points:
+            texts.append((p.payload or {}).get("text", ""))
+            vectors.append(p.vector)
+        if offset is None:
+            break
+    return texts, np.array(vectors, dtype=np.float32)
+
+
+def _exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return np.argsort(-(queries @ corpus.T), axis=1)[:, :k]
+
+
+@app.command()
+def main(
+    collection_name: str = typer.Option(settings.collection_name, help="Source Qdrant collection"),
+    dims: str = typer.Option("256,512,768,1536", help="Comma-separated dimensions to compare"),
+    sample: int = typer.Option(5000, help="Number of corpus points to benchmark on"),
+    num_queries: int = typer.Option(200, help="Number of queries"),
+    k: int = typer.Option(10, help="k for recall@k"),
+    seed: int = typer.Option(0, help="Random seed for query sampling"),
+):
+    """Compare reduced embedding sizes against the full-size vectors of our corpus.
+
+    Ground truth is exact top-k search with the full stored vectors. Each reduced
+    size is produced by Matryoshka truncation + renormalization (equivalent to
+    the OpenAI `dimensions` parameter for text-embedding-3-*), indexed in a
+    temporary Qdrant collection and queried through HNSW.
+    """
+    client = get_client()
+    texts, corpus = _load_corpus(client, collection_name, sample)
+    if len(texts) == 0:
+        logger.error(f"No points found in {collection_name}")
+        raise typer.Exit(1)
+    full_dim = corpus.shape[1]
+    logger.info(f"Loaded {len(texts)} points ({full_dim} dims) from {collection_name}")
+
+    # Queries: leading sentence of randomly chosen chunks, embedded at full size
+    rng = random.Random(seed)
+    query_texts = [t.split(". ")[0][:200] for t in rng.sample(texts, min(num_queries, len(texts)))]
+    provider = get_embedding_provider()
+    queries = provider.get_embeddings(query_texts)
+    if queries.shape[1] != full_dim:
+        logger.error(
+            f"Provider produces {queries.shape[1]} dims but the collection stores {full_dim}; "
+            "run with EMBEDDING_DIMENSIONS=0"
+        )
+        raise typer.Exit(1)
+
+    truth = _exact_top_k(corpus, queries, k)
+    ids = [str(uuid.uuid4()) for _ in texts]
+    id_to_row = {pid: i for i, pid in enumerate(ids)}
+
+    rows = []
+    for dim in sorted({int(d) for d in dims.split(",") if d.strip()}):
+        if dim > full_dim:
+            logger.warning(f"Skipping {dim} dims (collection has {full_dim})")
+            continue
+        bench_collection = f"bench_dims_{dim}_{uuid.uuid4().hex[:8]}"
+        reduced = truncate_embeddings(corpus, dim)
+        reduced_queries = truncate_embeddings(queries, dim)
+        try:
+            client.create_collection(
+                collection_name=bench_collection,
+                vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+            )
+            for start in range(0, len(ids), 512):
+                client.upsert(
+                    collection_name=bench_collection,
+                    points=[
+                        PointStruct(id=ids[i], vector=reduced[i].tolist())
+                        for i in range(start, min(start + 512, len(ids)))
+                    ],
+                    wait=True,
+                )
+
+            latencies = []
+            hits = 0
+            for qi, qvec in enumerate(reduced_queries):
+                t0 = time.perf_counter()
+                result = client.query_points(
+                    collection_name=bench_collection, query=qvec.tolist(), limit=k
+                )
+                latencies.append(time.perf_counter() - t0)
+                found = {id_to_row[str(p.id)] for p in result.points}
+                hits += len(found & set(truth[qi].tolist()))
+        finally:
+            client.delete_collection(bench_collection)
+
+        rows.append(
+            {
+                "dims": dim,
+                f"recall@{k}": hits / (len(reduced_queries) * k),
+                "vector_mb": reduced.nbytes / 1e6,
+                "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                "p95_ms": float(np.percentile(latencies, 95) * 1000),
+            }
+        )
+
+    print(f"\n{'dims':>6} {'recall@' + str(k):>10} {'vectors MB':>11} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in rows:
+        print(
+            f"{r['dims']:>6} {r[f'recall@{k}']:>10.3f} {r['vector_mb']:>11.1f} "
+            f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    app()
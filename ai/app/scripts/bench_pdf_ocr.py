@@ -0,0 +1,86 @@
+"""Benchmark the page-parallel OCR fallback on scanned PDFs."""
+
+import logging
+import time
+from pathlib import Path
+
+import fitz
+import numpy as np
+import typer
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.ingestion.parse_pdf import extract_pdf_text
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+app = typer.Typer()
+
+
+def _as_scan(pdf_bytes: bytes, pages: int, dpi: int) -> bytes:
+    """Build an image-only PDF of `pages` pages by rasterizing (and repeating) the source pages."""
+    src = fitz.open(stream=pdf_bytes, filetype="pdf")
+    images = [page.get_pixmap(dpi=dpi).tobytes("png") for page in src]
+    out = fitz.open()
+    for i in range(pages):
+        rect = src[i % len(src)].rect
+        out.new_page(width=rect.width, height=rect.height).insert_image(rect, stream=images[i % len(images)])
+    data = out.tobytes()
+    src.close()
+    out.close()
+    return data
+
+
+def _run(pdf_bytes: bytes, workers: int) -> dict:
+    settings.pdf_ocr_workers = workers
+    t0 = time.perf_counter()
+    text, metadata = extract_pdf_text(pdf_bytes)
+    total = time.perf_counter() - t0
+    ocr = [t["seconds"] for t in metadata["page_timings"] if t["source"] == "ocr"]
+    return {
+        "workers": workers,
+        "pages": metadata["page_count"],
+        "ocr_pages": len(metadata["ocr_pages"]),
+        "total_s": total,
+        "page_p50_ms": float(np.percentile(ocr, 50) * 1000) if ocr else 0.0,
+        "page_p95_ms": float(np.percentile(ocr, 95) * 1000) if ocr else 0.0,
+        "chars": len(text),
+    }
+
+
+@app.command()
+def main(
+    pdf: Path = typer.Option(Path("mock_discharge.pdf"), help="Source PDF"),
+    pages: int = typer.Option(50, help="Pages in the synthetic scan"),
+    scan_dpi: int = typer.Option(200, help="DPI the synthetic scan is rendered at"),
+    dpi: int = typer.Option(settings.pdf_ocr_dpi, help="DPI pages are rasterized at for OCR"),
+    workers: str = typer.Option("1,2,4,8", help="Comma-separated OCR worker counts"),
+):
+    """Compare OCR wall time and per-page latency across worker counts.
+
+    Runs the source PDF as is (text layer, no OCR expected), a one-copy scan of
+    it, and a synthetic scan of `pages` pages built from its rasterized pages.
+    """
+    source = pdf.read_bytes()
+    settings.pdf_ocr_dpi = dpi
+    documents = {
+        pdf.name: source,
+        f"{pdf.stem} (scanned)": _as_scan(source, len(fitz.open(stream=source, filetype="pdf")), scan_dpi),
+        f"synthetic {pages}-page scan": _as_scan(source, pages, scan_dpi),
+    }
+
+    print(f"\n{'document':<32} {'workers':>7} {'pages':>6} {'ocr':>5} {'total s':>8} "
+          f"{'page p50 ms':>12} {'page p95 ms':>12} {'chars':>8}")
+    for name, data in documents.items():
+        counts = [int(w) for w in workers.split(",") if w.strip()]
+        for w in counts if name != pdf.name else counts[:1]:
+            r = _run(data, w)
+            print(
+                f"{name:<32} {r['workers']:>7} {r['pages']:>6} {r['ocr_pages']:>5} {r['total_s']:>8.2f} "
+                f"{r['page_p50_ms']:>12.1f} {r['page_p95_ms']:>12.1f} {r['chars']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,153 @@
+"""Benchmark time-to-first-token for the legacy vs. cache-friendly prompt layouts.
+
+Run against a local inference server (Ollama, or any OpenAI-compatible server
+such as vLLM or llama.cpp) so prefix/KV cache reuse is what gets measured.
+"""
+
+import json
+import logging
+import time
+
+import httpx
+import numpy as np
+import typer
+
+from app.core.logging import setup_logging
+from app.core.prompts import pack_rag_prompt
+from app.generation.response_sizer import classify_query
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+app = typer.Typer()
+
+SYSTEM_PROMPT = (
+    "You are an experienced, evidence-informed Clinical Decision Support Assistant.\n"
+    "You must provide practical, bedside-relevant guidance. You must cite sources (Guidelines, Journals) "
+    "naturally within the text and never invent medical facts."
+)
+
+PATIENT = (
+    "68 year old male. Type 2 diabetes for 12 years, hypertension, CKD stage 3b.\n"
+    "Medications: metformin 1000 mg BID, lisinopril 20 mg daily, atorvastatin 40 mg.\n"
+    "Labs: HbA1c 8.4% (FLAG: High). eGFR 38 mL/min/1.73m2 (FLAG: Low). Potassium 5.4 mmol/L (FLAG: High)."
+)
+
+QUESTIONS = [
+    "Should metformin be dose-adjusted at this eGFR?",
+    "What is the best add-on agent for glycemic control here?",
+    "Is the potassium level a concern with lisinopril?",
+    "How often should renal function be monitored?",
+    "Would an SGLT2 inhibitor be appropriate?",
+    "What blood pressure target should we aim for?",
+    "Any interaction risks with the current statin?",
+    "When should nephrology referral be considered?",
+]
+
+PASSAGES = [
+    "Metformin is contraindicated below an eGFR of 30 and the dose should be reviewed when eGFR falls below 45.",
+    "SGLT2 inhibitors reduce progression of CKD and heart failure hospitalization in type 2 diabetes.",
+    "ACE inhibitors can raise serum potassium, particularly with reduced kidney function.",
+    "GLP-1 receptor agonists lower HbA1c and body weight with a low risk of hypoglycemia.",
+    "In CKD, renal function and potassium should be checked within 1-2 weeks of starting or uptitrating RAAS blockade.",
+    "Blood pressure targets below 130/80 mmHg are recommended for most adults with diabetes and CKD.",
+]
+
+
+def _chunks_for_turn(turn: int) -> list[dict]:
+    """A different retrieval result per turn, as in a real conversation."""
+    picked = [PASSAGES[(turn + i) % len(PASSAGES)] for i in range(3)]
+    return [
+        {"title": f"Guideline {turn}-{i}", "url": f"https://example.org/g{i}", "text": p * 3, "score": 1.0 - i / 10}
+        for i, p in enumerate(picked)
+    ]
+
+
+def _ttft_ollama(client: httpx.Client, model: str, prompt: str, max_tokens: int) -> float:
+    payload = {
+        "model": model,
+        "prompt": prompt,
+        "system": SYSTEM_PROMPT,
+        "stream": True,
+        "keep_alive": "30m",
+        "options": {"temperature": 0.0, "num_predict": max_tokens},
+    }
+    t0 = time.perf_counter()
+    with client.stream("POST", "/api/generate", json=payload) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line and json.loads(line).get("response"):
+                return time.perf_counter() - t0
+    return time.perf_counter() - t0
+
+
+def _ttft_openai(client: httpx.Client, model: str, prompt: str, max_tokens: int) -> float:
+    payload = {
+        "model": model,
+        "messages": [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+        "stream": True,
+        "temperature": 0.0,
+        "max_tokens": max_tokens,
+    }
+    t0 = time.perf_counter()
+    with client.stream("POST", "/v1/chat/completions", json=payload) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            choices = json.loads(line[6:]).get("choices") or [{}]
+            if (choices[0].get("delta") or {}).get("content"):
+                return time.perf_counter() - t0
+    return time.perf_counter() - t0
+
+
+@app.command()
+def main(
+    backend: str = typer.Option("ollama", help="ollama or openai (OpenAI-compatible server)"),
+    base_url: str = typer.Option("http://localhost:11434", help="Server base URL"),
+    model: str = typer.Option("llama3", help="Model name on the server"),
+    rounds: int = typer.Option(3, help="Conversations per layout"),
+    max_tokens: int = typer.Option(8, help="Tokens to generate per request"),
+):
+    """Replay the same multi-turn conversation with each layout and compare TTFT."""
+    ttft_fn = _ttft_ollama if backend == "ollama" else _ttft_openai
+    client = httpx.Client(base_url=base_url, timeout=300.0)
+    results: dict[str, list[float]] = {}
+
+    for layout in ("legacy", "cache_friendly"):
+        # Warm-up: model load and the first (uncached) prompt are not part of the comparison
+        warm = pack_rag_prompt(_chunks_for_turn(0), QUESTIONS[0], patient_context=PATIENT, layout=layout)
+        ttft_fn(client, model, warm.text, max_tokens)
+
+        samples = []
+        for _ in range(rounds):
+            history: list[dict[str, str]] = []
+            for turn, question in enumerate(QUESTIONS):
+                cls = classify_query(question)
+                packed = pack_rag_prompt(
+                    _chunks_for_turn(turn),
+                    question,
+                    history=history,
+                    patient_context=PATIENT,
+                    style_instruction=cls["policy"].style_instruction,
+                    response_mode=cls["response_mode"],
+                    layout=layout,
+                )
+                samples.append(ttft_fn(client, model, packed.text, max_tokens))
+                history += [
+                    {"role": "user", "content": question},
+                    {"role": "assistant", "content": "Noted; see the recommendations above."},
+                ]
+        results[layout] = samples
+        logger.info(f"{layout}: {len(samples)} requests")
+
+    print(f"\n{'layout':>15} {'p50 TTFT ms':>12} {'p95 TTFT ms':>12}")
+    for layout, samples in results.items():
+        print(
+            f"{layout:>15} {np.percentile(samples, 50) * 1000:>12.1f} "
+            f"{np.percentile(samples, 95) * 1000:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    app()
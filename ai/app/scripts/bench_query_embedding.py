@@ -0,0 +1,92 @@
+"""Benchmark local query embedding latency across inference precisions."""
+
+import logging
+import time
+
+import numpy as np
+import typer
+
+from app.core.logging import setup_logging
+from app.vector.embeddings import LocalEmbeddingProvider
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+app = typer.Typer()
+
+QUERIES = [
+    "What is the first-line treatment for type 2 diabetes?",
+    "Can I take ibuprofen with lisinopril?",
+    "Early signs of sepsis in elderly patients",
+    "How long does a migraine usually last?",
+    "Recommended statin intensity after myocardial infarction",
+    "Is a fasting glucose of 118 mg/dL normal?",
+    "Side effects of long-term proton pump inhibitor use",
+    "When should a child with fever see a doctor?",
+]
+
+
+def _timed(fn, repeats: int) -> list[float]:
+    latencies = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return latencies
+
+
+@app.command()
+def main(
+    precisions: str = typer.Option("fp32,int8,fp16", help="Comma-separated precisions (fp32,int8,fp16,onnx)"),
+    repeats: int = typer.Option(200, help="Timed repetitions per measurement"),
+    batch_size: int = typer.Option(32, help="Batch size for the batch measurement"),
+    warmup: int = typer.Option(10, help="Untimed warm-up calls"),
+):
+    """Measure single-query and batch latency, and cosine parity against fp32."""
+    batch = [QUERIES[i % len(QUERIES)] for i in range(batch_size)]
+    reference = None
+    rows = []
+
+    for precision in [p.strip() for p in precisions.split(",") if p.strip()]:
+        try:
+            provider = LocalEmbeddingProvider(precision=precision)
+        except Exception as e:
+            logger.warning(f"Skipping {precision}: {e}")
+            continue
+
+        for _ in range(warmup):
+            provider.get_embedding(QUERIES[0])
+
+        single = _timed(lambda: provider.get_embedding(QUERIES[1]), repeats)
+        batched = _timed(lambda: provider.get_embeddings(batch), max(1, repeats // 10))
+
+        vectors = provider.get_embeddings(QUERIES)
+        if reference is None and precision == "fp32":
+            reference = vectors
+        cosine = (
+            float(np.min(np.sum(reference * vectors, axis=1)
+                         / (np.linalg.norm(reference, axis=1) * np.linalg.norm(vectors, axis=1))))
+            if reference is not None
+            else float("nan")
+        )
+
+        rows.append(
+            {
+                "precision": precision,
+                "p50_ms": float(np.percentile(single, 50) * 1000),
+                "p95_ms": float(np.percentile(single, 95) * 1000),
+                "batch_ms": float(np.median(batched) * 1000),
+                "min_cos": cosine,
+            }
+        )
+
+    print(f"\n{'precision':>9} {'p50 ms':>8} {'p95 ms':>8} {'batch' + str(batch_size) + ' ms':>11} {'min cos':>8}")
+    for r in rows:
+        print(
+            f"{r['precision']:>9} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+            f"{r['batch_ms']:>11.2f} {r['min_cos']:>8.4f}"
+        )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,62 @@
+"""Micro-benchmark classify_query: compiled cue matcher vs. per-cue substring scans."""
+
+import time
+
+import typer
+
+from app.generation import response_sizer
+from app.generation.response_sizer import _CATEGORIES, _category_hits, classify_queries
+from app.scripts.eval_suite import EVAL_QUERIES
+
+app = typer.Typer()
+
+CLINICAL_QUERIES = [
+    "What is the recommended dose of amoxicillin for otitis media in children?",
+    "Patient with type 2 diabetes and CKD stage 3 presents with fatigue; what is the treatment plan?",
+    "Explain the mechanism and pathophysiology of heart failure with preserved ejection fraction",
+    "Compare ACE inhibitors and ARBs: benefits, side effects and contraindications",
+    "Approach to a 65 year old with new onset atrial fibrillation, history of stroke",
+    "Comprehensive guide to sepsis management per current guidelines",
+    "when should statins be started",
+    "first line therapy for hypertension in pregnancy",
+]
+
+
+def _legacy_hits(q: str) -> dict[str, int]:
+    """The previous implementation: one substring scan per cue per category."""
+    return {name: sum(1 for c in cues if c in q) for name, cues in _CATEGORIES.items()}
+
+
+def _time(fn, queries: list[str], repeats: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        for q in queries:
+            fn(q)
+    return (time.perf_counter() - t0) / (repeats * len(queries)) * 1e6
+
+
+@app.command()
+def main(repeats: int = typer.Option(2000, help="Passes over the query set")):
+    """Report microseconds per query for cue counting and full classification."""
+    queries = [q["query"].lower() for q in EVAL_QUERIES] + [q.lower() for q in CLINICAL_QUERIES]
+    compiled = _category_hits.__wrapped__  # uncached, to time the scan itself
+
+    rows = [
+        ("legacy substring", _time(_legacy_hits, queries, repeats)),
+        ("compiled trie regex", _time(compiled, queries, repeats)),
+        ("compiled + cache", _time(_category_hits, queries, repeats)),
+    ]
+    t0 = time.perf_counter()
+    for _ in range(max(1, repeats // 10)):
+        classify_queries(queries)
+    batch_us = (time.perf_counter() - t0) / (max(1, repeats // 10) * len(queries)) * 1e6
+
+    print(f"\n{len(queries)} queries, {len(response_sizer._IMPLIED_CUES)} cues")
+    print(f"{'matcher':>19} {'us/query':>9}")
+    for name, us in rows:
+        print(f"{name:>19} {us:>9.2f}")
+    print(f"{'classify_queries':>19} {batch_us:>9.2f}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,116 @@
+"""Benchmark per-worker memory of gunicorn API workers with and without model preloading."""
+
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import typer
+
+from app.core.logging import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+app = typer.Typer()
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _children(pid: int) -> list[int]:
+    path = Path(f"/proc/{pid}/task/{pid}/children")
+    return [int(p) for p in path.read_text().split()] if path.exists() else []
+
+
+def _memory_mb(pid: int) -> dict[str, float]:
+    """Read RSS, PSS and private/shared sizes (MB) from /proc/<pid>/smaps_rollup."""
+    values: dict[str, float] = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        key, rest = line.split(":", 1)
+        values[key] = int(rest.split()[0]) / 1024
+    return {
+        "rss": values.get("Rss", 0.0),
+        "pss": values.get("Pss", 0.0),
+        "shared": values.get("Shared_Clean", 0.0) + values.get("Shared_Dirty", 0.0),
+        "private": values.get("Private_Clean", 0.0) + values.get("Private_Dirty", 0.0),
+    }
+
+
+def _wait_until_ready(base: str, workers: int, proc: subprocess.Popen, timeout: float) -> None:
+    """Wait until /ready succeeds many times in a row, so every worker is likely warmed up."""
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while streak < workers * 8:
+        if time.monotonic() > deadline:
+            raise TimeoutError("Workers did not become ready in time")
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {proc.returncode}")
+        try:
+            ok = httpx.get(f"{base}/ready", timeout=2.0).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        streak = streak + 1 if ok else 0
+        time.sleep(0.05 if ok else 0.5)
+
+
+def _measure(preload: bool, workers: int, timeout: float, requests: int) -> dict[str, object]:
+    port = _free_port()
+    env = {**os.environ, "PRELOAD_MODELS": "true" if preload else "false", "WEB_CONCURRENCY": str(workers)}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{port}",
+         "app.api.main:app"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        _wait_until_ready(base, workers, proc, timeout)
+        # Some traffic, so per-request allocations show up in the numbers
+        for _ in range(requests):
+            httpx.get(f"{base}/ready", timeout=2.0)
+        pids = _children(proc.pid)
+        return {"master": _memory_mb(proc.pid), "workers": [_memory_mb(p) for p in pids]}
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+
+
+@app.command()
+def main(
+    workers: int = typer.Option(4, help="Number of gunicorn workers"),
+    timeout: float = typer.Option(600.0, help="Seconds to wait for all workers to be ready"),
+    requests: int = typer.Option(50, help="Requests to send before measuring"),
+):
+    """Compare per-worker RSS/PSS with PRELOAD_MODELS off and on (Linux only).
+
+    RSS counts shared pages in every process; PSS splits them between sharers,
+    so the sum of PSS is the real footprint of the deployment.
+    """
+    print(f"\n{'mode':>10} {'proc':>7} {'RSS MB':>8} {'PSS MB':>8} {'shared MB':>10} {'private MB':>11}")
+    for preload in (False, True):
+        result = _measure(preload, workers, timeout, requests)
+        mode = "preload" if preload else "per-worker"
+        rows = [("master", result["master"])] + [(f"w{i}", m) for i, m in enumerate(result["workers"])]
+        for name, m in rows:
+            print(
+                f"{mode:>10} {name:>7} {m['rss']:>8.1f} {m['pss']:>8.1f} "
+                f"{m['shared']:>10.1f} {m['private']:>11.1f}"
+            )
+        total_pss = sum(m["pss"] for _, m in rows)
+        print(f"{mode:>10} {'total':>7} {'':>8} {total_pss:>8.1f}")
+
+
+if __name__ == "__main__":
+    app()
@@ -15,6 +15,7 @@ from app.core.utils import compute_content_hash
 from app.ingestion.chunker import chunk_page
 from app.ingestion.models import CrawledPage, ContentType
 from app.ingestion.parse_pdf import extract_pdf_text
+from app.ingestion.pdf_stream import ingest_pdf_streaming
 from app.vector.embeddings import get_embedding_provider
 from app.vector.qdrant_client import ensure_collection, get_client
 from app.vector.qdrant_client import get_client as get_qdrant_client
@@ -54,7 +55,8 @@ def ingest_file(file_path: Path, collection_name: str, embedding_provider):
             cleaned_text=text,
             content_type=c_type,
             content_hash=compute_content_hash(content),
-            crawl_timestamp=datetime.now(timezone.utc)
+            crawl_timestamp=datetime.now(timezone.utc),
+            page_spans=metadata.get("page_spans"),
         )
         
         # Chunk
@@ -65,7 +67,7 @@ def ingest_file(file_path: Path, collection_name: str, embedding_provider):
 
         # Embed
         chunk_texts = [chunk.chunk_text for chunk in chunks]
-        embeddings = embedding_provider.get_embeddings(chunk_texts)
+        embeddings = embedding_provider.get_embeddings_bulk(chunk_texts)
         
         # Upsert
         client = get_qdrant_client()
@@ -83,11 +85,13 @@ def ingest_file(file_path: Path, collection_name: str, embedding_provider):
                     "text": chunk.chunk_text,
                     "char_start": chunk.char_offset_start,
                     "char_end": chunk.char_offset_end,
+                    "page_number": chunk.page_number,
                     "content_type": "pdf",
                     "crawl_ts": chunk.crawl_timestamp.isoformat(),
                     "language": "en",
                     "source_type": "medical_guideline",
-                    "filename": file_path.name
+                    "filename": file_path.name,
+                    "tokens": chunk.token_count,
                 }
             ))
             
@@ -99,11 +103,24 @@ def ingest_file(file_path: Path, collection_name: str, embedding_provider):
         logger.error(f"Failed to ingest {file_path}: {e}")
         return 0
 
+def _page_count(file_path: Path) -> int:
+    if file_path.suffix.lower() != ".pdf":
+        return 0
+    import fitz
+
+    with fitz.open(file_path) as doc:
+        return len(doc)
+
 @app.command()
 def main(
     directory: str = typer.Option("./data/medical_docs", help="Directory containing guidelines"),
     collection_name: str = typer.Option(settings.collection_name, help="Qdrant collection name"),
     pattern: str = typer.Option("*.*", help="File pattern to match"),
+    stream_min_pages: int = typer.Option(
+        settings.pdf_stream_min_pages, help="Stream PDFs with at least this many pages (0 = never)"
+    ),
+    workers: int = typer.Option(settings.pdf_stream_workers, help="Page extraction processes when streaming"),
+    resume: bool = typer.Option(True, help="Resume interrupted streamed PDFs from their last checkpoint"),
 ):
     """Ingest local medical documents (PDF/TXT) into Qdrant."""
     input_dir = Path(directory)
@@ -123,7 +140,13 @@ def main(
     total_chunks = 0
     with tqdm(total=len(files), desc="Ingesting Files") as pbar:
         for file_path in files:
-            chunks = ingest_file(file_path, collection_name, embedding_provider)
+            if stream_min_pages and _page_count(file_path) >= stream_min_pages:
+                chunks = ingest_pdf_streaming(
+                    file_path, collection_name, embedding_provider, client,
+                    workers=workers, resume=resume,
+                )
+            else:
+                chunks = ingest_file(file_path, collection_name, embedding_provider)
             total_chunks += chunks
             pbar.update(1)
 
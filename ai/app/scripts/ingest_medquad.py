@@ -9,6 +9,7 @@ from tqdm import tqdm
 
 from app.core.config import settings
 from app.core.logging import setup_logging
+from app.core.tokens import count_tokens_batch
 from app.vector.embeddings import get_embedding_provider
 from app.vector.qdrant_client import ensure_collection, get_client as get_qdrant_client
 from qdrant_client.models import PointStruct
@@ -23,7 +24,8 @@ app = typer.Typer()
 def main(
     collection_name: str = typer.Option(settings.collection_name, help="Qdrant collection name"),
     limit: int = typer.Option(11000, help="Number of records to ingest to reach 10,000+ points"),
-    batch_size: int = typer.Option(200, help="Batch size for upserting")
+    batch_size: int = typer.Option(1024, help="Batch size for embedding and upserting"),
+    workers: int = typer.Option(settings.local_embed_workers, help="Local embedding worker processes"),
 ):
     """Ingest MedQuAD dataset from HuggingFace into Qdrant."""
     logger.info("Loading MedQuAD dataset from HuggingFace...")
@@ -74,9 +76,12 @@ def main(
         
         if len(batch_texts) >= batch_size:
             try:
-                embeddings = embedding_provider.get_embeddings(batch_texts)
-                for tex, emb, meta in zip(batch_texts, embeddings, batch_metadata):
+                embeddings = embedding_provider.get_embeddings_bulk(batch_texts, workers=workers)
+                for tex, emb, meta, ntok in zip(
+                    batch_texts, embeddings, batch_metadata, count_tokens_batch(batch_texts)
+                ):
                     meta["text"] = tex
+                    meta["tokens"] = ntok
                     points.append(PointStruct(
                         id=str(uuid.uuid4()),
                         vector=emb.tolist(),
@@ -94,9 +99,12 @@ def main(
     # Process remaining
     if batch_texts:
         try:
-            embeddings = embedding_provider.get_embeddings(batch_texts)
-            for tex, emb, meta in zip(batch_texts, embeddings, batch_metadata):
+            embeddings = embedding_provider.get_embeddings_bulk(batch_texts, workers=workers)
+            for tex, emb, meta, ntok in zip(
+                batch_texts, embeddings, batch_metadata, count_tokens_batch(batch_texts)
+            ):
                 meta["text"] = tex
+                meta["tokens"] = ntok
                 points.append(PointStruct(
                     id=str(uuid.uuid4()),
                     vector=emb.tolist(),
@@ -13,6 +13,7 @@ from tqdm import tqdm
 
 from app.core.config import settings
 from app.core.logging import setup_logging
+from app.core.tokens import count_tokens_batch
 from app.vector.embeddings import get_embedding_provider
 from app.vector.qdrant_client import ensure_collection, get_client as get_qdrant_client
 from qdrant_client.models import PointStruct
@@ -41,7 +42,7 @@ def main():
     points = []
     batch_texts = []
     batch_metadata = []
-    batch_size = 200
+    batch_size = 1024
     
     # keivalya/MedQuad-MedicalQnADataset has 'qtype', 'Question', 'Answer'
     for i, row in tqdm(df.iterrows(), total=len(df), desc="Processing"):
@@ -71,9 +72,12 @@ def main():
         
         if len(batch_texts) >= batch_size:
             try:
-                embeddings = embedding_provider.get_embeddings(batch_texts)
-                for tex, emb, meta in zip(batch_texts, embeddings, batch_metadata):
+                embeddings = embedding_provider.get_embeddings_bulk(batch_texts)
+                for tex, emb, meta, ntok in zip(
+                    batch_texts, embeddings, batch_metadata, count_tokens_batch(batch_texts)
+                ):
                     meta["text"] = tex
+                    meta["tokens"] = ntok
                     points.append(PointStruct(
                         id=str(uuid.uuid4()),
                         vector=emb.tolist(),
@@ -91,9 +95,12 @@ def main():
     # Process remaining
     if batch_texts:
         try:
-            embeddings = embedding_provider.get_embeddings(batch_texts)
-            for tex, emb, meta in zip(batch_texts, embeddings, batch_metadata):
+            embeddings = embedding_provider.get_embeddings_bulk(batch_texts)
+            for tex, emb, meta, ntok in zip(
+                batch_texts, embeddings, batch_metadata, count_tokens_batch(batch_texts)
+            ):
                 meta["text"] = tex
+                meta["tokens"] = ntok
                 points.append(PointStruct(
                     id=str(uuid.uuid4()),
                     vector=emb.tolist(),
@@ -3,6 +3,7 @@
 import asyncio
 import logging
 import sys
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional, Iterable
 from pathlib import Path
@@ -22,6 +23,7 @@ from app.ingestion.parse_html import parse_html
 from app.ingestion.parse_pdf import parse_pdf
 from app.ingestion.sitemap import get_seed_urls
 from app.ingestion.storage import StorageManager
+from app.vector.batch_queue import EmbeddingBatchQueue
 from app.vector.embeddings import get_embedding_provider
 from app.vector.qdrant_client import ensure_collection, get_client
 from app.vector.qdrant_client import get_client as get_qdrant_client
@@ -106,9 +108,9 @@ def _discover_links_from_seed(seed_url: str, allow_prefixes: list[str] | None, l
     return out
 
 
-def upsert_chunks_to_qdrant(chunks: list, embeddings: list, collection_name: str):
+def upsert_chunks_to_qdrant(chunks: list, embeddings: list, collection_name: str, client=None):
     """Upsert chunks to Qdrant."""
-    client = get_qdrant_client()
+    client = client or get_qdrant_client()
     from datetime import datetime
     from qdrant_client.models import PointStruct
 
@@ -124,11 +126,12 @@ def upsert_chunks_to_qdrant(chunks: list, embeddings: list, collection_name: str
                 "text": chunk.chunk_text,
                 "char_start": chunk.char_offset_start,
                 "char_end": chunk.char_offset_end,
+                "page_number": chunk.page_number,
                 "content_type": chunk.content_type.value,
                 "crawl_ts": chunk.crawl_timestamp.isoformat(),
                 "language": "en",
                 "embedding_model": settings.openai_embed_model if settings.embeddings_provider == "openai" else "local",
-                "tokens": len(chunk.chunk_text) // 4,
+                "tokens": chunk.token_count,
                 "hash": compute_content_hash(chunk.chunk_text),
                 "source_type": "web_crawl"
             },
@@ -140,8 +143,8 @@ def upsert_chunks_to_qdrant(chunks: list, embeddings: list, collection_name: str
     logger.info(f"Upserted {len(points)} chunks to Qdrant")
 
 
-def process_page(url: str, crawler, storage: StorageManager, collection_name: str):
-    """Process a single page: crawl, parse, chunk, embed, upsert."""
+def process_page(url: str, crawler, storage: StorageManager, embed_queue: EmbeddingBatchQueue):
+    """Process a single page: crawl, parse, chunk, then queue chunks for batched embed/upsert."""
     try:
         # Crawl
         page = crawler.fetch(url)
@@ -171,13 +174,8 @@ def process_page(url: str, crawler, storage: StorageManager, collection_name: st
         # Save chunks
         storage.save_chunks(chunks, str(page.url))
 
-        # Embed
-        embedding_provider = get_embedding_provider()
-        chunk_texts = [chunk.chunk_text for chunk in chunks]
-        embeddings = embedding_provider.get_embeddings(chunk_texts)
-
-        # Upsert to Qdrant
-        upsert_chunks_to_qdrant(chunks, embeddings, collection_name)
+        # Embed + upsert happen on the shared queue, batched across pages
+        embed_queue.put(chunks, [chunk.chunk_text for chunk in chunks])
 
         return len(chunks)
 
@@ -201,6 +199,8 @@ def main(
     include_seed: bool = typer.Option(True, help="Include the seed URL itself in targets before filtering"),
     follow_links: bool = typer.Option(True, help="Shallowly collect links from the seed page"),
     ignore_robots: bool = typer.Option(False, help="Ignore robots.txt restrictions (use with caution)"),
+    embed_batch_size: int = typer.Option(settings.embed_batch_size, help="Chunks per embedding batch (across pages)"),
+    embed_max_tokens: int = typer.Option(settings.embed_batch_max_tokens, help="Max estimated tokens per embedding request"),
 ):
     """Ingest medical content from web: crawl, parse, chunk, embed, and upsert to Qdrant."""
     logger.info(f"Starting ingestion: seed={seed}, max_pages={max_pages}, concurrency={concurrency}")
@@ -267,12 +267,19 @@ def main(
     target_list = filtered[:max_pages]
     logger.info(f"Total target URLs after filtering: {len(target_list)}")
 
-    # Process pages
+    # Process pages: crawler threads feed one shared embedding service
     processed = 0
     total_chunks = 0
+    start = time.perf_counter()
 
-    with ThreadPoolExecutor(max_workers=concurrency) as executor:
-        futures = {executor.submit(process_page, url, crawler, storage, collection_name): url for url in target_list}
+    embed_queue = EmbeddingBatchQueue(
+        embedding_provider,
+        sink=lambda chunks, embeddings: upsert_chunks_to_qdrant(chunks, embeddings, collection_name, client),
+        batch_size=embed_batch_size,
+        max_tokens=embed_max_tokens,
+    )
+    with embed_queue, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(process_page, url, crawler, storage, embed_queue): url for url in target_list}
 
         with tqdm(total=len(target_list), desc="Processing pages") as pbar:
             for future in as_completed(futures):
@@ -282,13 +289,17 @@ def main(
                     if chunks_count:
                         processed += 1
                         total_chunks += chunks_count
-                        pbar.update(1)
                 except Exception as e:
                     logger.error(f"Error processing {url}: {e}")
-                    pbar.update(1)
+                pbar.update(1)
+                pbar.set_postfix(pages_per_sec=f"{processed / (time.perf_counter() - start):.2f}")
 
+    elapsed = time.perf_counter() - start
     crawler.close()
-    logger.info(f"Ingestion complete: {processed} pages, {total_chunks} chunks")
+    logger.info(
+        f"Ingestion complete: {processed} pages, {total_chunks} chunks in {elapsed:.1f}s "
+        f"({processed / elapsed if elapsed else 0:.2f} pages/sec); embedding: {embed_queue.stats(elapsed)}"
+    )
 
 
 if __name__ == "__main__":
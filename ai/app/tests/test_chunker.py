@@ -79,3 +79,34 @@ def test_short_text():
     assert len(chunks) <= 1
 
 
+
+
+def test_pdf_chunks_carry_page_number():
+    """Test that chunks of an extracted PDF get the page their text starts on."""
+    import fitz
+
+    from app.ingestion.parse_pdf import extract_pdf_text
+
+    doc = fitz.open()
+    for n in range(1, 6):
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (72, 72, -72, -72), f"Page {n} guideline text. " * 60, fontsize=9)
+    pdf = doc.tobytes()
+    text, metadata = extract_pdf_text(pdf)
+    page = CrawledPage(
+        url="https://example.org/guideline.pdf",
+        title="Guideline",
+        crawl_timestamp=datetime.utcnow(),
+        content_type=ContentType.PDF,
+        raw_content=pdf,
+        cleaned_text=text,
+        content_hash="test",
+        page_spans=metadata["page_spans"],
+    )
+
+    chunks = chunk_page(page)
+
+    assert len({c.page_number for c in chunks}) > 1
+    for c in chunks:
+        marker = text.rfind("[Page ", 0, c.char_offset_start + len("[Page ")) + len("[Page ")
+        assert c.page_number == int(text[marker:text.index("]", marker)])
@@ -0,0 +1,174 @@
+"""Tests for rule-based lab/demographics extraction and the clinical parser."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from app.ingestion import clinical_parser
+from app.ingestion.lab_extractor import extract_demographics, extract_labs
+
+MOCK_SUMMARY = Path(__file__).resolve().parents[2] / "mock_discharge_summary.txt"
+
+
+class RecordingLLM:
+    """Returns a fixed JSON answer and records the prompts it was sent."""
+
+    def __init__(self, answer: dict):
+        self.answer = answer
+        self.prompts: list[str] = []
+
+    def generate(self, prompt, system_prompt=None, **kwargs):
+        self.prompts.append(prompt)
+        return json.dumps(self.answer)
+
+
+def test_extracts_discharge_labs_and_demographics():
+    """Test the rules on the mock discharge summary: every lab line, nothing from the narrative."""
+    text = MOCK_SUMMARY.read_text()
+
+    labs = {lab["test_name"]: lab["value"] for lab in extract_labs(text)}
+
+    assert labs == {
+        "Sodium": 138, "Potassium": 4.2, "BUN": 32, "Creatinine": 1.5, "Glucose": 210,
+        "Hemoglobin": 11.2, "WBC": 8.5, "Troponin T": 0.12,
+    }
+    assert extract_demographics(text) == {"age": 68, "gender": "Male"}
+
+
+def test_units_qualifiers_and_false_positives():
+    """Test units, qualified values, short aliases and text that must not become labs."""
+    text = (
+        "72 yo F. Na: 131 mEq/L, HbA1c 8.2%, troponin I <0.01 ng/mL, WBC (x10^9/L): 12.1. "
+        "Vitamin K 10 mg daily. Creatinine 1.2-1.4 last year. Peak troponin was 15.4."
+    )
+
+    labs = extract_labs(text)
+
+    assert labs == [
+        {"test_name": "Sodium", "value": 131, "unit": "mEq/L"},
+        {"test_name": "HbA1c", "value": 8.2, "unit": "%"},
+        {"test_name": "Troponin I", "value": "<0.01", "unit": "ng/mL"},
+        {"test_name": "WBC", "value": 12.1, "unit": "x10^9/L"},
+    ]
+    assert extract_demographics(text) == {"age": 72, "gender": "Female"}
+
+
+@pytest.mark.parametrize("text", [
+    "Potassium chloride 20 mEq PO, Calcium 500 mg BID, Magnesium 400 mg",
+    "Hypokalemic overnight; give potassium 40 mEq IV and recheck.",
+    "Home medications:\n- Potassium 20\n- Calcium 600 (with vitamin D)\n",
+])
+def test_medication_doses_are_not_labs(text):
+    """Test that doses, with a dose unit or route or inside a medications section, are skipped."""
+    assert extract_labs(text) == []
+
+
+def test_labs_after_medications_section_are_kept():
+    """Test that the medications section ends at the next heading."""
+    text = (
+        "DISCHARGE MEDICATIONS:\n1. Magnesium 400\n2. Potassium 20\n"
+        "DISCHARGE LABS (05/15/2026):\nPotassium: 3.1 mmol/L\nMagnesium: 1.6\n"
+    )
+
+    assert extract_labs(text) == [
+        {"test_name": "Potassium", "value": 3.1, "unit": "mmol/L"},
+        {"test_name": "Magnesium", "value": 1.6, "unit": None},
+    ]
+
+
+@pytest.mark.parametrize("text, expected", [
+    (
+        "Medications: metformin 500 mg BID\n"
+        "Labs: Glucose 182 mg/dL, Creatinine 1.6 mg/dL, Potassium 5.4 mEq/L",
+        [("Glucose", 182), ("Creatinine", 1.6), ("Potassium", 5.4)],
+    ),
+    ("Meds: none\nGlucose 182 mg/dL", [("Glucose", 182)]),
+    ("Home medications:\n- Potassium 20\nAssessment: Potassium 5.4 mEq/L", [("Potassium", 5.4)]),
+    ("Allergies to medications:\nsulfa\nSodium 131 mEq/L", [("Sodium", 131)]),
+    ("Allergies to medications: sulfa\nSodium 131 mEq/L", [("Sodium", 131)]),
+])
+def test_medications_section_ends_at_next_heading(text, expected):
+    """Test that inline headings end the section and one-line sections stay on their line."""
+    assert [(lab["test_name"], lab["value"]) for lab in extract_labs(text)] == expected
+
+
+def test_parser_asks_llm_only_for_unresolved_fields(monkeypatch):
+    """Test that resolved demographics skip the LLM, rule labs win, and labs are flagged."""
+    llm = RecordingLLM({
+        "active_problems": ["STEMI"], "medications": ["Aspirin 81mg"], "allergies": ["Lisinopril"],
+        "labs": [{"test_name": "Glucose", "value": 1, "unit": None}],
+        "unstructured_narrative": "68M with anterior STEMI.",
+    })
+    monkeypatch.setattr(clinical_parser, "get_llm_provider", lambda: llm)
+    text = MOCK_SUMMARY.read_text()
+    # A lab beyond the LLM's 4000-character window is still found
+    text += "\n" + "Follow-up note. " * 300 + "\nPotassium: 5.8 mmol/L\n"
+
+    data = clinical_parser.ClinicalParser().parse_document(text)
+
+    prompt = llm.prompts[0]
+    assert '"demographics"' not in prompt
+    assert '"unstructured_narrative"' in prompt and "only tests other than: Sodium, Potassium" in prompt
+    assert data["demographics"] == {"age": 68, "gender": "Male"}
+    assert data["medications"] == ["Aspirin 81mg"]
+    flags = {(lab["test_name"], lab["value"]): lab["flag"] for lab in data["labs"]}
+    assert flags[("Glucose", 210)] == "High"
+    assert flags[("Troponin T", 0.12)] == "Critical"
+    assert flags[("Potassium", 5.8)] == "High"
+    assert ("Glucose", 1) not in flags
+
+
+def test_llm_adds_labs_the_rules_do_not_cover(monkeypatch):
+    """Test that LLM labs outside the alias table are kept alongside the rule labs."""
+    llm = RecordingLLM({"labs": [
+        {"test_name": "Ferritin", "value": 12, "unit": "ng/mL"},
+        {"test_name": "D-dimer", "value": 850, "unit": "ng/mL"},
+        {"test_name": "troponin i", "value": 0.4, "unit": None},
+    ]})
+    monkeypatch.setattr(clinical_parser, "get_llm_provider", lambda: llm)
+
+    data = clinical_parser.ClinicalParser().parse_document(
+        "Ferritin 12 ng/mL, D-dimer 850 ng/mL, Troponin I 0.5"
+    )
+
+    assert '"labs"' in llm.prompts[0]
+    assert [(lab["test_name"], lab["value"]) for lab in data["labs"]] == [
+        ("Troponin I", 0.5), ("Ferritin", 12), ("D-dimer", 850),
+    ]
+
+
+def test_si_units_are_converted_before_flagging(monkeypatch):
+    """Test that SI results are compared in the reference unit and unknown units are not flagged."""
+    monkeypatch.setattr(clinical_parser, "get_llm_provider", lambda: RecordingLLM({}))
+    labs = [
+        {"test_name": "Glucose", "value": 5.4, "unit": "mmol/L"},
+        {"test_name": "Creatinine", "value": 88, "unit": "umol/L"},
+        {"test_name": "Troponin T", "value": 14, "unit": "ng/L"},
+        {"test_name": "Creatinine", "value": 250, "unit": "µmol/L"},
+        {"test_name": "WBC", "value": 12.1, "unit": "x10^9/L"},
+        {"test_name": "Glucose", "value": 5.4, "unit": "mg/dL"},
+        {"test_name": "Glucose", "value": 5.4, "unit": None},
+        {"test_name": "Hemoglobin", "value": 7.1, "unit": "mmol/L"},
+    ]
+
+    flagged = clinical_parser.ClinicalParser()._detect_abnormal_labs(labs)
+
+    assert [lab["flag"] for lab in flagged] == [
+        "Normal", "Normal", "Normal", "High", "High", "Low", "Low", "Normal",
+    ]
+    assert "reference_range" not in flagged[-1]
+
+
+@pytest.mark.parametrize("rules_enabled", [True, False])
+def test_llm_failure_keeps_rule_fields(monkeypatch, rules_enabled):
+    """Test that an unparseable LLM answer still returns what the rules found."""
+    llm = RecordingLLM({})
+    llm.generate = lambda *a, **k: "not json"
+    monkeypatch.setattr(clinical_parser, "get_llm_provider", lambda: llm)
+    monkeypatch.setattr(clinical_parser.settings, "clinical_rules_enabled", rules_enabled)
+
+    data = clinical_parser.ClinicalParser().parse_document(MOCK_SUMMARY.read_text())
+
+    assert len(data["labs"]) == (8 if rules_enabled else 0)
+    assert data["demographics"]["age"] == (68 if rules_enabled else None)
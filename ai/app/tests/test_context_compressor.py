@@ -0,0 +1,53 @@
+"""Tests for extractive context compression."""
+
+import numpy as np
+
+from app.generation.context_compressor import compress_chunks, sentence_spans
+from app.vector.embeddings import EmbeddingProvider
+
+VOCAB = ["metformin", "renal", "dose", "weather", "football", "egfr"]
+
+
+class BagOfWordsProvider(EmbeddingProvider):
+    """Deterministic fake embedder: counts of a tiny vocabulary."""
+
+    def __init__(self):
+        super().__init__()
+        self.vector_size = len(VOCAB)
+        self.calls = 0
+
+    def get_embeddings(self, texts: list[str]) -> np.ndarray:
+        self.calls += 1
+        rows = [[t.lower().count(w) + 0.01 for w in VOCAB] for t in texts]
+        return np.array(rows, dtype=np.float32)
+
+
+def test_sentence_spans_keep_offsets():
+    """Test that spans point at sentences and do not split decimals."""
+    text = "Give 2.5 mg daily. Check eGFR!\nStop if below 30."
+
+    spans = sentence_spans(text)
+
+    assert [text[s:e] for s, e in spans] == ["Give 2.5 mg daily.", "Check eGFR!", "Stop if below 30."]
+
+
+def test_compression_keeps_relevant_sentences_with_offsets():
+    """Test that off-topic sentences are dropped and char offsets stay absolute."""
+    text = (
+        "The weather was mild. Metformin dose depends on renal function. "
+        "Football scores were high. Reduce the metformin dose when eGFR falls. "
+        "The weather turned cold. Football season ended."
+    )
+    chunk = {"id": "c1", "text": text, "char_start": 1000, "char_end": 1000 + len(text), "score": 0.9}
+    provider = BagOfWordsProvider()
+    query = provider.get_embeddings(["metformin renal dose egfr"])[0]
+
+    [out] = compress_chunks(query, [chunk], provider, target_ratio=0.4, min_sentences=2)
+
+    assert "Metformin dose depends on renal function." in out["text"]
+    assert "Reduce the metformin dose when eGFR falls." in out["text"]
+    assert "weather" not in out["text"] and "Football" not in out["text"]
+    for start, end in out["compressed_spans"]:
+        assert text[start - 1000 : end - 1000] in out["text"]
+    assert out["char_start"] == 1000 + text.index("Metformin")
+    assert provider.calls == 2  # query + one batch for all sentences
@@ -1,9 +1,15 @@
 """Tests for embedding and Qdrant upsert."""
 
+import threading
+from types import SimpleNamespace
+
+import httpx
+import openai
 import pytest
 import numpy as np
 
-from app.vector.embeddings import LocalEmbeddingProvider, OpenAIEmbeddingProvider
+from app.vector.embeddings import LocalEmbeddingProvider, OpenAIEmbeddingProvider, truncate_embeddings
+from app.vector.openai_batcher import OpenAIEmbeddingBatcher, pack_by_tokens
 
 
 def test_local_embedding_provider():
@@ -42,6 +48,30 @@ def test_local_embedding_consistency():
     np.testing.assert_array_almost_equal(embedding1, embedding2)
 
 
+PARITY_TEXTS = [
+    "What is the first-line treatment for type 2 diabetes?",
+    "Metformin dose should be reduced when eGFR falls below 45.",
+    "Symptoms of community-acquired pneumonia include fever and productive cough.",
+    "ACE inhibitors can cause a persistent dry cough.",
+    "Patient reports chest pain radiating to the left arm.",
+    "Hemoglobin A1c 8.2% on 2024-03-01",
+]
+
+
+@pytest.mark.parametrize("precision", ["int8", "fp16"])
+def test_local_embedding_precision_parity(precision):
+    """Test that quantized inference stays within cosine 0.99 of fp32."""
+    reference = LocalEmbeddingProvider(precision="fp32").get_embeddings(PARITY_TEXTS)
+    reduced = LocalEmbeddingProvider(precision=precision).get_embeddings(PARITY_TEXTS)
+
+    cosine = np.sum(reference * reduced, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(reduced, axis=1)
+    )
+
+    assert reduced.dtype == np.float32
+    assert cosine.min() >= 0.99
+
+
 @pytest.mark.skipif(True, reason="Requires OpenAI API key")
 def test_openai_embedding_provider():
     """Test OpenAI embedding provider (requires API key)."""
@@ -67,3 +97,127 @@ def test_embedding_vector_size():
     assert provider.vector_size > 0
 
 
+
+
+def test_truncate_embeddings_renormalizes():
+    """Test Matryoshka truncation keeps the leading dims and unit length."""
+    vectors = np.random.default_rng(0).normal(size=(4, 384)).astype(np.float32)
+
+    reduced = truncate_embeddings(vectors, 128)
+
+    assert reduced.shape == (4, 128)
+    np.testing.assert_allclose(np.linalg.norm(reduced, axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_allclose(
+        reduced[0] / reduced[0][0], vectors[0][:128] / vectors[0][0], rtol=1e-4
+    )
+
+
+class FakePoolModel:
+    """Stand-in SentenceTransformer exposing the multi-process pool API."""
+
+    def __init__(self):
+        self.pool_calls: list[list[str]] = []
+
+    def start_multi_process_pool(self, target_devices):
+        return {"processes": target_devices}
+
+    def stop_multi_process_pool(self, pool):
+        pass
+
+    def encode_multi_process(self, texts, pool, batch_size=32, chunk_size=None):
+        self.pool_calls.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_local_bulk_uses_pool_and_keeps_input_order():
+    """Test that bulk encoding with workers goes through the pool and restores input order."""
+    provider = LocalEmbeddingProvider.__new__(LocalEmbeddingProvider)
+    provider.model = FakePoolModel()
+    provider.vector_size, provider.truncate_dim, provider._pool = 2, 0, None
+    texts = ["a", "ccc", "bb", "dddd"]
+
+    out = provider.get_embeddings_bulk(texts, workers=2, batch_size=1, sort_by_length=True)
+
+    assert provider.model.pool_calls == [["dddd", "ccc", "bb", "a"]]
+    assert out[:, 0].tolist() == [1.0, 3.0, 2.0, 4.0]
+    provider.close_pool()
+
+
+class FakeEmbeddingsAPI:
+    """Stand-in for client.embeddings with scripted failures."""
+
+    def __init__(self, fail_first_with: int | None = None, max_inputs: int | None = None):
+        self.fail_first_with = fail_first_with
+        self.max_inputs = max_inputs
+        self.requests: list[list[str]] = []
+        self._lock = threading.Lock()
+
+    def create(self, model: str, input: list[str]):
+        request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+        with self._lock:
+            self.requests.append(list(input))
+            status, self.fail_first_with = self.fail_first_with, None
+        if status == 429:
+            response = httpx.Response(429, headers={"retry-after": "0"}, request=request)
+            raise openai.RateLimitError("rate limited", response=response, body=None)
+        if self.max_inputs and len(input) > self.max_inputs:
+            response = httpx.Response(400, request=request)
+            raise openai.BadRequestError("too many tokens", response=response, body=None)
+        # Return items out of order to check that the batcher sorts by index
+        data = [
+            SimpleNamespace(index=i, embedding=[float(text.split()[-1]), 1.0])
+            for i, text in enumerate(input)
+        ]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+def test_pack_by_tokens_respects_limits():
+    """Test that packing keeps contiguous ranges under token and input limits."""
+    texts = ["word " * 40] * 10  # ~50 tokens each
+
+    ranges = pack_by_tokens(texts, max_tokens=120, max_inputs=3)
+
+    assert ranges[0] == (0, 2)
+    assert ranges[-1][1] == len(texts)
+    assert all(e - s <= 3 for s, e in ranges)
+
+
+def test_openai_batcher_keeps_order_with_concurrency():
+    """Test that concurrent requests still return embeddings in input order."""
+    api = FakeEmbeddingsAPI()
+    batcher = OpenAIEmbeddingBatcher(
+        SimpleNamespace(embeddings=api), "fake", max_inputs_per_request=7, max_in_flight=4
+    )
+    texts = [f"text {i}" for i in range(50)]
+
+    embeddings = batcher.embed(texts)
+
+    assert len(api.requests) == 8
+    assert embeddings.dtype == np.float32
+    assert embeddings[:, 0].tolist() == list(range(50))
+
+
+def test_openai_batcher_empty_input_keeps_dimension():
+    """Test that no texts give a (0, dim) array that still stacks with real embeddings."""
+    api = FakeEmbeddingsAPI()
+    batcher = OpenAIEmbeddingBatcher(SimpleNamespace(embeddings=api), "fake", dimensions=4)
+
+    empty = batcher.embed([])
+
+    assert empty.shape == (0, 4) and empty.dtype == np.float32
+    assert api.requests == []
+    batcher.request_params["dimensions"] = 2
+    assert batcher.embed([]).shape == (0, 2)
+
+
+def test_openai_batcher_retries_and_splits():
+    """Test Retry-After handling on 429 and halving of rejected batches."""
+    api = FakeEmbeddingsAPI(fail_first_with=429, max_inputs=4)
+    batcher = OpenAIEmbeddingBatcher(SimpleNamespace(embeddings=api), "fake", max_in_flight=1)
+    texts = [f"text {i}" for i in range(10)]
+
+    embeddings = batcher.embed(texts)
+
+    assert embeddings[:, 0].tolist() == list(range(10))
+    # 429 then retry, 400 then halves (and halves again) until each request fits
+    assert [len(r) for r in api.requests] == [10, 10, 5, 2, 3, 5, 2, 3]
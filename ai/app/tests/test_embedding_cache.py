@@ -0,0 +1,87 @@
+"""Tests for the persistent embedding cache."""
+
+import numpy as np
+
+from app.vector.embedding_cache import CachedEmbeddingProvider
+from app.vector.embeddings import EmbeddingProvider
+
+
+class CountingProvider(EmbeddingProvider):
+    """Deterministic fake provider that records which texts it embedded."""
+
+    def __init__(self, vector_size: int = 8):
+        super().__init__()
+        self.model_name = "fake/model"
+        self.vector_size = vector_size
+        self.calls: list[list[str]] = []
+
+    def get_embeddings(self, texts: list[str]) -> np.ndarray:
+        self.calls.append(list(texts))
+        rng = [np.random.default_rng(abs(hash(t)) % (2**32)) for t in texts]
+        return np.stack([r.random(self.vector_size, dtype=np.float32) for r in rng])
+
+
+def test_only_misses_reach_provider(tmp_path):
+    """Test that repeated and duplicate texts are not re-embedded."""
+    inner = CountingProvider()
+    provider = CachedEmbeddingProvider(inner, cache_dir=str(tmp_path))
+
+    first = provider.get_embeddings(["metformin", "insulin", "metformin"])
+    second = provider.get_embeddings(["insulin", "lisinopril"])
+
+    assert inner.calls == [["metformin", "insulin"], ["lisinopril"]]
+    np.testing.assert_array_equal(first[0], first[2])
+    np.testing.assert_array_equal(first[1], second[0])
+    assert first.dtype == np.float32
+
+
+def test_cache_survives_restart(tmp_path):
+    """Test that a new provider instance reads vectors from disk instead of re-embedding."""
+    texts = [f"chunk {i}" for i in range(50)]
+    cold = CachedEmbeddingProvider(CountingProvider(), cache_dir=str(tmp_path))
+    expected = cold.get_embeddings(texts)
+
+    inner = CountingProvider()
+    warm = CachedEmbeddingProvider(inner, cache_dir=str(tmp_path), lru_size=4)
+    actual = warm.get_embeddings(texts)
+
+    assert inner.calls == []
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_cache_is_keyed_by_model(tmp_path):
+    """Test that different models do not share cached vectors."""
+    a = CachedEmbeddingProvider(CountingProvider(), cache_dir=str(tmp_path))
+    a.get_embeddings(["sepsis bundle"])
+
+    other = CountingProvider(vector_size=4)
+    other.model_name = "other/model"
+    b = CachedEmbeddingProvider(other, cache_dir=str(tmp_path))
+    b.get_embeddings(["sepsis bundle"])
+
+    assert other.calls == [["sepsis bundle"]]
+
+
+def test_cache_is_keyed_by_precision(tmp_path):
+    """Test that quantized vectors are not served to an fp32 model of the same name."""
+    int8 = CountingProvider()
+    int8.precision = "int8"
+    CachedEmbeddingProvider(int8, cache_dir=str(tmp_path)).get_embeddings(["sepsis bundle"])
+
+    fp32 = CountingProvider()
+    fp32.precision = "fp32"
+    CachedEmbeddingProvider(fp32, cache_dir=str(tmp_path)).get_embeddings(["sepsis bundle"])
+
+    assert fp32.calls == [["sepsis bundle"]]
+
+
+def test_bulk_shares_cache_with_single(tmp_path):
+    """Test that bulk encoding fills and reads the same cache as get_embeddings."""
+    inner = CountingProvider()
+    provider = CachedEmbeddingProvider(inner, cache_dir=str(tmp_path))
+
+    bulk = provider.get_embeddings_bulk(["a", "b", "c"])
+    single = provider.get_embeddings(["c", "a"])
+
+    assert inner.calls == [["a", "b", "c"]]
+    np.testing.assert_array_equal(single, bulk[[2, 0]])
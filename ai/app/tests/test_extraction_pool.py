@@ -0,0 +1,138 @@
+"""Tests for process-pool document extraction and the async upload job API."""
+
+import asyncio
+import time
+
+import fitz
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import routes_patient
+from app.ingestion.extraction_pool import ExtractionPool
+
+
+def _pdf_bytes(text: str) -> bytes:
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class _FakeParser:
+    def parse_document(self, text):
+        return {"unstructured_narrative": text.strip(), "labs": []}
+
+
+@pytest.fixture
+def pool():
+    pool = ExtractionPool(max_workers=1, max_concurrency=2, timeout=60)
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_extracts_pdf(pool):
+    """Test that a PDF is extracted in a worker process."""
+    text, metadata = asyncio.run(pool.extract(_pdf_bytes("Potassium 5.9 mmol/L"), "application/pdf"))
+
+    assert "Potassium 5.9" in text
+    assert metadata["page_count"] == 1
+
+
+def test_pool_timeout():
+    """Test that a job exceeding the timeout raises instead of blocking the caller."""
+    pool = ExtractionPool(max_workers=1, timeout=0.01)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(pool.extract(_pdf_bytes("slow"), "application/pdf"))
+    finally:
+        pool.shutdown()
+
+
+def test_async_upload_job(pool, monkeypatch):
+    """Test that an async upload returns a job id that resolves to a patient session."""
+    monkeypatch.setattr(routes_patient, "get_extraction_pool", lambda: pool)
+    monkeypatch.setattr(routes_patient, "get_clinical_parser", lambda: _FakeParser())
+    app = FastAPI()
+    app.include_router(routes_patient.router, prefix="/patient")
+
+    with TestClient(app) as client:
+        files = {"file": ("report.pdf", _pdf_bytes("Creatinine 2.1 mg/dL"), "application/pdf")}
+        accepted = client.post("/patient/upload/async", files=files)
+        assert accepted.status_code == 202
+        status_url = accepted.json()["status_url"]
+
+        deadline = time.time() + 60
+        job = client.get(status_url).json()
+        while job["status"] in ("queued", "running") and time.time() < deadline:
+            time.sleep(0.1)
+            job = client.get(status_url).json()
+
+        assert job["status"] == "done", job
+        assert "Creatinine 2.1" in job["result"]["structured_data"]["unstructured_narrative"]
+        assert job["result"]["session_id"]
+
+        rejected = client.post(
+            "/patient/upload/async", files={"file": ("a.txt", b"x", "text/plain")}
+        )
+        assert rejected.status_code == 400
+
+
+def test_timeout_recycles_worker_and_queue_time_is_free(monkeypatch):
+    """Test that waiting for a busy worker is not timed and a timed-out worker is killed."""
+    pool = ExtractionPool(max_workers=1, max_concurrency=4, timeout=30)
+    monkeypatch.setattr("app.ingestion.extraction_pool.extract_document", _slow_extract)
+
+    async def run_three():
+        # Warm the worker so spawn time does not count, then queue three 0.6s jobs on it
+        await pool.extract(b"", "application/pdf")
+        pool.timeout = 1.0
+        return await asyncio.gather(*(pool.extract(b"", "application/pdf") for _ in range(3)))
+
+    try:
+        assert [text for text, _ in asyncio.run(run_three())] == ["done"] * 3
+
+        (process,) = pool._idle[0]._processes.values()
+        monkeypatch.setattr("app.ingestion.extraction_pool.extract_document", _sleep_forever)
+        pool.timeout = 0.5
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(pool.extract(b"", "application/pdf"))
+        process.join(timeout=5)
+        assert not process.is_alive()
+        assert pool._idle[0] is None
+    finally:
+        pool.shutdown()
+
+
+def test_cancelled_extraction_kills_worker(monkeypatch):
+    """Test that a cancelled job's worker is killed instead of going back to the idle queue."""
+    pool = ExtractionPool(max_workers=1, max_concurrency=2, timeout=30)
+
+    async def cancel_running_job():
+        await pool.extract(_pdf_bytes("warm up"), "application/pdf")
+        (process,) = pool._idle[0]._processes.values()
+        monkeypatch.setattr("app.ingestion.extraction_pool.extract_document", _sleep_forever)
+        task = asyncio.create_task(pool.extract(b"", "application/pdf"))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return process
+
+    try:
+        process = asyncio.run(cancel_running_job())
+        process.join(timeout=5)
+        assert not process.is_alive()
+        assert pool._idle[0] is None
+    finally:
+        pool.shutdown()
+
+
+def _slow_extract(*args):
+    time.sleep(0.6)
+    return "done", {}
+
+
+def _sleep_forever(*args):
+    time.sleep(3600)
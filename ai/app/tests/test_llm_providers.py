@@ -0,0 +1,130 @@
+"""Tests for the OpenAI-compatible LLM provider against a local fake server."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+
+from app.generation.llm import OpenAICompatibleLLMProvider
+
+
+class _FakeChatHandler(BaseHTTPRequestHandler):
+    """Minimal /v1/chat/completions: echoes the prompt, supports n, stream and a slow prompt."""
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._send_json({"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = request["messages"][-1]["content"]
+        self.server.in_flight += 1
+        self.server.peak = max(self.server.peak, self.server.in_flight)
+        try:
+            time.sleep(2.0 if prompt == "slow" else 0.1)
+            if request.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for piece in prompt.split(" "):
+                    chunk = {
+                        "id": "c", "object": "chat.completion.chunk", "created": 0,
+                        "model": request["model"],
+                        "choices": [{"index": 0, "delta": {"content": piece + " "}}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+                return
+            choices = [
+                {
+                    "index": i,
+                    "message": {"role": "assistant", "content": f"{prompt} #{i}"},
+                    "finish_reason": "stop",
+                }
+                for i in range(request.get("n", 1))
+            ]
+            self._send_json(
+                {
+                    "id": "c", "object": "chat.completion", "created": 0,
+                    "model": request["model"], "choices": choices,
+                    "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+                }
+            )
+        finally:
+            self.server.in_flight -= 1
+
+
+@pytest.fixture
+def fake_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeChatHandler)
+    server.in_flight = 0
+    server.peak = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _provider(server, **kwargs) -> OpenAICompatibleLLMProvider:
+    return OpenAICompatibleLLMProvider(
+        base_url=f"http://127.0.0.1:{server.server_address[1]}/v1", **kwargs
+    )
+
+
+def test_generate_and_n_completions(fake_server):
+    """Test single generation, model discovery, and n samples from one request."""
+    llm = _provider(fake_server)
+
+    assert llm.model_name == "fake-model"
+    assert llm.generate("hello") == "hello #0"
+    assert llm.generate_n("q", n=3) == ["q #0", "q #1", "q #2"]
+
+
+def test_model_is_resolved_on_first_request(monkeypatch):
+    """Test that constructing the provider does not contact a server that is down."""
+    monkeypatch.setattr("app.generation.llm.settings.llm_max_retries", 0)
+    llm = OpenAICompatibleLLMProvider(base_url="http://127.0.0.1:9/v1", timeout=0.5)
+
+    with pytest.raises(openai.APIConnectionError):
+        llm.generate("hello")
+
+
+def test_batch_runs_concurrently_in_order(fake_server):
+    """Test that batched prompts are in flight together and results keep input order."""
+    llm = _provider(fake_server, max_concurrency=4)
+    prompts = [f"p{i}" for i in range(8)]
+
+    assert llm.generate_batch(prompts) == [f"p{i} #0" for i in range(8)]
+    assert 1 < fake_server.peak <= 4
+
+
+def test_stream_yields_deltas(fake_server):
+    """Test that streaming yields the completion piece by piece."""
+    llm = _provider(fake_server)
+
+    pieces = list(llm.generate_stream("a b c"))
+
+    assert pieces == ["a ", "b ", "c "]
+
+
+def test_request_timeout(fake_server, monkeypatch):
+    """Test that a slow server raises a timeout instead of hanging."""
+    monkeypatch.setattr("app.generation.llm.settings.llm_max_retries", 0)
+    llm = _provider(fake_server, timeout=0.5)
+
+    with pytest.raises(openai.APITimeoutError):
+        llm.generate("slow")
@@ -0,0 +1,96 @@
+"""Tests for patient session memory and the rolling summary."""
+
+from app.core.memory import PatientSession, SessionManager
+from app.core.session_store import MemorySessionStore
+
+
+def _session_with_turns(pairs: int) -> PatientSession:
+    session = PatientSession(session_id="s1", structured_data={})
+    for i in range(pairs):
+        session.add_interaction(f"question {i}", f"answer {i}")
+    return session
+
+
+def test_evicted_turns_are_queued_for_summary():
+    """Test that turns pushed out of the window become pending instead of being lost."""
+    session = _session_with_turns(7)
+
+    assert len(session.history) == 10
+    assert session.history[0]["content"] == "question 2"
+    assert [t["content"] for t in session.pending_summary_turns] == [
+        "question 0", "answer 0", "question 1", "answer 1",
+    ]
+
+
+def _manager_with_turns(pairs: int) -> tuple[SessionManager, str]:
+    manager = SessionManager(MemorySessionStore())
+    sid = manager.create_session({})
+    for i in range(pairs):
+        manager.update_session(sid, lambda s, i=i: s.add_interaction(f"question {i}", f"answer {i}"))
+    return manager, sid
+
+
+def test_refresh_folds_only_pending_turns():
+    """Test that a refresh summarizes just the new evictions and clears them."""
+    manager, sid = _manager_with_turns(6)
+    calls = []
+
+    def summarize(summary, turns):
+        calls.append((summary, [t["content"] for t in turns]))
+        return f"{summary}+{len(turns)}"
+
+    assert manager.refresh_summary(sid, summarize) is True
+    assert manager.refresh_summary(sid, summarize) is False  # nothing pending
+    manager.update_session(sid, lambda s: s.add_interaction("question 6", "answer 6"))
+    assert manager.refresh_summary(sid, summarize) is True
+
+    session = manager.get_session(sid)
+    assert calls == [("", ["question 0", "answer 0"]), ("+2", ["question 1", "answer 1"])]
+    assert session.summary == "+2+2"
+    assert session.pending_summary_turns == []
+
+
+def test_failed_refresh_keeps_turns_pending():
+    """Test that an LLM failure leaves the summary and pending turns untouched."""
+    manager, sid = _manager_with_turns(6)
+
+    def summarize(summary, turns):
+        raise RuntimeError("llm down")
+
+    assert manager.refresh_summary(sid, summarize) is False
+    session = manager.get_session(sid)
+    assert session.summary == ""
+    assert len(session.pending_summary_turns) == 2
+
+
+def test_apply_summary_refuses_moved_on_state():
+    """Test that a summary computed from an outdated base or turns is not installed."""
+    session = _session_with_turns(7)
+    turns = list(session.pending_summary_turns[:2])
+
+    assert session.apply_summary("", turns, "- first") is True
+    assert session.apply_summary("", turns, "- again") is False
+    assert session.summary == "- first"
+    assert [t["content"] for t in session.pending_summary_turns] == ["question 1", "answer 1"]
+
+
+def test_formatted_context_is_cached_until_data_changes(monkeypatch):
+    """Test that the prompt context is built once and rebuilt only after structured_data changes."""
+    session = PatientSession(
+        session_id="s1",
+        structured_data={"labs": [{"test_name": "K", "value": 6.1, "unit": "mmol/L", "flag": "High"}]},
+    )
+    builds = []
+    original = PatientSession._build_context
+    monkeypatch.setattr(
+        PatientSession, "_build_context", lambda self: builds.append(1) or original(self)
+    )
+
+    first = session.format_context_for_prompt()
+    assert session.format_context_for_prompt() is first
+    assert "K: 6.1 mmol/L (FLAG: High)" in first
+    assert session.context_tokens > 0
+
+    session.structured_data = {"labs": [{"test_name": "Na", "value": 140, "unit": "mmol/L"}]}
+    assert "Na: 140 mmol/L (Normal)" in session.format_context_for_prompt()
+    assert len(builds) == 2
@@ -0,0 +1,97 @@
+"""Tests for PDF text extraction and the OCR fallback for scanned pages."""
+
+import shutil
+import time
+
+import fitz
+import pytest
+
+from app.ingestion import parse_pdf
+from app.ingestion.parse_pdf import extract_pdf_text
+
+
+def _text_page(doc, text):
+    doc.new_page().insert_text((72, 72), text, fontsize=14)
+
+
+def _scanned_page(doc, text):
+    """Add an image-only page showing text (like a scanner would produce)."""
+    src = fitz.open()
+    _text_page(src, text)
+    png = src[0].get_pixmap(dpi=200).tobytes("png")
+    page = doc.new_page()
+    page.insert_image(page.rect, stream=png)
+
+
+def _mixed_pdf() -> bytes:
+    doc = fitz.open()
+    _text_page(doc, "Admission note: chest pain, troponin pending.")
+    _scanned_page(doc, "Potassium 5.9 mmol/L")
+    _text_page(doc, "Discharge plan: follow up in cardiology clinic.")
+    _scanned_page(doc, "Creatinine 2.1 mg/dL")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def test_text_pages_have_timings_and_no_ocr(monkeypatch):
+    """Test that pages with a text layer are extracted directly."""
+    monkeypatch.setattr("app.ingestion.parse_pdf.settings.pdf_ocr_enabled", False)
+
+    text, metadata = extract_pdf_text(_mixed_pdf())
+
+    assert [p["page"] for p in metadata["page_texts"]] == [1, 3]
+    assert metadata["ocr_pages"] == []
+    assert [t["source"] for t in metadata["page_timings"]] == ["text"] * 4
+
+
+def test_ocr_results_come_back_in_page_order(monkeypatch):
+    """Test that OCR'd pages are merged in page order even when they finish out of order."""
+    delays = iter([0.2, 0.0])
+
+    def slow_first_ocr(png, lang, timeout):
+        time.sleep(next(delays))
+        return f"scanned {len(png) > 0}"
+
+    monkeypatch.setattr(parse_pdf, "_tesseract_available", lambda: True)
+    monkeypatch.setattr(parse_pdf, "_ocr_png", slow_first_ocr)
+
+    text, metadata = extract_pdf_text(_mixed_pdf())
+
+    assert metadata["ocr_pages"] == [2, 4]
+    assert [p["page"] for p in metadata["page_texts"]] == [1, 2, 3, 4]
+    assert text.index("[Page 2]") < text.index("[Page 3]") < text.index("[Page 4]")
+    assert [t["source"] for t in metadata["page_timings"]] == ["text", "ocr", "text", "ocr"]
+
+
+def test_ocr_keeps_a_bounded_window_and_streams(monkeypatch):
+    """Test that only 2 * workers pages are rasterized ahead and results arrive before the scan ends."""
+    doc = fitz.open()
+    for n in range(12):
+        _text_page(doc, f"page {n}")
+    rendered = []
+    real_get_pixmap = fitz.Page.get_pixmap
+
+    def counting_get_pixmap(page, *args, **kwargs):
+        rendered.append(page.number + 1)
+        return real_get_pixmap(page, *args, dpi=20)
+
+    monkeypatch.setattr(fitz.Page, "get_pixmap", counting_get_pixmap)
+    monkeypatch.setattr(parse_pdf, "_ocr_png", lambda png, lang, timeout: "ocr")
+
+    pages = parse_pdf.iter_ocr_pages(doc, list(range(1, 13)), workers=2)
+    first = next(pages)
+
+    assert first[0] == 1
+    assert len(rendered) == 4
+    assert [p for p, _, _ in pages] == list(range(2, 13))
+    assert rendered == list(range(1, 13))
+
+
+@pytest.mark.skipif(shutil.which("tesseract") is None, reason="tesseract not installed")
+def test_scanned_pages_are_ocrd():
+    """Test the OCR fallback end to end with tesseract."""
+    text, metadata = extract_pdf_text(_mixed_pdf())
+
+    assert metadata["ocr_pages"] == [2, 4]
+    assert "Potassium" in text and "Creatinine" in text
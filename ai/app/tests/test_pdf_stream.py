@@ -0,0 +1,105 @@
+"""Tests for streaming PDF ingestion."""
+
+import fitz
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+
+from app.core.tokens import count_tokens
+from app.ingestion.chunker import chunk_by_sliding_window, page_number_at
+from app.ingestion.parse_pdf import extract_pdf_text
+from app.ingestion.pdf_stream import StreamingChunker, ingest_pdf_streaming, iter_pdf_pages
+from app.vector.embeddings import EmbeddingProvider
+from app.vector.qdrant_client import ensure_collection
+
+
+class HashProvider(EmbeddingProvider):
+    """Deterministic toy embeddings."""
+
+    def __init__(self):
+        super().__init__()
+        self.vector_size = 8
+
+    def get_embeddings(self, texts: list[str]) -> np.ndarray:
+        return np.stack(
+            [np.random.default_rng(abs(hash(t)) % 2**32).random(8, dtype=np.float32) for t in texts]
+        )
+
+
+@pytest.fixture
+def guideline_pdf(tmp_path):
+    doc = fitz.open()
+    for n in range(1, 13):
+        page = doc.new_page()
+        page.insert_text((72, 60), f"Section {n}", fontsize=14, fontname="hebo")
+        page.insert_textbox(
+            fitz.Rect(72, 80, 540, 760), f"Recommendation {n}: reassess renal function. " * (20 + 7 * n), fontsize=8
+        )
+    doc.new_page()  # Blank page
+    path = tmp_path / "guideline.pdf"
+    doc.save(path)
+    return path
+
+
+def test_pages_arrive_in_order(guideline_pdf):
+    """Test that parallel extraction yields the same pages, in order, as the in-memory path."""
+    _, metadata = extract_pdf_text(guideline_pdf.read_bytes())
+
+    pages = list(iter_pdf_pages(str(guideline_pdf), workers=2, pages_per_task=3))
+
+    assert [p for p, _, _ in pages] == list(range(1, 14))
+    assert [(p, t) for p, t, _ in pages if t] == [(p["page"], p["text"]) for p in metadata["page_texts"]]
+    assert pages[4][2] == "Section 5"
+
+
+def test_streaming_chunks_match_in_memory_chunking(guideline_pdf):
+    """Test that carry-over chunking reproduces the whole-document windows and page numbers."""
+    text, metadata = extract_pdf_text(guideline_pdf.read_bytes())
+    expected = [(s, e, page_number_at(metadata["page_spans"], s)) for s, e, _ in chunk_by_sliding_window(text)]
+
+    chunker = StreamingChunker()
+    streamed = []
+    for page in metadata["page_texts"]:
+        streamed += chunker.add_page(page["page"], page["text"])
+        # Checkpoint and restore between pages
+        chunker = StreamingChunker(chunker.state())
+    streamed += chunker.finish()
+
+    assert [(s, e, p) for s, e, _, p, _ in streamed] == expected
+    assert all(t == text[s:e] for s, e, t, _, _ in streamed)
+
+
+def test_ingest_resumes_after_failure(guideline_pdf, tmp_path, monkeypatch):
+    """Test that a run interrupted mid-document resumes from its checkpoint without gaps."""
+    monkeypatch.setattr("app.ingestion.pdf_stream.settings.pdf_stream_progress_dir", str(tmp_path / "progress"))
+    provider = HashProvider()
+
+    reference = QdrantClient(":memory:")
+    ensure_collection(reference, "ref", provider.vector_size)
+    total = ingest_pdf_streaming(guideline_pdf, "ref", provider, reference, batch_size=4, workers=2)
+
+    client = QdrantClient(":memory:")
+    ensure_collection(client, "docs", provider.vector_size)
+    real_upsert = client.upsert
+    calls = []
+
+    def failing_upsert(**kwargs):
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError("qdrant went away")
+        return real_upsert(**kwargs)
+
+    monkeypatch.setattr(client, "upsert", failing_upsert)
+    with pytest.raises(RuntimeError):
+        ingest_pdf_streaming(guideline_pdf, "docs", provider, client, batch_size=4, workers=2)
+    ingest_pdf_streaming(guideline_pdf, "docs", provider, client, batch_size=4, workers=2)
+
+    def _points(c, name):
+        points, _ = c.scroll(name, limit=1000, with_payload=True)
+        return {p.id: (p.payload["page_number"], p.payload["text"]) for p in points}
+
+    assert total > 8
+    points, _ = reference.scroll("ref", limit=1000, with_payload=True)
+    assert all(p.payload["tokens"] == count_tokens(p.payload["text"]) for p in points)
+    assert _points(client, "docs") == _points(reference, "ref")
+    assert ingest_pdf_streaming(guideline_pdf, "docs", provider, client, batch_size=4) == 0
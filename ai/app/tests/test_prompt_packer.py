@@ -0,0 +1,87 @@
+"""Tests for token-budgeted prompt packing."""
+
+from app.core.prompt_packer import pack_context, pack_history, trim_to_tokens
+from app.core.prompts import pack_rag_prompt
+from app.core.tokens import count_tokens
+
+
+def _chunk(i, score, sentences=20):
+    text = " ".join(f"Sentence {j} of chunk {i} about renal dosing." for j in range(sentences))
+    return {"id": i, "title": f"Doc {i}", "url": f"https://example.org/{i}", "text": text, "rerank_score": score}
+
+
+def test_trim_keeps_whole_sentences():
+    """Test that trimming drops trailing sentences instead of cutting mid-sentence."""
+    text = "First sentence here. Second sentence is a bit longer. Third one."
+
+    trimmed = trim_to_tokens(text, count_tokens("First sentence here. Second sentence is a bit longer."))
+
+    assert trimmed == "First sentence here. Second sentence is a bit longer."
+    assert trim_to_tokens(text, 1000) == text
+
+
+def test_trim_keeps_line_breaks():
+    """Test that trimmed line-per-item text (labs, history) keeps its newlines."""
+    text = "- Sodium: 138 (Normal)\n- Potassium: 5.9 (FLAG: High)\n- Creatinine: 1.9 (FLAG: High)\n"
+    budget = count_tokens("- Sodium: 138 (Normal)") + count_tokens("- Potassium: 5.9 (FLAG: High)")
+
+    assert trim_to_tokens(text, budget) == "- Sodium: 138 (Normal)\n- Potassium: 5.9 (FLAG: High)"
+    budget = count_tokens("- Potassium: 5.9 (FLAG: High)") + count_tokens("- Creatinine: 1.9 (FLAG: High)")
+    assert trim_to_tokens(text, budget, keep_end=True) == (
+        "- Potassium: 5.9 (FLAG: High)\n- Creatinine: 1.9 (FLAG: High)"
+    )
+
+
+def test_context_filled_by_score_within_budget():
+    """Test that the best-scoring chunks are packed first and the budget holds."""
+    chunks = [_chunk(1, 0.1), _chunk(2, 0.9), _chunk(3, 0.5)]
+
+    block, used, included = pack_context(chunks, budget=250, chunk_max_tokens=120)
+
+    assert used <= 250
+    assert [c["id"] for c in included] == [2, 3]
+    assert block.startswith("[Ref 1] Doc 2") and "[Ref 2] Doc 3" in block
+    assert block.index("Doc 2") < block.index("Doc 3")
+    assert "Doc 1" not in block
+
+
+def test_history_keeps_most_recent_turns():
+    """Test that history packing drops the oldest turns first."""
+    history = [{"role": "user", "content": f"question number {i} " * 5} for i in range(10)]
+
+    block, used, turns = pack_history(history, budget=60)
+
+    assert used <= 60
+    assert 0 < turns < 10
+    assert block.rstrip().endswith(history[-1]["content"].strip())
+
+
+def test_pack_rag_prompt_respects_total_budget():
+    """Test that the packed prompt stays near the configured total and reports section counts."""
+    packed = pack_rag_prompt(
+        chunks=[_chunk(i, 1.0 / (i + 1), sentences=60) for i in range(8)],
+        user_query="How should metformin be dosed in CKD?",
+        history=[{"role": "user", "content": "Earlier question " * 50}] * 12,
+        patient_context="eGFR 38. Creatinine 1.9 (FLAG: High). " * 80,
+        max_tokens=2000,
+    )
+
+    counts = packed.token_counts
+    assert counts["total"] <= 2000 * 1.05
+    assert counts["context"] > 0 and counts["chunks"] >= 1
+    assert "[Ref 1] Doc 0" in packed.text
+    assert len(packed.chunks) == counts["chunks"] < 8
+    for n, chunk in enumerate(packed.chunks, 1):
+        assert f"[Ref {n}] {chunk['title']}" in packed.text
+
+
+def test_cache_friendly_layout_shares_static_prefix():
+    """Test that only the trailing, dynamic part differs between two requests."""
+    first = pack_rag_prompt([_chunk(1, 0.9)], "Dose of metformin?", patient_context="eGFR 38").text
+    second = pack_rag_prompt([_chunk(2, 0.8)], "Potassium target?", patient_context="K 5.4").text
+
+    prefix_len = next(i for i, (a, b) in enumerate(zip(first, second)) if a != b)
+
+    assert "REQUIRED RESPONSE STRUCTURE" in first[:prefix_len]
+    assert first.index("=== UPLOADED PATIENT DATA") < first.index("=== CLINICIAN QUESTION")
+    assert first.rstrip().endswith("Dose of metformin?")
@@ -0,0 +1,145 @@
+"""Tests for reranking helpers."""
+
+import threading
+from collections import OrderedDict
+
+import pytest
+from transformers import BertTokenizerFast, DistilBertTokenizerFast
+
+from app.vector.optimized_reranker import ParallelCrossEncoderReranker
+from app.vector.rerank_cache import RerankScoreCache
+from app.vector.reranker import CrossEncoderReranker, should_bypass_rerank
+
+
+def _chunks(scores):
+    return [{"id": i, "score": s, "text": f"chunk {i}"} for i, s in enumerate(scores)]
+
+
+def test_bypass_when_top_scores_are_decisive():
+    """Test that a clear gap after rank top_n skips reranking."""
+    chunks = _chunks([0.93, 0.91, 0.9] + [0.38] * 37)
+
+    bypass, stats = should_bypass_rerank(chunks, top_n=3)
+
+    assert bypass
+    assert stats["margin"] > 0.5
+
+
+def test_no_bypass_when_scores_are_flat():
+    """Test that a flat score distribution still goes through the reranker."""
+    chunks = _chunks([0.62, 0.61, 0.6, 0.59, 0.58, 0.57])
+
+    bypass, stats = should_bypass_rerank(chunks, top_n=3)
+
+    assert not bypass
+    assert stats["margin"] < 0.25
+
+
+def test_no_bypass_with_too_few_chunks():
+    """Test that there is nothing to decide when chunks do not exceed top_n."""
+    bypass, stats = should_bypass_rerank(_chunks([0.9, 0.2]), top_n=3)
+
+    assert not bypass
+    assert stats == {}
+
+
+def test_rerank_cache_normalizes_query():
+    """Test that whitespace/case variants of a query share cache keys."""
+    chunk = {"id": "c1", "text": "Metformin is first-line therapy."}
+
+    key_a = RerankScoreCache.make_key("model", "First-line  therapy?", chunk)
+    key_b = RerankScoreCache.make_key("model", " first-line therapy? ", chunk)
+    key_c = RerankScoreCache.make_key("other-model", "first-line therapy?", chunk)
+
+    assert key_a == key_b
+    assert key_a != key_c
+
+
+def test_rerank_cache_lru_eviction():
+    """Test that the cache stays bounded and evicts least recently used entries."""
+    cache = RerankScoreCache(max_size=2)
+    cache.put_many(["a", "b"], [1.0, 2.0])
+    cache.get_many(["a"])
+    cache.put_many(["c"], [3.0])
+
+    assert len(cache) == 2
+    assert cache.get_many(["a", "b", "c"]) == [1.0, None, 3.0]
+
+
+def test_rerank_cache_persistence(tmp_path):
+    """Test that saved scores are reloaded on a warm restart."""
+    path = tmp_path / "rerank_scores.json"
+    cache = RerankScoreCache(max_size=10, path=str(path))
+    cache.put_many(["a", "b"], [0.5, -1.25])
+    cache.save()
+
+    warm = RerankScoreCache(max_size=10, path=str(path))
+
+    assert warm.get_many(["a", "b"]) == [0.5, -1.25]
+
+
+def test_rerank_cache_save_merges_other_writers(tmp_path):
+    """Test that two processes saving to one path keep each other's scores."""
+    path = tmp_path / "rerank_scores.json"
+    worker_a = RerankScoreCache(max_size=10, path=str(path))
+    worker_b = RerankScoreCache(max_size=10, path=str(path))
+    worker_a.put_many(["a"], [1.0])
+    worker_b.put_many(["b", "a"], [2.0, 1.5])
+
+    worker_a.save()
+    worker_b.save()
+
+    assert RerankScoreCache(max_size=10, path=str(path)).get_many(["a", "b"]) == [1.5, 2.0]
+
+
+def test_parallel_rerank_shares_score_cache(monkeypatch):
+    """Test that the parallel reranker fills and reads the same cache as CrossEncoderReranker.score."""
+    cache = RerankScoreCache(max_size=10)
+    monkeypatch.setattr("app.vector.reranker.get_rerank_cache", lambda: cache)
+    reranker = CrossEncoderReranker.__new__(CrossEncoderReranker)
+    reranker.model_name = "model"
+    reranker.model = reranker.tokenizer = object()
+    forwarded = []
+
+    def fake_forward(query, texts):
+        forwarded.append(list(texts))
+        return [float(t.split()[-1]) for t in texts]
+
+    reranker._forward = fake_forward
+    parallel = ParallelCrossEncoderReranker(reranker, batch_size=2, max_workers=2)
+    chunks = _chunks([0.1] * 5)
+
+    first = parallel.rerank("query", chunks, top_n=2)
+    second = reranker.score("query", _chunks([0.1] * 5))
+
+    assert [c["id"] for c in first] == [4, 3]
+    assert second == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert sorted(t for batch in forwarded for t in batch) == [f"chunk {i}" for i in range(5)]
+
+
+@pytest.mark.parametrize("tokenizer_class", [BertTokenizerFast, DistilBertTokenizerFast])
+def test_pretokenized_pairs_match_tokenizer(tmp_path, tokenizer_class):
+    """Test that pairs built from cached chunk ids match the tokenizer's own pair encoding."""
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "dose", "mg", "daily", "renal", "adjust"]
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab))
+    tokenizer = tokenizer_class(vocab_file=str(vocab_file))
+
+    reranker = CrossEncoderReranker.__new__(CrossEncoderReranker)
+    reranker.tokenizer = tokenizer
+    reranker.max_length = 16
+    reranker._chunk_tokens = OrderedDict()
+    reranker._chunk_tokens_lock = threading.Lock()
+
+    query = "renal dose adjust mg daily renal dose"
+    texts = ["dose mg daily", "renal adjust " * 8, "mg " * 20]
+
+    ours = reranker._encode_pairs(query, texts)
+    expected = tokenizer(
+        [(query, t) for t in texts], padding=True, truncation=True, max_length=16, return_tensors="pt"
+    )
+
+    assert set(ours.keys()) == set(expected.keys())
+    for key in expected:
+        assert ours[key].tolist() == expected[key].tolist()
+    assert len(reranker._chunk_tokens) == len(texts)
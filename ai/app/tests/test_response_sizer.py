@@ -0,0 +1,44 @@
+"""Tests for query classification in the response sizer."""
+
+from app.generation.response_sizer import (
+    _category_hits,
+    classify_queries,
+    classify_query,
+    select_response_policy,
+)
+
+
+def test_cues_respect_word_boundaries():
+    """Test that cues do not fire inside unrelated words."""
+    hits = _category_hits("show me the reason because of the update")
+
+    assert hits["analytical"] == 0  # "how" in "show"
+    assert hits["scenario"] == 0  # "case" in "because"
+    assert hits["simple"] == 0  # "date" in "update"
+
+
+def test_cues_match_inflections_and_overlaps():
+    """Test that inflected forms match and overlapping cues are all counted."""
+    hits = _category_hits("what happens if i double the dose? treatment plan and symptoms")
+
+    assert hits["scenario"] == 2  # "what happens if", "if i"
+    assert hits["simple"] == 2  # "dose", "symptom"
+    assert hits["complex"] == 1  # "treatment plan"
+    assert hits["clinical"] == 1  # "treat" via "treatment"
+
+
+def test_classify_query_types():
+    """Test the main routing decisions."""
+    assert classify_query("What is the dose of amoxicillin?")["type"] == "short_answer"
+    assert classify_query("Patient with CKD presents with hyperkalemia")["type"] == "clinical_scenario"
+    assert classify_query("Explain why and how beta blockers work")["type"] == "clinical_guidance"
+
+
+def test_classify_queries_matches_single():
+    """Test that the batch API returns the same classifications in order."""
+    queries = ["What is metformin?", "Approach to syncope in the elderly", "Compare ACE inhibitors and ARBs"]
+
+    batch = classify_queries(queries)
+
+    assert [r["type"] for r in batch] == [classify_query(q)["type"] for q in queries]
+    assert select_response_policy(queries[1]) == batch[1]["policy"]
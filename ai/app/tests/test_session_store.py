@@ -0,0 +1,246 @@
+"""Tests for the session store backends."""
+
+import socketserver
+import threading
+import time
+
+import orjson
+import pytest
+
+from app.core.memory import PatientSession, SessionConflictError, SessionManager
+from app.core.session_store import (
+    MemorySessionStore,
+    RedisSessionStore,
+    SqliteSessionStore,
+    dump_session,
+    load_session,
+)
+
+
+def _session(session_id: str, narrative: str = "") -> PatientSession:
+    return PatientSession(
+        session_id=session_id,
+        structured_data={"unstructured_narrative": narrative, "labs": [{"test_name": "K", "value": 5.9}]},
+    )
+
+
+class _FakeRespHandler(socketserver.StreamRequestHandler):
+    """Speaks enough RESP for GET/SET [EX]/EXPIRE/DEL against a dict.
+
+    EVAL runs RedisSessionStore's compare-and-set script (atomically, like Redis).
+    """
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            size = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(size + 2)[:-2])
+        return args
+
+    def handle(self):
+        data = self.server.data
+        while (args := self._read_command()) is not None:
+            cmd = args[0].upper()
+            if cmd == b"SET":
+                data[args[1]] = args[2]
+                self.server.ttls[args[1]] = int(args[4]) if len(args) > 4 else None
+                self.wfile.write(b"+OK\r\n")
+            elif cmd == b"GET":
+                value = data.get(args[1])
+                self.wfile.write(b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value))
+            elif cmd == b"EXPIRE":
+                self.server.ttls[args[1]] = int(args[2])
+                self.wfile.write(b":1\r\n")
+            elif cmd == b"EVAL":
+                key, expected, value, ttl = args[3:7]
+                with self.server.lock:
+                    current = data.get(key)
+                    written = current is not None and orjson.loads(current)["version"] == int(expected)
+                    if written:
+                        data[key] = value
+                        self.server.ttls[key] = int(ttl) or None
+                self.wfile.write(b":%d\r\n" % written)
+            elif cmd == b"DEL":
+                self.wfile.write(b":%d\r\n" % int(data.pop(args[1], None) is not None))
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def fake_redis():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _FakeRespHandler)
+    server.daemon_threads = True
+    server.data, server.ttls = {}, {}
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_serialization_roundtrip():
+    """Test that orjson serialization keeps data, history and summary state."""
+    session = _session("s1", "CKD stage 3")
+    session.add_interaction("q", "a")
+    session.summary = "- prior turns"
+
+    restored = load_session(dump_session(session))
+
+    assert restored.model_dump() == session.model_dump()
+
+
+def test_memory_store_lru_and_byte_bound():
+    """Test count-bounded LRU eviction, recency on get, and the byte limit."""
+    store = MemorySessionStore(max_sessions=2)
+    for sid in ("a", "b"):
+        store.put(_session(sid))
+    store.get("a")
+    store.put(_session("c"))
+
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+
+    size = len(dump_session(_session("x", "n" * 1000)))
+    store = MemorySessionStore(max_sessions=100, max_bytes=int(size * 2.5))
+    for sid in ("x", "y", "z"):
+        store.put(_session(sid, "n" * 1000))
+    assert store.stats()["sessions"] == 2
+    assert store.stats()["bytes"] <= size * 2.5
+
+
+def test_memory_store_idle_ttl(monkeypatch):
+    """Test that sessions idle past the TTL are dropped."""
+    clock = [1000.0]
+    monkeypatch.setattr("app.core.session_store.time.monotonic", lambda: clock[0])
+    store = MemorySessionStore(ttl_seconds=60)
+    store.put(_session("a"))
+
+    clock[0] += 30
+    assert store.get("a") is not None
+    clock[0] += 59
+    assert store.get("a") is not None
+    clock[0] += 61
+    assert store.get("a") is None
+
+
+def test_sqlite_store_shared_and_bounded(tmp_path):
+    """Test that a second connection sees saved sessions and the LRU bound applies."""
+    path = str(tmp_path / "sessions.db")
+    writer = SqliteSessionStore(path, max_sessions=2)
+    reader = SqliteSessionStore(path, max_sessions=2)
+
+    manager = SessionManager(writer)
+    sid = manager.create_session({"active_problems": ["HTN"]})
+    session = manager.get_session(sid)
+    session.add_interaction("q", "a")
+    manager.save_session(session)
+
+    assert reader.get(sid).history == session.history
+
+    time.sleep(0.01)
+    writer.put(_session("b"))
+    time.sleep(0.01)
+    writer.put(_session("c"))
+    assert reader.get(sid) is None
+    assert reader.stats()["sessions"] == 2
+
+
+def test_redis_store_roundtrip(fake_redis):
+    """Test the RESP client against a fake server, including the sliding TTL."""
+    port = fake_redis.server_address[1]
+    store = RedisSessionStore(f"redis://127.0.0.1:{port}/0", ttl_seconds=120)
+
+    store.put(_session("r1", "COPD"))
+    restored = store.get("r1")
+
+    assert restored.structured_data["unstructured_narrative"] == "COPD"
+    assert fake_redis.ttls[b"cdss:session:r1"] == 120
+    store.delete("r1")
+    assert store.get("r1") is None
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "redis"])
+def test_compare_and_set_rejects_stale_writes(tmp_path, request, backend):
+    """Test that a write based on an outdated version is refused and nothing is overwritten."""
+    if backend == "memory":
+        store = MemorySessionStore()
+        store.put(_session("s"))
+        # The memory store hands out live objects; a stale copy is a deserialized snapshot
+        stale = load_session(dump_session(store.get("s")))
+    else:
+        if backend == "sqlite":
+            store = SqliteSessionStore(str(tmp_path / "sessions.db"))
+        else:
+            port = request.getfixturevalue("fake_redis").server_address[1]
+            store = RedisSessionStore(f"redis://127.0.0.1:{port}/0", ttl_seconds=120)
+        store.put(_session("s"))
+        stale = store.get("s")
+    current = store.get("s")
+    current.add_interaction("newer", "turn")
+    assert store.put(current, expected_version=current.version)
+
+    stale.summary = "stale"
+    assert not store.put(stale, expected_version=stale.version)
+    assert not store.put(_session("missing"), expected_version=0)
+
+    saved = store.get("s")
+    assert saved.history[0]["content"] == "newer" and saved.summary == ""
+
+
+def test_redis_failed_write_keeps_version(fake_redis, monkeypatch):
+    """Test that a connection error during put leaves the session's version unchanged."""
+    port = fake_redis.server_address[1]
+    store = RedisSessionStore(f"redis://127.0.0.1:{port}/0")
+    session = _session("r1")
+    store.put(session)
+
+    def dropped(*args):
+        raise ConnectionError("connection reset")
+
+    monkeypatch.setattr(store.client, "execute", dropped)
+    with pytest.raises(ConnectionError):
+        store.put(session, expected_version=session.version)
+    assert session.version == 1
+
+
+def test_summary_refresh_keeps_turns_saved_meanwhile(tmp_path):
+    """Test that a slow background summary does not overwrite history another worker saved."""
+    path = str(tmp_path / "sessions.db")
+    manager = SessionManager(SqliteSessionStore(path))
+    other_worker = SessionManager(SqliteSessionStore(path))
+    sid = manager.create_session({})
+    for i in range(6):
+        manager.update_session(sid, lambda s, i=i: s.add_interaction(f"q{i}", f"a{i}"))
+    calls = []
+
+    def slow_summarize(summary, turns):
+        calls.append([t["content"] for t in turns])
+        # The next /analyze lands on another worker while the LLM call runs
+        other_worker.update_session(sid, lambda s: s.add_interaction("q6", "a6"))
+        return "- summary of q0"
+
+    assert manager.refresh_summary(sid, slow_summarize)
+    # A refresh that started from the same state elsewhere no longer applies
+    stale_turns = [{"role": "user", "content": "q0"}, {"role": "assistant", "content": "a0"}]
+    assert other_worker.update_session(sid, lambda s: s.apply_summary("", stale_turns, "- dup")) is None
+
+    session = manager.get_session(sid)
+    assert calls == [["q0", "a0"]]
+    assert session.summary == "- summary of q0"
+    assert session.history[-1]["content"] == "a6"
+    assert [t["content"] for t in session.pending_summary_turns] == ["q1", "a1"]
+
+
+def test_update_raises_when_writes_keep_conflicting():
+    """Test that exhausted compare-and-set retries raise instead of looking like a missing session."""
+    store = MemorySessionStore()
+    manager = SessionManager(store)
+    sid = manager.create_session({})
+    store.put = lambda session, expected_version=None: False
+
+    with pytest.raises(SessionConflictError):
+        manager.update_session(sid, lambda s: s.add_interaction("q", "a"), retries=2)
+    assert manager.update_session("missing", lambda s: s.add_interaction("q", "a")) is None
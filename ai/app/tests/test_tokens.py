@@ -0,0 +1,53 @@
+"""Tests for the token counting service."""
+
+from transformers import BertTokenizerFast
+
+from app.core.tokens import TokenCounter, get_embedding_token_counter
+
+
+def test_batch_counts_match_single_and_hit_cache():
+    """Test that batched counts equal single counts and repeated texts are served from cache."""
+    counter = TokenCounter(backend="estimate")
+    texts = ["HbA1c 8.2% on metformin 500 mg BID", "eGFR 38", "HbA1c 8.2% on metformin 500 mg BID"]
+
+    batch = counter.count_batch(texts)
+
+    assert batch == [counter.count(t) for t in texts]
+    assert len(counter._cache) == 2
+
+
+def test_cache_is_bounded():
+    """Test that the LRU keeps at most cache_size entries."""
+    counter = TokenCounter(backend="estimate", cache_size=3)
+
+    counter.count_batch([f"text {i}" for i in range(10)])
+
+    assert len(counter._cache) == 3
+
+
+def test_hf_backend_uses_tokenizer(tmp_path):
+    """Test that the HF backend counts real tokenizer ids without special tokens."""
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "dose", "mg", "daily"]
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab))
+    BertTokenizerFast(vocab_file=str(vocab_file)).save_pretrained(tmp_path / "tok")
+    counter = TokenCounter(backend="hf", model=str(tmp_path / "tok"))
+
+    assert counter.count_batch(["dose mg daily", "mg mg mg mg"]) == [3, 4]
+
+
+def test_unloadable_tokenizer_falls_back_to_estimate(tmp_path):
+    """Test that a missing tokenizer degrades to estimated counts instead of failing."""
+    counter = TokenCounter(backend="hf", model=str(tmp_path / "missing"))
+
+    assert counter.count("x" * 40) == 10
+
+
+def test_embedding_counter_uses_embedding_tokenizer():
+    """Test that embedding models get their own counter: HF tokenizer for hub ids, else tiktoken."""
+    local = get_embedding_token_counter("sentence-transformers/all-MiniLM-L6-v2")
+    remote = get_embedding_token_counter("text-embedding-3-small")
+
+    assert (local.backend, local.model) == ("hf", "sentence-transformers/all-MiniLM-L6-v2")
+    assert remote.backend == "tiktoken"
+    assert get_embedding_token_counter("text-embedding-3-small") is remote
@@ -0,0 +1,135 @@
+"""Cross-page embedding queue that batches chunks before embedding and upserting."""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from app.core.tokens import get_embedding_token_counter, get_token_counter
+from app.vector.embeddings import EmbeddingProvider
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class EmbeddingBatchQueue:
+    """Accumulates chunks from many producers and embeds them in well-sized batches.
+
+    Producers (e.g. crawler threads) call put() with the chunks of one page. A
+    single consumer thread packs them into batches of at most batch_size texts
+    or max_tokens estimated tokens, embeds each batch with the shared provider
+    and hands (items, embeddings) to sink, typically a Qdrant upsert.
+    """
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        sink: Callable[[list[Any], np.ndarray], None],
+        batch_size: int = 256,
+        max_tokens: int = 250_000,
+        max_wait: float = 2.0,
+        max_pending: int = 64,
+    ):
+        self.provider = provider
+        self.sink = sink
+        self.batch_size = batch_size
+        self.max_tokens = max_tokens
+        self.max_wait = max_wait
+        # Token limits apply to the embedding model, so count with its tokenizer
+        self._counter = (
+            get_embedding_token_counter(provider.model_name)
+            if provider.model_name
+            else get_token_counter()
+        )
+
+        self.embedded = 0
+        self.failed = 0
+        self.batches = 0
+        self.embed_seconds = 0.0
+
+        # Bounded so fast crawlers block instead of buffering unbounded pages
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="embedding-batch-queue", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "EmbeddingBatchQueue":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def put(self, items: list[Any], texts: list[str]) -> None:
+        """Queue one page worth of items and their texts for embedding."""
+        if items:
+            self._queue.put((items, texts))
+
+    def close(self) -> None:
+        """Flush remaining chunks and stop the consumer thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _run(self) -> None:
+        buf_items: list[Any] = []
+        buf_texts: list[str] = []
+        buf_tokens = 0
+
+        def flush() -> None:
+            nonlocal buf_items, buf_texts, buf_tokens
+            if buf_items:
+                self._flush(buf_items, buf_texts)
+            buf_items, buf_texts, buf_tokens = [], [], 0
+
+        while True:
+            try:
+                got = self._queue.get(timeout=self.max_wait)
+            except queue.Empty:
+                # Producers are slow (e.g. rate-limited crawl); don't sit on a partial batch
+                flush()
+                continue
+
+            if got is _STOP:
+                flush()
+                return
+
+            items, texts = got
+            for item, text, tokens in zip(items, texts, self._counter.count_batch(texts)):
+                if buf_items and (
+                    len(buf_items) >= self.batch_size or buf_tokens + tokens > self.max_tokens
+                ):
+                    flush()
+                buf_items.append(item)
+                buf_texts.append(text)
+                buf_tokens += tokens
+
+            if len(buf_items) >= self.batch_size:
+                flush()
+
+    def _flush(self, items: list[Any], texts: list[str]) -> None:
+        start = time.perf_counter()
+        try:
+            embeddings = self.provider.get_embeddings_bulk(texts)
+            self.sink(items, embeddings)
+            self.embedded += len(items)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(items)
+            logger.error(f"Error embedding batch of {len(items)} chunks: {e}")
+        finally:
+            self.embed_seconds += time.perf_counter() - start
+
+    def stats(self, elapsed: Optional[float] = None) -> dict[str, float]:
+        """Return counters, plus chunks/sec when the wall-clock elapsed time is given."""
+        out: dict[str, float] = {
+            "embedded": self.embedded,
+            "failed": self.failed,
+            "batches": self.batches,
+            "embed_seconds": round(self.embed_seconds, 2),
+        }
+        if elapsed:
+            out["chunks_per_sec"] = round(self.embedded / elapsed, 2)
+        return out
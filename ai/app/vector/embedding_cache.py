@@ -0,0 +1,214 @@
+"""Content-addressed embedding cache backed by an append-only memory-mapped vector file."""
+
+import fcntl
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from app.core.metrics import metrics
+from app.vector.embeddings import EmbeddingProvider
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 32  # sha256
+
+
+def text_digest(text: str) -> bytes:
+    """Compute the raw sha256 digest used as the cache key for a text."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingStore:
+    """Append-only vector file plus a parallel file of sha256 keys (row i <-> key i).
+
+    Vectors are written before their keys, so a key on disk always points at a
+    complete row. Appends take an exclusive file lock so several ingest
+    processes can share one store.
+    """
+
+    def __init__(self, directory: Path, dim: int):
+        self.directory = Path(directory)
+        self.dim = dim
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.f32"
+        self.keys_path = self.directory / "keys.bin"
+        self.lock_path = self.directory / ".lock"
+        self.vectors_path.touch(exist_ok=True)
+        self.keys_path.touch(exist_ok=True)
+
+        self._index: dict[bytes, int] = {}
+        self._keys_offset = 0
+        self._mmap: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self._sync_index()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _sync_index(self) -> None:
+        """Read keys appended (by this or another process) since the last sync."""
+        size = self.keys_path.stat().st_size
+        if size <= self._keys_offset:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            data = f.read(size - self._keys_offset)
+        usable = len(data) - len(data) % DIGEST_SIZE
+        row = self._keys_offset // DIGEST_SIZE
+        for i in range(0, usable, DIGEST_SIZE):
+            self._index[data[i : i + DIGEST_SIZE]] = row
+            row += 1
+        self._keys_offset += usable
+
+    def _vectors(self) -> np.ndarray:
+        """Return a memory map covering every indexed row."""
+        rows = self._keys_offset // DIGEST_SIZE
+        if self._mmap is None or self._mmap.shape[0] < rows:
+            self._mmap = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)
+            )
+        return self._mmap
+
+    def lookup(self, digests: list[bytes]) -> list[Optional[int]]:
+        """Map digests to row numbers (None when absent)."""
+        with self._lock:
+            rows = [self._index.get(d) for d in digests]
+            if any(r is None for r in rows):
+                self._sync_index()
+                rows = [self._index.get(d) for d in digests]
+            return rows
+
+    def read(self, rows: list[int]) -> np.ndarray:
+        """Read vectors for the given rows."""
+        with self._lock:
+            return np.array(self._vectors()[rows], dtype=np.float32)
+
+    def append(self, digests: list[bytes], vectors: np.ndarray) -> None:
+        """Append new vectors, skipping digests already stored by another writer."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock, open(self.lock_path, "wb") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._sync_index()
+                seen: set[bytes] = set()
+                keep = []
+                for i, d in enumerate(digests):
+                    if d not in self._index and d not in seen:
+                        seen.add(d)
+                        keep.append(i)
+                if not keep:
+                    return
+
+                # Drop any torn tail from an interrupted writer before appending
+                rows = self._keys_offset // DIGEST_SIZE
+                with open(self.vectors_path, "r+b") as f:
+                    f.truncate(rows * self.dim * 4)
+                    f.seek(0, 2)
+                    f.write(vectors[keep].tobytes())
+                with open(self.keys_path, "r+b") as f:
+                    f.truncate(self._keys_offset)
+                    f.seek(0, 2)
+                    f.write(b"".join(digests[i] for i in keep))
+                self._sync_index()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class CachedEmbeddingProvider(EmbeddingProvider):
+    """Embedding provider wrapper that only sends cache misses to the underlying provider.
+
+    Keys are (model name, sha256 of text): each model/dimension pair, and for local
+    models each inference precision, gets its own store directory. An in-memory LRU sits in front of the store for hot queries.
+    """
+
+    def __init__(self, provider: EmbeddingProvider, cache_dir: str, lru_size: int = 10000):
+        super().__init__()
+        self.provider = provider
+        self.model_name = provider.model_name
+        self.vector_size = provider.vector_size
+        self.lru_size = lru_size
+        self._lru: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._lru_lock = threading.Lock()
+
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.model_name)
+        key = f"{safe_name}-{self.vector_size}"
+        # int8/fp16/ONNX vectors differ slightly from fp32 ones: never mix them
+        precision = getattr(provider, "precision", None)
+        if precision:
+            key += f"-{precision}"
+        store_dir = Path(cache_dir) / key
+        self.store = EmbeddingStore(store_dir, self.vector_size)
+        logger.info(f"Embedding cache for {self.model_name}: {len(self.store)} vectors on disk")
+
+    def __getattr__(self, name: str) -> Any:
+        # Expose provider-specific attributes (e.g. the local model) of the wrapped provider
+        provider = self.__dict__.get("provider")
+        if provider is None:
+            raise AttributeError(name)
+        return getattr(provider, name)
+
+    def get_embeddings(self, texts: list[str]) -> np.ndarray:
+        """Generate embeddings, serving repeated texts from the cache."""
+        return self._get_cached(texts, self.provider.get_embeddings)
+
+    def get_embeddings_bulk(self, texts: list[str], workers: Optional[int] = None) -> np.ndarray:
+        """Bulk variant: cache misses go through the provider's bulk encoder."""
+        return self._get_cached(
+            texts, lambda misses: self.provider.get_embeddings_bulk(misses, workers=workers)
+        )
+
+    def _get_cached(
+        self, texts: list[str], embed: Callable[[list[str]], np.ndarray]
+    ) -> np.ndarray:
+        out = np.empty((len(texts), self.vector_size), dtype=np.float32)
+        digests = [text_digest(t) for t in texts]
+
+        # 1. In-memory LRU
+        pending: list[int] = []
+        with self._lru_lock:
+            for i, d in enumerate(digests):
+                vec = self._lru.get(d)
+                if vec is None:
+                    pending.append(i)
+                else:
+                    self._lru.move_to_end(d)
+                    out[i] = vec
+
+        # 2. On-disk store
+        missing: list[int] = []
+        if pending:
+            rows = self.store.lookup([digests[i] for i in pending])
+            found = [(i, r) for i, r in zip(pending, rows) if r is not None]
+            missing = [i for i, r in zip(pending, rows) if r is None]
+            if found:
+                out[[i for i, _ in found]] = self.store.read([r for _, r in found])
+
+        # 3. Underlying provider, once per distinct missing text
+        if missing:
+            unique: dict[bytes, int] = {}
+            for i in missing:
+                unique.setdefault(digests[i], i)
+            firsts = list(unique.values())
+            fresh = embed([texts[i] for i in firsts])
+            self.store.append([digests[i] for i in firsts], fresh)
+            by_digest = {digests[i]: vec for i, vec in zip(firsts, fresh)}
+            for i in missing:
+                out[i] = by_digest[digests[i]]
+
+        metrics.increment("embedding.cache_hits", len(texts) - len(missing))
+        metrics.increment("embedding.cache_misses", len(missing))
+
+        with self._lru_lock:
+            for i in pending:
+                self._lru[digests[i]] = out[i].copy()
+                self._lru.move_to_end(digests[i])
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+        return out
@@ -1,16 +1,27 @@
 """Embedding provider abstraction."""
 
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any, Optional
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
 logger = logging.getLogger(__name__)
 
 
+def truncate_embeddings(embeddings: np.ndarray, dim: int) -> np.ndarray:
+    """Matryoshka-style truncation: keep the first dim components and L2-renormalize."""
+    if not dim or embeddings.shape[-1] <= dim:
+        return embeddings
+    truncated = np.ascontiguousarray(embeddings[..., :dim], dtype=np.float32)
+    norms = np.linalg.norm(truncated, axis=-1, keepdims=True)
+    return truncated / np.maximum(norms, 1e-12)
+
+
 class EmbeddingProvider:
     """Abstract embedding provider."""
 
@@ -26,6 +37,13 @@ class EmbeddingProvider:
         """Generate embedding for a single text."""
         return self.get_embeddings([text])[0]
 
+    def get_embeddings_bulk(self, texts: list[str], workers: Optional[int] = None) -> np.ndarray:
+        """Generate embeddings for a large ingestion batch (throughput over latency).
+
+        workers is a process count for local encoders; other providers ignore it.
+        """
+        return self.get_embeddings(texts)
+
 
 class OpenAIEmbeddingProvider(EmbeddingProvider):
     """OpenAI embedding provider."""
@@ -33,8 +51,20 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
     def __init__(self):
         super().__init__()
         from openai import OpenAI
-        self.client = OpenAI(api_key=settings.openai_api_key)
+
+        from app.vector.openai_batcher import OpenAIEmbeddingBatcher
+
+        # Retries are handled by the batcher (Retry-After aware), not the SDK
+        self.client = OpenAI(api_key=settings.openai_api_key, max_retries=0)
         self.model_name = settings.openai_embed_model
+        self.batcher = OpenAIEmbeddingBatcher(
+            self.client,
+            self.model_name,
+            max_tokens_per_request=settings.openai_embed_request_max_tokens,
+            max_inputs_per_request=settings.openai_embed_request_max_inputs,
+            max_in_flight=settings.openai_embed_max_in_flight,
+            max_retries=settings.openai_embed_max_retries,
+        )
 
         # Map model names to vector sizes
         model_sizes = {
@@ -44,15 +74,29 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
         }
         self.vector_size = model_sizes.get(self.model_name, 1536)
 
+        # text-embedding-3-* can return shortened vectors server-side
+        dims = settings.embedding_dimensions
+        if dims and dims < self.vector_size:
+            if self.model_name.startswith("text-embedding-3"):
+                self.batcher.request_params["dimensions"] = dims
+                self.vector_size = dims
+            else:
+                logger.warning(
+                    f"{self.model_name} does not support reduced dimensions; using {self.vector_size}"
+                )
+        self.batcher.dimensions = self.vector_size
+
+    def reset_client(self) -> None:
+        """Recreate the HTTP client (connection pools must not be shared across fork)."""
+        from openai import OpenAI
+
+        self.client = OpenAI(api_key=settings.openai_api_key, max_retries=0)
+        self.batcher.client = self.client
+
     def get_embeddings(self, texts: list[str]) -> np.ndarray:
-        """Generate embeddings using OpenAI API."""
+        """Generate embeddings using OpenAI API (token-packed, concurrent requests)."""
         try:
-            response = self.client.embeddings.create(
-                model=self.model_name,
-                input=texts,
-            )
-            embeddings = [item.embedding for item in response.data]
-            return np.array(embeddings, dtype=np.float32)
+            return self.batcher.embed(texts)
         except Exception as e:
             logger.error(f"Error generating OpenAI embeddings: {e}")
             raise
@@ -61,31 +105,159 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
 class LocalEmbeddingProvider(EmbeddingProvider):
     """Local sentence-transformers embedding provider."""
 
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        dimensions: Optional[int] = None,
+        precision: Optional[str] = None,
+    ):
         super().__init__()
         self.model_name = model_name
-        logger.info(f"Loading local embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
-        self.vector_size = self.model.get_sentence_embedding_dimension()
+        self.precision = (precision or settings.local_embed_precision).lower()
+        logger.info(f"Loading local embedding model: {model_name} ({self.precision})")
+        self.model = self._load_model(model_name, self.precision)
+        self.native_size = self.model.get_sentence_embedding_dimension()
+
+        dims = settings.embedding_dimensions if dimensions is None else dimensions
+        self.truncate_dim = dims if dims and dims < self.native_size else 0
+        self.vector_size = self.truncate_dim or self.native_size
+
+        self._pool: Optional[dict[str, Any]] = None
+
+    @staticmethod
+    def _load_model(model_name: str, precision: str) -> "SentenceTransformer":
+        """Load the model for the configured inference precision.
+
+        - fp32: stock PyTorch weights
+        - int8: torch dynamic quantization of the Linear layers (CPU)
+        - fp16: half precision; bfloat16 on CPU, where fp16 matmuls are slow
+        - onnx: ONNX Runtime backend (requires optimum[onnxruntime])
+        """
+        # Imported here: sentence_transformers pulls in torch and transformers
+        from sentence_transformers import SentenceTransformer
+
+        if precision == "onnx":
+            return SentenceTransformer(model_name, backend="onnx")
+
+        model = SentenceTransformer(model_name)
+        if precision == "fp32":
+            return model
+
+        import torch
+
+        if precision == "int8":
+            model = model.to("cpu")
+            return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        if precision == "fp16":
+            return model.to(torch.float16 if model.device.type == "cuda" else torch.bfloat16)
+        raise ValueError(f"Unknown local embedding precision: {precision}")
 
     def get_embeddings(self, texts: list[str]) -> np.ndarray:
         """Generate embeddings using local model."""
         try:
             embeddings = self.model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
-            return embeddings.astype(np.float32)
+            return truncate_embeddings(embeddings.astype(np.float32), self.truncate_dim)
         except Exception as e:
             logger.error(f"Error generating local embeddings: {e}")
             raise
 
+    def get_embeddings_bulk(
+        self,
+        texts: list[str],
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        sort_by_length: Optional[bool] = None,
+    ) -> np.ndarray:
+        """Encode a large batch with length-sorted batches and, optionally, a process pool.
+
+        Sorting by length keeps padding low inside each batch (and keeps each
+        worker's share homogeneous); results are returned in input order.
+        """
+        workers = settings.local_embed_workers if workers is None else workers
+        batch_size = batch_size or settings.local_embed_batch_size
+        if sort_by_length is None:
+            sort_by_length = settings.local_embed_sort_by_length
+        if not texts:
+            return np.empty((0, self.vector_size), dtype=np.float32)
+
+        order = (
+            sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+            if sort_by_length
+            else list(range(len(texts)))
+        )
+        ordered = [texts[i] for i in order]
+
+        try:
+            if workers > 1 and len(texts) > batch_size:
+                pool = self._get_pool(workers)
+                # encode_multi_process exists on every supported sentence-transformers
+                # version (encode(pool=...) only from 5.0)
+                encoded = self.model.encode_multi_process(
+                    ordered,
+                    pool,
+                    batch_size=batch_size,
+                    chunk_size=max(batch_size, -(-len(ordered) // (workers * 4))),
+                )
+            else:
+                encoded = self.model.encode(
+                    ordered, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True
+                )
+        except Exception as e:
+            logger.error(f"Error generating bulk local embeddings: {e}")
+            raise
+
+        out = np.empty((len(texts), encoded.shape[1]), dtype=np.float32)
+        out[order] = encoded
+        return truncate_embeddings(out, self.truncate_dim)
+
+    def _get_pool(self, workers: int) -> dict[str, Any]:
+        """Start (once) a sentence-transformers multi-process pool of CPU workers."""
+        if self._pool is None or len(self._pool["processes"]) != workers:
+            self.close_pool()
+            import atexit
+
+            import torch
+
+            devices = (
+                [f"cuda:{i % torch.cuda.device_count()}" for i in range(workers)]
+                if torch.cuda.is_available()
+                else ["cpu"] * workers
+            )
+            logger.info(f"Starting embedding pool with {workers} workers on {devices[0]}")
+            self._pool = self.model.start_multi_process_pool(target_devices=devices)
+            atexit.register(self.close_pool)
+        return self._pool
+
+    def close_pool(self) -> None:
+        """Stop the multi-process pool if one is running."""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
 
 def get_embedding_provider() -> EmbeddingProvider:
-    """Get configured embedding provider."""
+    """Get configured embedding provider (wrapped in the persistent cache if enabled)."""
+    provider: EmbeddingProvider
     if settings.embeddings_provider == "openai":
         if not settings.openai_api_key:
             logger.warning("OpenAI API key not set, falling back to local embeddings")
-            return LocalEmbeddingProvider()
-        return OpenAIEmbeddingProvider()
+            provider = LocalEmbeddingProvider()
+        else:
+            provider = OpenAIEmbeddingProvider()
     else:
-        return LocalEmbeddingProvider()
+        provider = LocalEmbeddingProvider()
+
+    if settings.embedding_cache_enabled:
+        from app.vector.embedding_cache import CachedEmbeddingProvider
+
+        try:
+            return CachedEmbeddingProvider(
+                provider,
+                cache_dir=settings.embedding_cache_dir,
+                lru_size=settings.embedding_cache_lru_size,
+            )
+        except Exception as e:
+            logger.warning(f"Could not open embedding cache, continuing without it: {e}")
+    return provider
 
 
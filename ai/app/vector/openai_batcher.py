@@ -0,0 +1,144 @@
+"""Token-aware, concurrent batching for OpenAI embedding requests."""
+
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+import numpy as np
+import openai
+
+from app.core.metrics import metrics
+from app.core.tokens import TokenCounter, get_embedding_token_counter, get_token_counter
+
+logger = logging.getLogger(__name__)
+
+
+def pack_by_tokens(
+    texts: list[str], max_tokens: int, max_inputs: int, counter: Optional[TokenCounter] = None
+) -> list[tuple[int, int]]:
+    """Split texts into contiguous [start, end) ranges under the token and input limits.
+
+    counter should count with the embedding model's tokenizer; defaults to the chat model's.
+    """
+    ranges: list[tuple[int, int]] = []
+    start, tokens = 0, 0
+    for i, count in enumerate((counter or get_token_counter()).count_batch(texts)):
+        t = count + 1
+        if i > start and (tokens + t > max_tokens or i - start >= max_inputs):
+            ranges.append((start, i))
+            start, tokens = i, 0
+        tokens += t
+    if start < len(texts):
+        ranges.append((start, len(texts)))
+    return ranges
+
+
+def _retry_after_seconds(error: openai.APIStatusError) -> Optional[float]:
+    """Read Retry-After (or retry-after-ms) from an API error response."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class OpenAIEmbeddingBatcher:
+    """Packs inputs by estimated tokens and issues embedding requests concurrently.
+
+    Output order always matches input order. 429s honour Retry-After, transient
+    errors back off exponentially, and requests rejected as too large are split
+    in half and retried.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        model: str,
+        max_tokens_per_request: int = 250_000,
+        max_inputs_per_request: int = 2048,
+        max_in_flight: int = 4,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        request_params: Optional[dict[str, Any]] = None,
+        dimensions: Optional[int] = None,
+    ):
+        self.client = client
+        self.model = model
+        self.max_tokens_per_request = max_tokens_per_request
+        self.max_inputs_per_request = max_inputs_per_request
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.request_params = request_params or {}
+        # Vector size, used to shape the result for an empty input
+        self.dimensions = dimensions
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed texts, returning a float32 array aligned with the input order."""
+        if not texts:
+            dims = self.request_params.get("dimensions") or self.dimensions or 0
+            return np.empty((0, dims), dtype=np.float32)
+
+        ranges = pack_by_tokens(
+            texts,
+            self.max_tokens_per_request,
+            self.max_inputs_per_request,
+            counter=get_embedding_token_counter(self.model),
+        )
+        batches = [texts[s:e] for s, e in ranges]
+
+        if len(batches) == 1 or self.max_in_flight <= 1:
+            results = [self._embed_batch(b) for b in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(batches))) as executor:
+                # map() yields in submission order, which keeps outputs aligned with inputs
+                results = list(executor.map(self._embed_batch, batches))
+
+        return np.array([vec for batch in results for vec in batch], dtype=np.float32)
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embed one request worth of texts with retries and split-on-failure."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.embeddings.create(
+                    model=self.model, input=texts, **self.request_params
+                )
+                metrics.increment("embedding.openai_requests")
+                data = sorted(response.data, key=lambda item: item.index)
+                return [item.embedding for item in data]
+
+            except openai.BadRequestError:
+                # Usually the request exceeded a token limit: halve it rather than give up
+                if len(texts) == 1:
+                    raise
+                mid = len(texts) // 2
+                logger.warning(f"Embedding request of {len(texts)} inputs rejected; splitting in half")
+                metrics.increment("embedding.openai_splits")
+                return self._embed_batch(texts[:mid]) + self._embed_batch(texts[mid:])
+
+            except openai.RateLimitError as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = _retry_after_seconds(e) or self._backoff(attempt)
+                metrics.increment("embedding.openai_rate_limited")
+                logger.warning(f"Embedding rate limited; retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+            except (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"Transient embedding error ({e.__class__.__name__}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+        raise RuntimeError("unreachable")
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with jitter, capped at 60s."""
+        return min(60.0, self.base_delay * (2**attempt)) * (0.5 + random.random() / 2)
@@ -1,9 +1,8 @@
 """Optimized cross-encoder reranking with parallel batch processing."""
 
 import logging
-from typing import Any, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import torch
+from typing import Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -48,101 +47,76 @@ class ParallelCrossEncoderReranker:
             logger.warning("Reranker not available, returning original chunks")
             return chunks[:top_n]
         
-        # If chunks are few, no need for parallelization overhead
-        if len(chunks) <= self.batch_size:
-            logger.debug(f"Small batch ({len(chunks)} chunks), using sequential reranking")
-            return self.reranker.rerank(query, chunks, top_n)
-        
         try:
-            # Split chunks into batches
-            batches = [
-                chunks[i:i + self.batch_size] 
-                for i in range(0, len(chunks), self.batch_size)
-            ]
-            logger.info(f"Processing {len(chunks)} chunks in {len(batches)} parallel batches")
-            
-            # Process batches in parallel using ThreadPoolExecutor
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # Submit all batches for processing
-                future_to_batch = {
-                    executor.submit(self._score_batch, query, batch, batch_idx): batch_idx
-                    for batch_idx, batch in enumerate(batches)
-                }
-                
-                # Collect results as they complete
-                all_scored_chunks = []
-                for future in as_completed(future_to_batch):
-                    batch_idx = future_to_batch[future]
-                    try:
-                        scored_batch = future.result()
-                        all_scored_chunks.extend(scored_batch)
-                    except Exception as e:
-                        logger.error(f"Error processing batch {batch_idx}: {e}")
-            
-            # Sort all chunks by rerank score
-            all_scored_chunks.sort(key=lambda x: x.get("rerank_score", 0.0), reverse=True)
-            
-            # Return top N
-            reranked = all_scored_chunks[:top_n]
-            logger.info(f"Parallel reranking complete: {len(chunks)} → {len(reranked)} chunks")
-            
+            # Cache lookup/fill is shared with the sequential reranker; only misses reach _score_missing
+            scores = self.reranker.score(query, chunks, forward=self._score_missing)
+
+            # Attach scores to chunks
+            for chunk, score in zip(chunks, scores):
+                chunk["rerank_score"] = float(score)
+                chunk["score"] = float(score)  # Replace original score
+
+            # Sort all chunks by rerank score and return top N
+            reranked = sorted(chunks, key=lambda x: x.get("rerank_score", 0.0), reverse=True)[:top_n]
+            logger.info(
+                f"Parallel reranking complete: {len(chunks)} → {len(reranked)} chunks"
+            )
+
             return reranked
-        
+
         except Exception as e:
             logger.error(f"Error in parallel reranking: {e}, falling back to sequential")
             return self.reranker.rerank(query, chunks, top_n)
-    
+
+    def _score_missing(self, query: str, texts: List[str]) -> List[Optional[float]]:
+        """
+        Score uncached texts, in parallel batches when there are enough of them.
+
+        Args:
+            query: User query
+            texts: Chunk texts that had no cached score
+
+        Returns:
+            Scores aligned with texts (None for batches that failed)
+        """
+        # If texts are few, no need for parallelization overhead
+        if len(texts) <= self.batch_size:
+            logger.debug(f"Small batch ({len(texts)} chunks), using sequential scoring")
+            return self._score_batch(query, texts, 0)
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        logger.info(f"Processing {len(texts)} chunks in {len(batches)} parallel batches")
+
+        # executor.map keeps batch order so scores stay aligned with texts
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(
+                lambda args: self._score_batch(query, *args),
+                [(batch, idx) for idx, batch in enumerate(batches)],
+            )
+            return [score for batch_scores in results for score in batch_scores]
+
     def _score_batch(
-        self, query: str, batch: List[dict[str, Any]], batch_idx: int
-    ) -> List[dict[str, Any]]:
+        self, query: str, batch: List[str], batch_idx: int
+    ) -> List[Optional[float]]:
         """
-        Score a single batch of chunks (runs in parallel thread).
-        
+        Score a single batch of chunk texts (runs in parallel thread).
+
         Args:
             query: User query
-            batch: List of chunks in this batch
+            batch: Chunk texts in this batch
             batch_idx: Index of this batch (for logging)
-        
+
         Returns:
-            List of chunks with rerank_score added
+            Scores for the batch (None for every item if the batch failed)
         """
         try:
-            # Prepare query-text pairs for this batch
-            pairs = [(query, chunk.get("text", "")) for chunk in batch]
-            
-            # Tokenize and score using the model
-            with torch.no_grad():
-                inputs = self.reranker.tokenizer(
-                    pairs,
-                    padding=True,
-                    truncation=True,
-                    max_length=512,
-                    return_tensors="pt",
-                ).to(self.reranker.device)
-                
-                # Get scores from model
-                scores = self.reranker.model(**inputs).logits.squeeze()
-                
-                # Handle single-item batch (scores would be 0-d tensor)
-                if scores.dim() == 0:
-                    scores = [scores.item()]
-                else:
-                    scores = scores.cpu().tolist()
-            
-            # Attach scores to chunks
-            for chunk, score in zip(batch, scores):
-                chunk["rerank_score"] = float(score)
-                chunk["score"] = float(score)  # Replace original score
-            
+            scores = self.reranker._forward(query, batch)
             logger.debug(f"Batch {batch_idx}: scored {len(batch)} chunks")
-            return batch
-        
+            return scores
+
         except Exception as e:
             logger.error(f"Error scoring batch {batch_idx}: {e}")
-            # Return chunks with default scores on error
-            for chunk in batch:
-                chunk["rerank_score"] = 0.0
-            return batch
+            return [None] * len(batch)
 
 
 def get_parallel_reranker(original_reranker, batch_size: int = 8, max_workers: int = 3):
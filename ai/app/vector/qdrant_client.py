@@ -42,6 +42,12 @@ def ensure_collection(client: QdrantClient, collection: str, vector_size: int) -
         )
         logger.info(f"Collection {collection} created with vector size {vector_size}")
     else:
+        existing_size = get_collection_info(client, collection).get("vector_size")
+        if existing_size and existing_size != vector_size:
+            raise ValueError(
+                f"Collection {collection} has vector size {existing_size}, but the embedding "
+                f"provider produces {vector_size}. Check EMBEDDING_DIMENSIONS or use a new collection."
+            )
         logger.info(f"Collection {collection} already exists")
 
     # Update HNSW configuration
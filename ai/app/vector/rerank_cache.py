@@ -0,0 +1,131 @@
+"""Bounded LRU cache for cross-encoder (query, chunk) scores."""
+
+import atexit
+import fcntl
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+import orjson
+
+from app.core.config import settings
+from app.core.utils import compute_content_hash, normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class RerankScoreCache:
+    """LRU cache of rerank scores, optionally persisted to disk between restarts."""
+
+    def __init__(self, max_size: int = 20000, path: Optional[str] = None):
+        self.max_size = max_size
+        self.path = Path(path) if path else None
+        self._scores: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+        if self.path and self.path.exists():
+            self.load()
+
+    @staticmethod
+    def make_key(model_name: str, query: str, chunk: dict[str, Any]) -> str:
+        """Build a cache key from model name, normalized query hash and chunk identity."""
+        query_hash = compute_content_hash(normalize_text(query).lower())[:32]
+        text_hash = compute_content_hash(chunk.get("text", ""))[:32]
+        chunk_id = chunk.get("id") or ""
+        return f"{model_name}|{query_hash}|{chunk_id}|{text_hash}"
+
+    def get_many(self, keys: list[str]) -> list[Optional[float]]:
+        """Look up scores for keys, returning None for misses."""
+        out: list[Optional[float]] = []
+        with self._lock:
+            for key in keys:
+                score = self._scores.get(key)
+                if score is None:
+                    self.misses += 1
+                else:
+                    self._scores.move_to_end(key)
+                    self.hits += 1
+                out.append(score)
+        return out
+
+    def put_many(self, keys: list[str], scores: list[float]) -> None:
+        """Store scores and evict least recently used entries beyond max_size."""
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._scores[key] = float(score)
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.max_size:
+                self._scores.popitem(last=False)
+            self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def load(self) -> None:
+        """Load persisted scores from disk."""
+        try:
+            data = orjson.loads(self.path.read_bytes())
+            with self._lock:
+                for key, score in list(data.items())[-self.max_size :]:
+                    self._scores[key] = float(score)
+            logger.info(f"Loaded {len(self._scores)} cached rerank scores from {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not load rerank cache from {self.path}: {e}")
+
+    def save(self) -> None:
+        """Persist scores to disk (no-op without a path or pending changes).
+
+        Entries already on disk are merged in under a file lock, so processes
+        sharing one path (gunicorn workers) do not overwrite each other's scores.
+        """
+        if not self.path or not self._dirty:
+            return
+        try:
+            with self._lock:
+                ours = dict(self._scores)
+                self._dirty = False
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            lock_path = self.path.with_suffix(self.path.suffix + ".lock")
+            with open(lock_path, "wb") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    merged = orjson.loads(self.path.read_bytes()) if self.path.exists() else {}
+                    for key in ours:
+                        merged.pop(key, None)  # Re-inserted below as most recent
+                    merged.update(ours)
+                    kept = dict(list(merged.items())[-self.max_size :])
+                    payload = orjson.dumps(kept)
+                    tmp_path = self.path.with_suffix(f"{self.path.suffix}.{os.getpid()}.tmp")
+                    tmp_path.write_bytes(payload)
+                    os.replace(tmp_path, self.path)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+            logger.info(
+                f"Saved {len(ours)} rerank scores from this process to {self.path} "
+                f"({len(kept)} in the file after merging)"
+            )
+        except Exception as e:
+            logger.warning(f"Could not save rerank cache to {self.path}: {e}")
+
+
+_rerank_cache: Optional[RerankScoreCache] = None
+
+
+def get_rerank_cache() -> Optional[RerankScoreCache]:
+    """Get the shared rerank score cache (None when disabled)."""
+    global _rerank_cache
+    if settings.rerank_cache_size <= 0:
+        return None
+    if _rerank_cache is None:
+        _rerank_cache = RerankScoreCache(
+            max_size=settings.rerank_cache_size,
+            path=settings.rerank_cache_path or None,
+        )
+        atexit.register(_rerank_cache.save)
+    return _rerank_cache
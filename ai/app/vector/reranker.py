@@ -1,10 +1,16 @@
 """Cross-encoder reranking for improved retrieval."""
 
 import logging
-from typing import Any, Optional
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
 
-import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.utils import compute_content_hash
+from app.vector.rerank_cache import get_rerank_cache
 
 logger = logging.getLogger(__name__)
 
@@ -12,8 +18,18 @@ logger = logging.getLogger(__name__)
 class CrossEncoderReranker:
     """Cross-encoder reranker using transformers."""
 
+    max_length = 512
+
     def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-12-v2"):
         self.model_name = model_name
+        # Chunk-side token ids (no special tokens), keyed by content hash
+        self._chunk_tokens: OrderedDict[str, list[int]] = OrderedDict()
+        self._chunk_tokens_lock = threading.Lock()
+
+        # Deferred so importing this module (e.g. at API startup) does not pull in torch
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         logger.info(f"Loading reranker model: {model_name} on {self.device}")
 
@@ -28,6 +44,133 @@ class CrossEncoderReranker:
             self.model = None
             self.tokenizer = None
 
+    def _supports_pretokenized_pairs(self) -> bool:
+        """Check for a BERT-style [CLS] q [SEP] c [SEP] pair layout we can assemble ourselves."""
+        return (
+            getattr(self.tokenizer, "cls_token_id", None) is not None
+            and getattr(self.tokenizer, "sep_token_id", None) is not None
+            and self.tokenizer.num_special_tokens_to_add(pair=True) == 3
+        )
+
+    def _chunk_token_ids(self, texts: list[str]) -> list[list[int]]:
+        """Return cached chunk token ids, tokenizing only unseen texts in one batch."""
+        keys = [compute_content_hash(text) for text in texts]
+        out: list[Optional[list[int]]] = [None] * len(texts)
+        with self._chunk_tokens_lock:
+            for i, key in enumerate(keys):
+                ids = self._chunk_tokens.get(key)
+                if ids is not None:
+                    self._chunk_tokens.move_to_end(key)
+                    out[i] = ids
+
+        missing = [i for i, ids in enumerate(out) if ids is None]
+        if missing:
+            encoded = self.tokenizer([texts[i] for i in missing], add_special_tokens=False)[
+                "input_ids"
+            ]
+            with self._chunk_tokens_lock:
+                for i, ids in zip(missing, encoded):
+                    out[i] = ids
+                    self._chunk_tokens[keys[i]] = ids
+                while len(self._chunk_tokens) > settings.rerank_token_cache_size:
+                    self._chunk_tokens.popitem(last=False)
+
+        metrics.increment("rerank.token_cache_hits", len(texts) - len(missing))
+        return out
+
+    def _encode_pairs(self, query: str, texts: list[str]) -> dict[str, Any]:
+        """Build padded pair tensors from a single query tokenization plus cached chunk ids."""
+        if not self._supports_pretokenized_pairs():
+            return self.tokenizer(
+                [(query, text) for text in texts],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="pt",
+            )
+
+        query_ids = self.tokenizer(query, add_special_tokens=False)["input_ids"]
+        budget = self.max_length - 3
+        cls_id, sep_id = self.tokenizer.cls_token_id, self.tokenizer.sep_token_id
+        # DistilBERT-style models take the same layout but have no token type embeddings
+        with_token_types = "token_type_ids" in self.tokenizer.model_input_names
+
+        features = []
+        for chunk_ids in self._chunk_token_ids(texts):
+            q_ids, c_ids = query_ids, chunk_ids
+            # Longest-first truncation, matching the tokenizer's default pair strategy
+            if len(q_ids) + len(c_ids) > budget:
+                half = budget // 2
+                if len(q_ids) <= half:
+                    c_ids = c_ids[: budget - len(q_ids)]
+                elif len(c_ids) <= half:
+                    q_ids = q_ids[: budget - len(c_ids)]
+                elif len(q_ids) > len(c_ids):
+                    q_ids, c_ids = q_ids[: budget - half], c_ids[:half]
+                else:
+                    q_ids, c_ids = q_ids[:half], c_ids[: budget - half]
+            input_ids = [cls_id, *q_ids, sep_id, *c_ids, sep_id]
+            feature = {"input_ids": input_ids, "attention_mask": [1] * len(input_ids)}
+            if with_token_types:
+                feature["token_type_ids"] = [0] * (len(q_ids) + 2) + [1] * (len(c_ids) + 1)
+            features.append(feature)
+        return self.tokenizer.pad(features, padding=True, return_tensors="pt")
+
+    def _forward(self, query: str, texts: list[str]) -> list[float]:
+        """Run the cross-encoder on (query, text) pairs and return raw scores."""
+        import torch
+
+        t0 = time.perf_counter()
+        inputs = self._encode_pairs(query, texts).to(self.device)
+        t1 = time.perf_counter()
+
+        with torch.no_grad():
+            scores = self.model(**inputs).logits.squeeze(-1)
+        t2 = time.perf_counter()
+
+        metrics.observe("rerank.tokenize", t1 - t0)
+        metrics.observe("rerank.forward", t2 - t1)
+        logger.debug(
+            f"Rerank batch of {len(texts)}: tokenize {t1 - t0:.4f}s "
+            f"({(t1 - t0) / max(t2 - t0, 1e-9):.1%} of rerank time), forward {t2 - t1:.4f}s"
+        )
+        return [float(s) for s in scores.cpu().tolist()]
+
+    def score(
+        self,
+        query: str,
+        chunks: list[dict[str, Any]],
+        forward: Optional[Callable[[str, list[str]], list[Optional[float]]]] = None,
+    ) -> list[float]:
+        """Score chunks against query, only running the model for uncached pairs.
+
+        forward replaces _forward for the uncached texts (the parallel reranker
+        passes its batched scorer); a None score from it is returned as 0.0 and
+        not cached.
+        """
+        forward = forward or self._forward
+        cache = get_rerank_cache()
+        if cache is None:
+            fresh = forward(query, [chunk.get("text", "") for chunk in chunks])
+            return [s if s is not None else 0.0 for s in fresh]
+
+        keys = [cache.make_key(self.model_name, query, chunk) for chunk in chunks]
+        scores = cache.get_many(keys)
+        missing = [i for i, s in enumerate(scores) if s is None]
+        metrics.increment("rerank.cache_hits", len(chunks) - len(missing))
+        metrics.increment("rerank.cache_misses", len(missing))
+
+        if missing:
+            fresh = forward(query, [chunks[i].get("text", "") for i in missing])
+            cache.put_many(
+                [keys[i] for i, s in zip(missing, fresh) if s is not None],
+                [s for s in fresh if s is not None],
+            )
+            for i, score in zip(missing, fresh):
+                scores[i] = score if score is not None else 0.0
+
+        return scores
+
     def rerank(
         self, query: str, chunks: list[dict[str, Any]], top_n: int = 3
     ) -> list[dict[str, Any]]:
@@ -37,20 +180,7 @@ class CrossEncoderReranker:
             return chunks[:top_n]
 
         try:
-            # Prepare pairs
-            pairs = [(query, chunk.get("text", "")) for chunk in chunks]
-
-            # Get scores
-            with torch.no_grad():
-                inputs = self.tokenizer(
-                    pairs,
-                    padding=True,
-                    truncation=True,
-                    max_length=512,
-                    return_tensors="pt",
-                ).to(self.device)
-
-                scores = self.model(**inputs).logits.squeeze().cpu().tolist()
+            scores = self.score(query, chunks)
 
             # Sort by score
             scored_chunks = list(zip(chunks, scores))
@@ -71,6 +201,37 @@ class CrossEncoderReranker:
             return chunks[:top_n]
 
 
+def should_bypass_rerank(
+    chunks: list[dict[str, Any]],
+    top_n: int,
+    min_margin: float = 0.25,
+    max_entropy: float = 0.5,
+    temperature: float = 0.1,
+) -> tuple[bool, dict[str, float]]:
+    """Decide whether first-stage similarity scores already settle the top_n.
+
+    The order is considered decisive when the gap between rank top_n and
+    top_n + 1 is at least min_margin and the normalized entropy of the
+    softmaxed scores is at most max_entropy.
+    """
+    scores = sorted((float(c.get("score") or 0.0) for c in chunks), reverse=True)
+    if top_n <= 0 or len(scores) <= top_n:
+        return False, {}
+
+    margin = scores[top_n - 1] - scores[top_n]
+
+    # Softmax over temperature-scaled scores, shifted by the max for stability
+    t = max(temperature, 1e-6)
+    exps = [math.exp((s - scores[0]) / t) for s in scores]
+    total = sum(exps)
+    probs = [e / total for e in exps]
+    entropy = -sum(p * math.log(p) for p in probs if p > 0)
+    norm_entropy = entropy / math.log(len(probs))
+
+    stats = {"margin": margin, "entropy": norm_entropy}
+    return margin >= min_margin and norm_entropy <= max_entropy, stats
+
+
 def get_reranker(model_name: Optional[str] = None) -> Optional[CrossEncoderReranker]:
     """Get reranker instance."""
     if model_name is None:
@@ -8,6 +8,7 @@ from qdrant_client import QdrantClient
 from qdrant_client.models import Filter, FieldCondition, MatchValue
 
 from app.core.config import settings
+from app.vector.embeddings import truncate_embeddings
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +20,14 @@ def retrieve(
     top_k: int = 30,
     cutoff: float = 0.22,
     filters: Optional[dict[str, Any]] = None,
+    vector_size: Optional[int] = None,
 ) -> list[dict[str, Any]]:
-    """Retrieve similar chunks from Qdrant."""
+    """Retrieve similar chunks from Qdrant.
+
+    If vector_size is given and the query vector is longer (e.g. a full-size
+    query against a reduced-dimension collection), the query is truncated and
+    renormalized to match.
+    """
     try:
         # Build query filter if provided
         query_filter = None
@@ -39,6 +46,8 @@ def retrieve(
                 query_filter = Filter(must=conditions)
 
         # Prepare query vector
+        if vector_size and len(query_vec) > vector_size:
+            query_vec = truncate_embeddings(np.asarray(query_vec, dtype=np.float32), vector_size)
         if isinstance(query_vec, np.ndarray):
             query_vector = query_vec.tolist()
         else:
@@ -102,6 +111,7 @@ def retrieve_with_cutoff(
     top_k: int = None,
     cutoff: float = None,
     filters: Optional[dict[str, Any]] = None,
+    vector_size: Optional[int] = None,
 ) -> list[dict[str, Any]]:
     """Retrieve chunks with similarity cutoff applied."""
     if top_k is None:
@@ -110,7 +120,9 @@ def retrieve_with_cutoff(
         cutoff = settings.similarity_cutoff
 
     # First retrieve more candidates
-    candidates = retrieve(client, collection, query_vec, top_k=top_k * 2, cutoff=0.0, filters=filters)
+    candidates = retrieve(
+        client, collection, query_vec, top_k=top_k * 2, cutoff=0.0, filters=filters, vector_size=vector_size
+    )
 
     # Apply cutoff
     filtered = [c for c in candidates if c["score"] >= cutoff]
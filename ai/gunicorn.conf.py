@@ -0,0 +1,44 @@
+"""Gunicorn config for multi-worker API deployments.
+
+    gunicorn -c gunicorn.conf.py app.api.main:app
+
+With PRELOAD_MODELS=true (default) the embedding and reranker models are
+loaded once in the master and shared copy-on-write by the forked workers.
+"""
+
+import gc
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+preload_app = os.getenv("PRELOAD_MODELS", "true").lower() in ("1", "true", "yes")
+
+if preload_app:
+    # Avoid GC-created holes in pages the workers will inherit (see gc.freeze docs)
+    gc.disable()
+
+
+def on_starting(server):
+    if server.cfg.preload_app:
+        from app.api.preload import preload_models
+
+        preload_models()
+        # Move the preloaded app and models out of the collector's reach, then let the
+        # master collect again: only objects it creates from here on are scanned
+        gc.freeze()
+        gc.enable()
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        # Keep worker GC passes from writing to (and so copying) inherited objects
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    gc.enable()
+    from app.api.preload import after_fork
+
+    after_fork(server.cfg.workers)